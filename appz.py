@@ -10,33 +10,660 @@ Supabase Storage File Manager (Flask)
 """
 
 from __future__ import annotations
+import bisect
+import contextvars
+import gzip
+import hashlib
+import importlib.util
 import io
+import json
 import mimetypes
 import os
+import random
 import re
-from dataclasses import dataclass
-from typing import List, Dict, Any, Optional, Tuple
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Tuple, Callable, Union, Iterator
+from urllib.parse import quote
 
+import httpx
 from flask import (
-    Flask, request, redirect, url_for, render_template_string,
-    flash, send_file, jsonify
+    Flask, Response, request, redirect, url_for, render_template,
+    flash, jsonify, send_file, stream_with_context, before_render_template, template_rendered
 )
-from supabase import create_client, Client
+from jinja2 import ChoiceLoader, DictLoader
+from werkzeug.http import dump_options_header, unquote_etag
 from dotenv import load_dotenv
 
+try:
+    import brotli  # optional: gzip is used when it is not installed
+except ImportError:
+    brotli = None
+
+try:
+    import fcntl  # POSIX; elsewhere upload spools are locked per process only
+except ImportError:
+    fcntl = None
+
 load_dotenv()
 
 # ---------------------- Config ----------------------
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise SystemExit("SUPABASE_URL and SUPABASE_KEY must be set as environment variables.")
 
 app = Flask(__name__)
 app.config["MAX_CONTENT_LENGTH"] = 512 * 1024 * 1024  # 512 MB uploads
 app.secret_key = os.getenv("FLASK_SECRET", "dev-secret")
 
-sb: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# bulk copy/move/delete start with this many Storage calls in flight (see BULK_*_CONCURRENCY)
+TRANSFER_WORKERS = int(os.getenv("TRANSFER_WORKERS", "8"))
+# concurrent folder listings during recursive walks
+LIST_WORKERS = int(os.getenv("LIST_WORKERS", "8"))
+LIST_PAGE_SIZE = 1000
+# keys per remove() call
+REMOVE_BATCH_SIZE = int(os.getenv("REMOVE_BATCH_SIZE", "1000"))
+# passes over a bucket being emptied before deletion gives up on stragglers
+EMPTY_BUCKET_ROUNDS = int(os.getenv("EMPTY_BUCKET_ROUNDS", "3"))
+# rows per panel page (the panel loads further pages on scroll)
+PANEL_PAGE_SIZE = int(os.getenv("PANEL_PAGE_SIZE", "200"))
+# folder listing cache (see ListingCache)
+LISTING_CACHE_TTL = float(os.getenv("LISTING_CACHE_TTL", "300"))
+LISTING_CACHE_MAX_FOLDERS = int(os.getenv("LISTING_CACHE_MAX_FOLDERS", "2000"))
+LISTING_CACHE_MAX_ROWS = int(os.getenv("LISTING_CACHE_MAX_ROWS", "200000"))
+# background refresh of the bucket catalog, for buckets changed outside the app
+BUCKET_REFRESH_SECONDS = float(os.getenv("BUCKET_REFRESH_SECONDS", "60"))
+# bytes per chunk when streaming objects to the client
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOAD_CHUNK_SIZE", str(256 * 1024)))
+# optional on-disk LRU of whole objects for /download (DOWNLOAD_CACHE_MAX_BYTES=0 turns it off);
+# objects larger than DOWNLOAD_CACHE_MAX_OBJECT are always streamed, and entries are checked
+# against Storage once they are older than DOWNLOAD_CACHE_REVALIDATE seconds
+DOWNLOAD_CACHE_DIR = os.getenv("DOWNLOAD_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "sfm-downloads")
+DOWNLOAD_CACHE_MAX_BYTES = int(os.getenv("DOWNLOAD_CACHE_MAX_BYTES", "0"))
+DOWNLOAD_CACHE_MAX_OBJECT = int(os.getenv("DOWNLOAD_CACHE_MAX_OBJECT", str(256 * 1024 * 1024)))
+DOWNLOAD_CACHE_REVALIDATE = float(os.getenv("DOWNLOAD_CACHE_REVALIDATE", "30"))
+# chunked uploads are spooled here until complete; stale spools are swept after UPLOAD_SPOOL_TTL
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or os.path.join(tempfile.gettempdir(), "sfm-uploads")
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+UPLOAD_SPOOL_TTL = float(os.getenv("UPLOAD_SPOOL_TTL", str(24 * 3600)))
+# multi-file uploads: files up to UPLOAD_INLINE_MAX are sent from memory, larger ones from a spool
+UPLOAD_INLINE_MAX = int(os.getenv("UPLOAD_INLINE_MAX", str(1024 * 1024)))
+# limits for .zip files expanded server-side
+UPLOAD_ZIP_MAX_FILES = int(os.getenv("UPLOAD_ZIP_MAX_FILES", "10000"))
+UPLOAD_ZIP_MAX_BYTES = int(os.getenv("UPLOAD_ZIP_MAX_BYTES", str(2 * 1024 ** 3)))
+# folder ZIP downloads: objects fetched ahead of the one being written; objects larger
+# than ZIP_PREFETCH_MAX_BYTES are not prefetched but streamed when their turn comes
+ZIP_PREFETCH = int(os.getenv("ZIP_PREFETCH", "8"))
+ZIP_PREFETCH_MAX_BYTES = int(os.getenv("ZIP_PREFETCH_MAX_BYTES", str(4 * 1024 * 1024)))
+# background jobs (bulk transfer/delete); finished jobs kept for status polling
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "200"))
+# SQLite journal of folder copies/moves, so interrupted ones can be resumed (see TransferJournal)
+TRANSFER_JOURNAL_DIR = os.getenv("TRANSFER_JOURNAL_DIR") or os.path.join(tempfile.gettempdir(), "sfm-transfers")
+# per-bucket SQLite object indexes (used for listings once a bucket has been indexed)
+OBJECT_INDEX_DIR = os.getenv("OBJECT_INDEX_DIR") or os.path.join(tempfile.gettempdir(), "sfm-index")
+# an index older than this (changes made outside the app) is not trusted; it is
+# recrawled in the background from half this age on
+OBJECT_INDEX_MAX_AGE = float(os.getenv("OBJECT_INDEX_MAX_AGE", "3600"))
+# in-memory key search indexes are rebuilt after this many seconds (changes made outside the app)
+SEARCH_INDEX_TTL = float(os.getenv("SEARCH_INDEX_TTL", "600"))
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "1000"))
+# the ASGI app takes search hits from the index this many at a time, each batch in a worker thread
+SEARCH_STREAM_BATCH = int(os.getenv("SEARCH_STREAM_BATCH", "100"))
+# responses smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+# Storage calls in flight for bulk helpers adapt between these bounds (see AdaptiveLimit),
+# starting at TRANSFER_WORKERS
+BULK_MIN_CONCURRENCY = int(os.getenv("BULK_MIN_CONCURRENCY", "1"))
+BULK_MAX_CONCURRENCY = int(os.getenv("BULK_MAX_CONCURRENCY", "64"))
+# transient failures (429, 5xx, network errors) are retried with jittered exponential backoff
+RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", "8"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "30"))
+# a bucket's circuit opens after this many consecutive failures, for CIRCUIT_COOLDOWN seconds
+# (doubling while probes keep failing)
+CIRCUIT_FAILURES = int(os.getenv("CIRCUIT_FAILURES", "10"))
+CIRCUIT_COOLDOWN = float(os.getenv("CIRCUIT_COOLDOWN", "15"))
+# shared HTTP connection pool for all Storage calls (see make_http_client);
+# keep-alive should cover the bulk worker pools so their connections stay warm
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", str(max(32, BULK_MAX_CONCURRENCY + LIST_WORKERS))))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+# HTTP/2 needs the optional h2 package
+HTTP2 = os.getenv("HTTP2", "1") == "1" and importlib.util.find_spec("h2") is not None
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+# seconds to wait for a free pooled connection
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "30"))
+# read/write timeout per kind of Storage call, e.g. STORAGE_TIMEOUTS="list=10,upload=900"
+STORAGE_TIMEOUTS = {"list": 30.0, "info": 30.0, "remove": 60.0, "transfer": 120.0,
+                    "download": 300.0, "upload": 600.0, "bucket": 30.0, "other": 60.0}
+STORAGE_TIMEOUTS.update(
+    (op.strip(), float(sec))
+    for op, _, sec in (item.partition("=") for item in os.getenv("STORAGE_TIMEOUTS", "").split(","))
+    if sec
+)
+# Storage calls slower than this are logged (0 disables the log)
+SLOW_STORAGE_CALL_SECONDS = float(os.getenv("SLOW_STORAGE_CALL_SECONDS", "2"))
+
+# ---------------------- Metrics ----------------------
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CALL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class Metrics:
+    """Counters and histograms rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str]] = {}  # name -> (type, help)
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._gauges: Dict[str, Callable[[], float]] = {}
+        # name -> {sorted label items: value} / {sorted label items: [count per bucket..., +Inf, sum]}
+        self._values: Dict[str, Dict[Tuple[Tuple[str, str], ...], Any]] = {}
+
+    def counter(self, name: str, help: str):
+        self._meta[name] = ("counter", help)
+        self._values[name] = {}
+
+    def gauge(self, name: str, help: str, read: Callable[[], float]):
+        """A value sampled from read() at render time."""
+        self._meta[name] = ("gauge", help)
+        self._gauges[name] = read
+        self._values[name] = {}
+
+    def histogram(self, name: str, help: str, buckets: Tuple[float, ...]):
+        self._meta[name] = ("histogram", help)
+        self._buckets[name] = buckets
+        self._values[name] = {}
+
+    def inc(self, name: str, labels: Dict[str, str], value: float = 1.0):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values[name]
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, labels: Dict[str, str], value: float):
+        key = tuple(sorted(labels.items()))
+        buckets = self._buckets[name]
+        with self._lock:
+            series = self._values[name]
+            row = series.get(key)
+            if row is None:
+                row = series[key] = [0] * (len(buckets) + 1) + [0.0]
+            row[bisect.bisect_left(buckets, value)] += 1
+            row[-1] += value
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, (kind, help) in self._meta.items():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "gauge":
+                    lines.append(f"{name} {self._gauges[name]():g}")
+                    continue
+                for key, value in sorted(self._values[name].items()):
+                    labels = ",".join(f'{k}="{_label_value(v)}"' for k, v in key)
+                    if kind == "counter":
+                        lines.append(f"{name}{{{labels}}} {value:g}")
+                        continue
+                    sep = "," if labels else ""
+                    cumulative = 0
+                    for bound, count in zip(self._buckets[name] + (float("inf"),), value):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f'{name}_bucket{{{labels}{sep}le="{le}"}} {cumulative}')
+                    lines.append(f"{name}_sum{{{labels}}} {value[-1]:.6f}")
+                    lines.append(f"{name}_count{{{labels}}} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+metrics.counter("sfm_storage_requests_total", "Storage API calls by operation, bucket and HTTP status.")
+metrics.histogram("sfm_storage_request_seconds", "Storage API call latency (until response headers).",
+                  LATENCY_BUCKETS)
+metrics.counter("sfm_http_requests_total", "Requests served, by endpoint, method and status.")
+metrics.histogram("sfm_http_request_seconds", "Request handling time (streamed bodies excluded).",
+                  LATENCY_BUCKETS)
+metrics.histogram("sfm_http_request_storage_calls", "Storage API calls made while handling one request.",
+                  CALL_COUNT_BUCKETS)
+
+@dataclass
+class RequestTimings:
+    """Upstream and render time of the request being handled (see current_timings)."""
+    started: float
+    calls: int = 0
+    storage: float = 0.0
+    render: float = 0.0
+    render_started: Optional[float] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add_call(self, seconds: float):
+        with self.lock:
+            self.calls += 1
+            self.storage += seconds
+
+# Set per request; worker pools copy it to their threads (see ContextExecutor)
+current_timings: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar(
+    "current_timings", default=None)
+
+class ContextExecutor(ThreadPoolExecutor):
+    """Thread pool whose tasks run in the submitter's context, so their Storage calls
+    count towards the request that started them."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+def storage_bucket(req: httpx.Request) -> str:
+    """Bucket a Storage API request is about ("" for bucket listings)."""
+    parts = req.url.path.split("/storage/v1/", 1)[-1].strip("/").split("/")
+    if parts[0] == "bucket":
+        return parts[1] if len(parts) > 1 else ""
+    if len(parts) < 2:
+        return ""
+    if parts[1] in ("copy", "move"):
+        try:
+            return json.loads(req.content).get("bucketId") or ""
+        except (ValueError, AttributeError):
+            return ""
+    if parts[1] in ("list", "list-v2", "info", "sign", "upload", "public", "authenticated"):
+        return parts[2] if len(parts) > 2 else ""
+    return parts[1]
+
+def record_storage_call(req: httpx.Request, status: int, seconds: float):
+    op, bucket = storage_operation(req), storage_bucket(req)
+    metrics.inc("sfm_storage_requests_total", {"operation": op, "bucket": bucket, "status": str(status)})
+    metrics.observe("sfm_storage_request_seconds", {"operation": op, "bucket": bucket}, seconds)
+    timings = current_timings.get()
+    if timings is not None:
+        timings.add_call(seconds)
+    if SLOW_STORAGE_CALL_SECONDS and seconds >= SLOW_STORAGE_CALL_SECONDS:
+        app.logger.warning("Slow storage call: %s %s -> %s in %.3fs", req.method, req.url.path, status, seconds)
+
+def _start_storage_timer(req: httpx.Request) -> None:
+    req.extensions["sfm_started"] = time.perf_counter()
+
+def _record_storage_response(resp: httpx.Response) -> None:
+    started = resp.request.extensions.get("sfm_started")
+    if started is not None:
+        record_storage_call(resp.request, resp.status_code, time.perf_counter() - started)
+
+@app.before_request
+def start_request_timings():
+    current_timings.set(RequestTimings(time.perf_counter()))
+
+@before_render_template.connect_via(app)
+def _render_started(sender, **extra):
+    timings = current_timings.get()
+    if timings is not None:
+        timings.render_started = time.perf_counter()
+
+@template_rendered.connect_via(app)
+def _render_finished(sender, **extra):
+    timings = current_timings.get()
+    if timings is not None and timings.render_started is not None:
+        timings.render += time.perf_counter() - timings.render_started
+        timings.render_started = None
+
+@app.after_request
+def record_request_timings(resp: Response) -> Response:
+    return finish_request_timings(resp, request.endpoint, request.method)
+
+def finish_request_timings(resp, endpoint: Optional[str], method: str):
+    """Server-Timing header (storage calls, render, total) and request metrics."""
+    timings = current_timings.get()
+    if timings is None:
+        return resp
+    total = time.perf_counter() - timings.started
+    resp.headers["Server-Timing"] = (
+        f'storage;dur={timings.storage * 1000:.1f};desc="calls={timings.calls}", '
+        f"render;dur={timings.render * 1000:.1f}, total;dur={total * 1000:.1f}")
+    endpoint = endpoint or "unknown"
+    metrics.inc("sfm_http_requests_total",
+                {"endpoint": endpoint, "method": method, "status": str(resp.status_code)})
+    metrics.observe("sfm_http_request_seconds", {"endpoint": endpoint}, total)
+    metrics.observe("sfm_http_request_storage_calls", {"endpoint": endpoint}, timings.calls)
+    return resp
+
+@app.teardown_request
+def clear_request_timings(exc):
+    current_timings.set(None)
+
+# ---------------------- Storage client ----------------------
+def storage_operation(req: httpx.Request) -> str:
+    """Classify a Storage API request by its endpoint (keys of STORAGE_TIMEOUTS)."""
+    parts = req.url.path.split("/storage/v1/", 1)[-1].strip("/").split("/")
+    if parts[0] == "bucket":
+        return "bucket"
+    if parts[0] != "object" or len(parts) < 2:
+        return "other"
+    kind = parts[1]
+    if kind in ("list", "list-v2"):
+        return "list"
+    if kind in ("copy", "move"):
+        return "transfer"
+    if kind == "info" or req.method == "HEAD":
+        return "info"
+    if req.method == "DELETE":
+        return "remove"
+    if req.method in ("POST", "PUT"):
+        return "upload" if kind not in ("sign", "upload") else "other"
+    return "download"
+
+def _apply_operation_timeout(req: httpx.Request) -> None:
+    # event hooks run before the transport reads the timeout, so this overrides the client default
+    seconds = STORAGE_TIMEOUTS.get(storage_operation(req), STORAGE_TIMEOUTS["other"])
+    req.extensions["timeout"] = httpx.Timeout(seconds, connect=HTTP_CONNECT_TIMEOUT, pool=HTTP_POOL_TIMEOUT).as_dict()
+
+def http_client_options() -> Dict[str, Any]:
+    """Pool limits, timeouts and HTTP/2 setting shared by the sync and async clients."""
+    return dict(
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(STORAGE_TIMEOUTS["other"], connect=HTTP_CONNECT_TIMEOUT, pool=HTTP_POOL_TIMEOUT),
+        http2=HTTP2,
+        follow_redirects=True,
+    )
+
+def make_http_client() -> httpx.Client:
+    """One pooled httpx client for the process; httpx clients are safe to share between threads."""
+    return httpx.Client(**http_client_options(), event_hooks={
+        "request": [_apply_operation_timeout, _start_storage_timer],
+        "response": [_record_storage_response],
+    })
+
+def storage_endpoint() -> Tuple[str, Dict[str, str]]:
+    """Storage API base URL and auth headers, as supabase's create_client() sets them up."""
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise RuntimeError("SUPABASE_URL and SUPABASE_KEY must be set as environment variables.")
+    return (f"{SUPABASE_URL.rstrip('/')}/storage/v1/",
+            {"apiKey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"})
+
+class StorageOnlyClient:
+    """The `storage` part of a supabase Client, created on first use.
+
+    Only storage is used, so storage3 is imported directly: the full supabase
+    package would also pull in its realtime/websockets, auth, postgrest and
+    functions clients at import time. Nothing connects (or needs credentials)
+    until the first Storage call.
+    """
+
+    def __init__(self):
+        self._storage = None
+        self._lock = threading.Lock()
+
+    @property
+    def storage(self):
+        if self._storage is None:
+            with self._lock:
+                if self._storage is None:
+                    from storage3 import SyncStorageClient
+                    url, headers = storage_endpoint()
+                    self._storage = SyncStorageClient(url, headers, http_client=make_http_client())
+        return self._storage
+
+sb = StorageOnlyClient()
+
+def _reconnect_after_fork():
+    # pooled sockets (and TLS state) inherited from the parent must not be shared with it;
+    # the inherited client is dropped without closing so the parent's connections stay intact
+    global sb, index_refresher
+    sb = StorageOnlyClient()
+    # so are SQLite connections, and a fork copies thread pools without their threads
+    object_index.after_fork()
+    index_refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-refresh")
+    job_runner.after_fork()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reconnect_after_fork)
+
+# ---------------------- Retries & adaptive concurrency ----------------------
+THROTTLE_STATUSES = {429, 503}
+TRANSIENT_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+# a cross-bucket copy/move answered with these (by error_status, so a 400 whose body
+# says 404 or 409 is not one) falls back to streaming the object across
+CROSS_BUCKET_UNSUPPORTED = {400, 405, 501}
+# overwriting transfers stage the new object as "<key>.<random><suffix>" beside the old one
+TRANSFER_TEMP_SUFFIX = ".sfm-part"
+
+def _status_response(ex: BaseException) -> Optional[httpx.Response]:
+    """The HTTP response behind a storage3 error (StorageApiError chains the HTTPStatusError)."""
+    for _ in range(4):
+        if isinstance(ex, httpx.HTTPStatusError):
+            return ex.response
+        ex = ex.__cause__ or ex.__context__
+        if ex is None:
+            return None
+    return None
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def _int_status(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def error_status(ex: BaseException) -> Optional[int]:
+    """Status behind a storage3/httpx error, if there is one.
+
+    The "statusCode" of the error body wins over the HTTP status: hosted Storage
+    answers most errors with HTTP 400 and puts 404 (not found), 409 (duplicate),
+    ... there. storage3's StorageApiError carries it as `status`.
+    """
+    status = _int_status(getattr(ex, "status", None))
+    if status is not None:
+        return status
+    resp = _status_response(ex)
+    if resp is None:
+        return None
+    try:
+        body = resp.json()
+    except (httpx.ResponseNotRead, ValueError):
+        body = None
+    status = _int_status(body.get("statusCode")) if isinstance(body, dict) else None
+    return status if status is not None else resp.status_code
+
+def classify_error(ex: BaseException) -> Tuple[Optional[str], Optional[float]]:
+    """("throttle" | "failure", Retry-After seconds) for transient errors, (None, None) otherwise."""
+    if isinstance(ex, httpx.TransportError):
+        return "failure", None
+    status = error_status(ex)
+    if status not in TRANSIENT_STATUSES:
+        return None, None
+    resp = _status_response(ex)
+    retry_after = retry_after_seconds(resp.headers.get("Retry-After")) if resp is not None else None
+    return ("throttle" if status in THROTTLE_STATUSES else "failure"), retry_after
+
+def retry_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Seconds to wait before retry number `attempt` (1-based): Retry-After when the server
+    sent one, else full-jitter exponential backoff."""
+    if retry_after is not None:
+        return min(retry_after, RETRY_MAX_DELAY * 4) + random.uniform(0, RETRY_BASE_DELAY)
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+class AdaptiveLimit:
+    """AIMD limit on bulk Storage calls in flight.
+
+    Grows by one per `limit` successful calls and halves when the backend
+    throttles (429/503); calls already in flight when it halved don't halve it
+    again, so a burst of 429s counts once.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.in_flight = 0
+        self.throttled = 0
+        self._decreased_at = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self, job: Optional[Job] = None) -> float:
+        """Wait for a slot; returns the start time to pass to release()."""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait(0.25)
+                check_cancelled(job)
+            self.in_flight += 1
+        return time.monotonic()
+
+    def release(self, started: float, outcome: Optional[str]):
+        with self._cond:
+            self.in_flight -= 1
+            self.adjust(started, outcome)
+            self._cond.notify_all()
+
+    def adjust(self, started: float, outcome: Optional[str]):
+        """outcome: None (the call got an answer), "throttle", or "failure"/"skipped" (no change)."""
+        if outcome == "throttle":
+            self.throttled += 1
+            if started >= self._decreased_at:
+                self.limit = max(float(self.minimum), self.limit / 2)
+                self._decreased_at = time.monotonic()
+        elif outcome is None:
+            self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+
+class CircuitBreaker:
+    """Stops calls to a failing bucket.
+
+    Opens after `threshold` consecutive failures; once `cooldown` has passed a
+    single probe call is let through, which closes the circuit or reopens it
+    for twice as long.
+    """
+
+    def __init__(self, bucket: str, threshold: int, cooldown: float):
+        self.bucket = bucket
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def wait_time(self) -> float:
+        """0 if a call may go ahead now, else seconds to wait before asking again."""
+        with self._lock:
+            if self.failures < self.threshold:
+                return 0.0
+            now = time.monotonic()
+            if now < self.open_until:
+                return self.open_until - now
+            if self._probing:
+                return min(1.0, self.base_cooldown)
+            self._probing = True
+            return 0.0
+
+    def record(self, outcome: Optional[str]):
+        """outcome: None (the call succeeded), "failure", or "throttle"/"skipped" (no change)."""
+        with self._lock:
+            self._probing = False
+            if outcome is None:
+                self.failures = 0
+                self.cooldown = self.base_cooldown
+                self.open_until = 0.0
+            elif outcome == "failure":
+                self.failures += 1
+                if self.failures >= self.threshold:
+                    if self.open_until:
+                        self.cooldown = min(self.cooldown * 2, self.base_cooldown * 16)
+                    self.open_until = time.monotonic() + self.cooldown
+                    metrics.inc("sfm_circuit_opened_total", {"bucket": self.bucket})
+                    app.logger.warning("Circuit for bucket %r open for %.0fs after %d failures",
+                                       self.bucket, self.cooldown, self.failures)
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.threshold:
+            return "closed"
+        return "open" if time.monotonic() < self.open_until else "half-open"
+
+bulk_limit = AdaptiveLimit(TRANSFER_WORKERS, BULK_MIN_CONCURRENCY, BULK_MAX_CONCURRENCY)
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def breaker_for(bucket: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(bucket)
+        if breaker is None:
+            breaker = _breakers[bucket] = CircuitBreaker(bucket, CIRCUIT_FAILURES, CIRCUIT_COOLDOWN)
+        return breaker
+
+def call_bucket(fn: Callable[..., Any]) -> str:
+    """Bucket of a bound storage3 bucket method ("" for client-level calls)."""
+    return getattr(getattr(fn, "__self__", None), "id", None) or ""
+
+def pause(seconds: float, job: Optional[Job] = None):
+    if job is not None:
+        job.sleep(seconds)
+    elif seconds > 0:
+        time.sleep(seconds)
+
+def storage_call(fn: Callable[..., Any], *args, job: Optional[Job] = None) -> Any:
+    """fn(*args) for bulk helpers: under the adaptive concurrency limit and the
+    bucket's circuit breaker, retrying transient errors (honouring Retry-After)."""
+    breaker = breaker_for(call_bucket(fn))
+    attempt = 0
+    while True:
+        # take the slot before asking the breaker: a probe it hands out must get made
+        started = bulk_limit.acquire(job)
+        wait = breaker.wait_time()
+        if wait:
+            bulk_limit.release(started, "skipped")
+            pause(wait, job)
+            continue
+        outcome: Optional[str] = "skipped"  # until the call answers or fails
+        try:
+            result = fn(*args)
+            outcome = None
+            return result
+        except Exception as ex:
+            outcome, retry_after = classify_error(ex)
+            if outcome is None:
+                # answered, but a 404/409/400 says nothing of the bucket's health or
+                # headroom: it neither closes the breaker nor grows the limit
+                outcome = "skipped"
+                raise
+            attempt += 1
+            if attempt >= RETRY_ATTEMPTS:
+                raise
+        finally:
+            bulk_limit.release(started, outcome)
+            breaker.record(outcome)
+        metrics.inc("sfm_storage_retries_total", {"operation": getattr(fn, "__name__", "call"), "reason": outcome})
+        pause(retry_delay(attempt, retry_after), job)
+
+metrics.counter("sfm_storage_retries_total", "Storage calls retried by bulk helpers, by operation and reason.")
+metrics.counter("sfm_circuit_opened_total", "Times a bucket's circuit breaker opened.")
+metrics.gauge("sfm_bulk_concurrency_limit", "Current adaptive limit on bulk Storage calls in flight.",
+              lambda: bulk_limit.limit)
+metrics.gauge("sfm_bulk_in_flight", "Bulk Storage calls in flight.", lambda: bulk_limit.in_flight)
 
 # ---------------------- Helpers ----------------------
 VALID_SEGMENT = re.compile(r"^[A-Za-z0-9._#@+-][A-Za-z0-9._#@+\-\s]*$")
@@ -65,19 +692,23 @@ def validate_segment(seg: str) -> Optional[str]:
         return "Invalid characters. Allowed: letters, numbers, spaces, . _ - + # @"
     return None
 
-def get_bucket_names() -> List[str]:
+def fetch_bucket_names() -> List[str]:
     """Return bucket names for different supabase-py versions (dict or objects)."""
+    buckets = sb.storage.list_buckets()
+    names: List[str] = []
+    for b in buckets or []:
+        if isinstance(b, dict):
+            nm = b.get("name")
+        else:
+            nm = getattr(b, "name", None)
+        if nm:
+            names.append(nm)
+    return sorted(names)
+
+def get_bucket_names() -> List[str]:
+    """Return cached bucket names, loading them on first use."""
     try:
-        buckets = sb.storage.list_buckets()
-        names: List[str] = []
-        for b in buckets or []:
-            if isinstance(b, dict):
-                nm = b.get("name")
-            else:
-                nm = getattr(b, "name", None)
-            if nm:
-                names.append(nm)
-        return sorted(names)
+        return bucket_catalog.names()
     except Exception as ex:
         flash(f"Failed to list buckets: {ex}", "error")
         return []
@@ -88,14 +719,34 @@ class Item:
     is_folder: bool
     size: Optional[int]
     updated_at: Optional[str]
+    count: Optional[int] = None  # objects below a folder (only known from the object index)
 
-def list_items(bucket: str, prefix: str) -> Tuple[List[Item], List[Item]]:
+def parse_cursor(cursor: Optional[str]) -> int:
+    """Cursors are opaque to clients; internally they are the next list() offset."""
+    try:
+        return max(0, int(cursor or 0))
+    except ValueError:
+        return 0
+
+def list_items(bucket: str, prefix: str, limit: int = PANEL_PAGE_SIZE,
+               cursor: Optional[str] = None) -> Tuple[List[Item], List[Item], Optional[str]]:
+    """Return one page of (folders, files, next_cursor) in name order."""
     prefix = (prefix or "").strip("/")
-    resp = sb.storage.from_(bucket).list(
-        prefix or "",
-        {"limit": 1000, "offset": 0, "sortBy": {"column": "name", "order": "asc"}}
-    )
-    entries: List[Dict[str, Any]] = resp or []
+    limit = max(1, min(limit, LIST_PAGE_SIZE))
+    offset = parse_cursor(cursor)
+    index = object_index.get(bucket, prefix)
+    if index:
+        return index.list_page(prefix, limit, offset)
+    entries = listing_cache.get(bucket, prefix, (limit, offset))
+    if entries is None:
+        entries = sb.storage.from_(bucket).list(prefix or "", list_options(limit, offset)) or []
+        listing_cache.put(bucket, prefix, (limit, offset), entries)
+    next_cursor = str(offset + len(entries)) if len(entries) >= limit else None
+    folders, files = items_from_entries(entries)
+    return folders, files, next_cursor
+
+def items_from_entries(entries: List[Dict[str, Any]]) -> Tuple[List[Item], List[Item]]:
+    """Split raw list() entries into (folders, files)."""
     folders: List[Item] = []
     files: List[Item] = []
     for e in entries:
@@ -103,7 +754,7 @@ def list_items(bucket: str, prefix: str) -> Tuple[List[Item], List[Item]]:
         meta = e.get("metadata") or {}
         size = meta.get("size") if isinstance(meta, dict) else None
         updated = e.get("updated_at")
-        is_folder = size in (None, 0) and not name.endswith(".keep") and e.get("id") is None
+        is_folder = is_folder_entry(e)
         # some backends return trailing slash to signal folder
         if name and name.endswith("/"):
             is_folder = True
@@ -114,6 +765,53 @@ def list_items(bucket: str, prefix: str) -> Tuple[List[Item], List[Item]]:
             files.append(Item(name, False, size, updated))
     return folders, files
 
+def open_object_stream(bucket: str, key: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+    """Start a GET for an object and return the response with its body unread.
+
+    Goes through the storage client's own httpx session so auth headers and
+    pooled connections are reused; the caller must close the response.
+    """
+    api = sb.storage.from_(bucket)
+    url = api._base_url.joinpath("object", bucket, *split_path(key))
+    req = api._client.build_request("GET", str(url), headers={**api._headers, **(headers or {})})
+    return api._client.send(req, stream=True)
+
+class ResponseReader(io.RawIOBase):
+    """Read-only file over a streamed response body, so storage3 can upload from it
+    (wrapped in an io.BufferedReader) without holding the object in memory."""
+
+    def __init__(self, response: httpx.Response):
+        self._chunks = response.iter_bytes(DOWNLOAD_CHUNK_SIZE)
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            self._pending = next(self._chunks, b"")
+            if not self._pending:
+                return 0
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+def stream_object(src_bucket: str, src_key: str, dst_bucket: str, dst_key: str, upsert: bool = False):
+    """Upload an object to dst while it downloads from src, a chunk at a time
+    (storage_call retries start over with a fresh download)."""
+    def _once():
+        upstream = open_object_stream(src_bucket, src_key)
+        try:
+            upstream.raise_for_status()
+            options = {"content-type": upstream.headers.get("Content-Type") or "application/octet-stream"}
+            if upsert:
+                options["upsert"] = "true"
+            return sb.storage.from_(dst_bucket).upload(dst_key, io.BufferedReader(ResponseReader(upstream)), options)
+        finally:
+            upstream.close()
+    return storage_call(_once)
+
 def ensure_placeholder_for_folder(bucket: str, prefix: str) -> Tuple[bool, str]:
     placeholder_key = join_path(prefix, ".keep")
     try:
@@ -122,100 +820,2213 @@ def ensure_placeholder_for_folder(bucket: str, prefix: str) -> Tuple[bool, str]:
     except Exception as ex:
         return False, f"Failed to create folder placeholder: {ex}"
 
-def delete_prefix_recursive(bucket: str, prefix: str) -> Tuple[int, List[str]]:
-    """Delete everything under prefix (folder)."""
-    deleted, errors = 0, []
-
-    def _walk_delete(pfx: str):
-        nonlocal deleted
-        resp = sb.storage.from_(bucket).list(pfx or "", {"limit": 1000, "offset": 0})
-        for e in resp or []:
-            name = e.get("name") or ""
-            meta = e.get("metadata") or {}
-            size = meta.get("size") if isinstance(meta, dict) else None
-            full = join_path(pfx, name)
-            # recurse folders (heuristic)
-            if size in (None, 0) and e.get("id") is None and not name.endswith(".keep"):
-                _walk_delete(full)
-                continue
-            try:
-                sb.storage.from_(bucket).remove([full])
-                deleted += 1
-            except Exception as dex:
-                errors.append(f"{full}: {dex}")
-        # remove placeholder if exists
-        try:
-            sb.storage.from_(bucket).remove([join_path(pfx, ".keep")])
-        except Exception:
-            pass
+def entry_size(e: Dict[str, Any]) -> int:
+    meta = e.get("metadata") or {}
+    return (meta.get("size") if isinstance(meta, dict) else None) or 0
+
+def is_folder_entry(e: Dict[str, Any]) -> bool:
+    """Folder heuristic for `list()` entries: no id/size and not a placeholder."""
+    name = e.get("name") or ""
+    return entry_size(e) == 0 and e.get("id") is None and not name.endswith(".keep")
+
+# ---------------------- Storage steps ----------------------
+# Bulk operations are written once, as generators of "steps": they yield the
+# Storage calls they need (StorageOp) and get each result sent back, or the
+# call's exception thrown in. run_steps()/iter_steps() below drive them with
+# blocking calls and a thread pool; appz_asgi has the same two drivers with
+# awaits and tasks. Anything else a generator yields is output (a page of
+# keys, a piece of a ZIP), passed on by iter_steps().
+Steps = Iterator[Any]
+
+@dataclass(frozen=True)
+class StorageOp:
+    """Call `method` of from_(bucket), or of the storage client when bucket is None
+    (with retries, the adaptive limit and the bucket's circuit breaker)."""
+    bucket: Optional[str]
+    method: str
+    args: tuple = ()
+
+@dataclass(frozen=True)
+class BlockingCall:
+    """Local blocking work (SQLite, files): run inline here, in a thread by appz_asgi."""
+    fn: Callable[..., Any]
+    args: tuple = ()
+
+@dataclass(frozen=True)
+class Spawn:
+    """Start `steps` running concurrently; the result is a handle to Join."""
+    steps: Steps
+
+@dataclass(frozen=True)
+class Join:
+    """Wait for spawned steps; the result is their return value, or their error is thrown in."""
+    handle: Any
+
+@dataclass(frozen=True)
+class PipeObject:
+    """Stream an object into the writer `open_writer()` returns, yielding `drain()` as
+    output after each chunk (only under iter_steps). Errors before the writer is
+    opened are thrown in, so a failed object leaves nothing half-written."""
+    bucket: str
+    key: str
+    open_writer: Callable[[], Any]
+    drain: Callable[[], bytes]
+
+STEP_TYPES = (StorageOp, BlockingCall, Spawn, Join, PipeObject)
+END = object()  # next_output(): the steps finished
+
+def next_output(steps: Steps) -> Steps:
+    """Advance `steps` to their next output and return it (END when they finish),
+    passing every step they yield on to the caller's driver."""
+    send: Any = None
+    error: Optional[BaseException] = None
+    while True:
+        try:
+            step = steps.throw(error) if error is not None else steps.send(send)
+        except StopIteration:
+            return END
+        if not isinstance(step, STEP_TYPES):
+            return step
+        try:
+            send, error = (yield step), None
+        except Exception as ex:
+            send, error = None, ex
+
+def each_steps(fn: Callable[[Any], Steps], items: List[Any], limit: int) -> Steps:
+    """Results of fn(item)'s steps for every item, in order, at most `limit` running at once."""
+    results: List[Any] = []
+    window: deque = deque()
+    for item in items:
+        window.append((yield Spawn(fn(item))))
+        if len(window) >= limit:
+            results.append((yield Join(window.popleft())))
+    while window:
+        results.append((yield Join(window.popleft())))
+    return results
+
+def storage_method(client: Any, op: StorageOp) -> Callable[..., Any]:
+    return getattr(client if op.bucket is None else client.from_(op.bucket), op.method)
+
+def iter_steps(steps: Steps, job: Optional[Job] = None) -> Iterator[Any]:
+    """Drive steps with blocking calls, yielding their output; returns their return value.
+
+    JobCancelled is not thrown into the steps: they are closed and it propagates.
+    Spawned steps run on a pool that is shut down (after the running ones
+    finish) when the steps end.
+    """
+    pool: Optional[ContextExecutor] = None
+    send: Any = None
+    error: Optional[BaseException] = None
+    try:
+        while True:
+            try:
+                step = steps.throw(error) if error is not None else steps.send(send)
+            except StopIteration as stop:
+                return stop.value
+            send, error = None, None
+            try:
+                if isinstance(step, StorageOp):
+                    send = storage_call(storage_method(sb.storage, step), *step.args, job=job)
+                elif isinstance(step, BlockingCall):
+                    send = step.fn(*step.args)
+                elif isinstance(step, Spawn):
+                    if pool is None:
+                        pool = ContextExecutor(max_workers=BULK_MAX_CONCURRENCY)
+                    send = pool.submit(run_steps, step.steps, job)
+                elif isinstance(step, Join):
+                    send = step.handle.result()
+                elif isinstance(step, PipeObject):
+                    yield from pipe_object(step)
+                else:
+                    yield step
+            except JobCancelled:
+                raise
+            except Exception as ex:
+                error = ex
+    finally:
+        steps.close()
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+def run_steps(steps: Steps, job: Optional[Job] = None) -> Any:
+    """Drive steps that produce no output to completion; returns their return value."""
+    driver = iter_steps(steps, job)
+    try:
+        out = next(driver)
+    except StopIteration as stop:
+        return stop.value
+    driver.close()
+    raise TypeError(f"steps yielded output {out!r} where none was expected")
+
+def pipe_object(step: PipeObject) -> Iterator[bytes]:
+    upstream = open_object_stream(step.bucket, step.key)
+    try:
+        if upstream.status_code >= 400:
+            raise RuntimeError(f"{upstream.status_code} {upstream.read()[:200]!r}")
+        with step.open_writer() as w:
+            for chunk in upstream.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+                w.write(chunk)
+                yield step.drain()
+    finally:
+        upstream.close()
+
+# ---------------------- Walks ----------------------
+def list_options(limit: int, offset: int) -> Dict[str, Any]:
+    return {"limit": limit, "offset": offset, "sortBy": {"column": "name", "order": "asc"}}
+
+def list_all_steps(bucket: str, prefix: str) -> Steps:
+    """Every entry directly under prefix, following pagination."""
+    out: List[Dict[str, Any]] = []
+    while True:
+        page = (yield StorageOp(bucket, "list", (prefix or "", list_options(LIST_PAGE_SIZE, len(out))))) or []
+        out.extend(page)
+        if len(page) < LIST_PAGE_SIZE:
+            return out
+
+def object_pages_steps(bucket: str, prefix: str) -> Steps:
+    """Output pages of (full key, entry) for every object under prefix.
+
+    Uses flat list-v2 pages (LIST_PAGE_SIZE keys per request however deep the
+    tree is); Storage APIs without list-v2 are walked folder by folder.
+    """
+    prefix = (prefix or "").strip("/")
+    search = prefix + "/" if prefix else ""
+    cursor: Optional[str] = None
+    first = True
+    while True:
+        options: Dict[str, Any] = {"prefix": search, "limit": LIST_PAGE_SIZE, "with_delimiter": False,
+                                   "sortBy": {"column": "name", "order": "asc"}}
+        if cursor:
+            options["cursor"] = cursor
+        try:
+            page, cursor = flat_page((yield StorageOp(bucket, "list_v2", (options,))), search)
+        except Exception as ex:
+            if not first or not flat_listing_unsupported(ex):
+                raise
+            app.logger.info("list-v2 unavailable for bucket %r (%s); listing folder by folder", bucket, ex)
+            yield from folder_pages_steps(bucket, prefix)
+            return
+        first = False
+        yield page
+        if cursor is None:
+            return
+
+def flat_listing_unsupported(ex: BaseException) -> bool:
+    """True if a list-v2 failure means "use the folder walk" rather than a real error:
+    older Storage API (404/405/400), client without list_v2, or an unexpected reply."""
+    if isinstance(ex, (AttributeError, TypeError, ValueError)):
+        return True
+    status = error_status(ex)
+    return status is not None and 400 <= status < 500 and status not in THROTTLE_STATUSES
+
+def flat_page(result: Any, search: str) -> Tuple[List[Tuple[str, Dict[str, Any]]], Optional[str]]:
+    """(full key, entry) pairs of one list-v2 reply, and the cursor of the next page (None at the end)."""
+    page: List[Tuple[str, Dict[str, Any]]] = []
+    for obj in result.objects:
+        key = obj.key or obj.name
+        if search and not key.startswith(search):
+            key = search + key.lstrip("/")
+        page.append((key, flat_entry(key, obj)))
+    if not result.hasNext or not result.objects:
+        return page, None
+    return page, result.nextCursor or result.objects[-1].key or result.objects[-1].name
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="milliseconds") + "Z"
+
+def flat_entry(key: str, obj: Any) -> Dict[str, Any]:
+    """A list-v2 object in the shape of a `list()` entry."""
+    return {"name": key.rsplit("/", 1)[-1], "id": obj.id, "updated_at": _iso(obj.updated_at),
+            "created_at": _iso(obj.created_at), "metadata": obj.metadata}
+
+def folder_pages_steps(bucket: str, prefix: str) -> Steps:
+    """Output the objects of each folder under prefix as it is listed.
+
+    Walks level by level; all folders of one level are listed concurrently.
+    """
+    level = [(prefix or "").strip("/")]
+    while level:
+        next_level: List[str] = []
+        listings = yield from each_steps(lambda p: list_all_steps(bucket, p), level, LIST_WORKERS)
+        for pfx, entries in zip(level, listings):
+            page = []
+            for e in entries:
+                full = join_path(pfx, (e.get("name") or "").rstrip("/"))
+                if is_folder_entry(e):
+                    next_level.append(full)
+                else:
+                    page.append((full, e))
+            if page:
+                yield page
+        level = next_level
+
+def walk_steps(bucket: str, prefix: str) -> Steps:
+    """(full key, entry) for every object under prefix."""
+    objects: List[Tuple[str, Dict[str, Any]]] = []
+    pages = object_pages_steps(bucket, prefix)
+    while True:
+        page = yield from next_output(pages)
+        if page is END:
+            return objects
+        objects.extend(page)
+
+def walk_objects(bucket: str, prefix: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """Return (full key, entry) for every object under prefix."""
+    return run_steps(walk_steps(bucket, prefix))
+
+def iter_objects(bucket: str, prefix: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (full key, entry) for every object under prefix, a page at a time."""
+    for page in iter_steps(object_pages_steps(bucket, prefix)):
+        yield from page
+
+def iter_object_keys(bucket: str, prefix: str) -> List[str]:
+    """Return full keys of every object under prefix (walks folders)."""
+    return [key for key, _ in walk_objects(bucket, prefix)]
+
+# ---------------------- Bulk operations ----------------------
+def remove_batch_steps(bucket: str, batch: List[str], job: Optional[Job] = None) -> Steps:
+    """(removed, error) for one remove() call."""
+    check_cancelled(job)
+    try:
+        resp = yield StorageOp(bucket, "remove", (batch,))
+    except Exception as ex:
+        return 0, f"{len(batch)} objects starting at {batch[0]}: {ex}"
+    if job:
+        job.advance(len(batch))
+    return len(resp or []), None
+
+def remove_keys_steps(bucket: str, keys: List[str], job: Optional[Job] = None) -> Steps:
+    """Remove keys in large batches, concurrently; returns (deleted, errors)."""
+    batches = [keys[i:i + REMOVE_BATCH_SIZE] for i in range(0, len(keys), REMOVE_BATCH_SIZE)]
+    results = yield from each_steps(lambda b: remove_batch_steps(bucket, b, job), batches, BULK_MAX_CONCURRENCY)
+    return sum(n for n, _ in results), [err for _, err in results if err]
+
+def delete_prefix_steps(bucket: str, prefix: str, job: Optional[Job] = None) -> Steps:
+    """Delete everything under prefix (folder); returns (deleted, errors)."""
+    try:
+        objects = yield from walk_steps(bucket, prefix)
+    except Exception as ex:
+        return 0, [f"Failed to list '{prefix}': {ex}"]
+    if job:
+        job.set_total(len(objects), sum(entry_size(e) for _, e in objects))
+    return (yield from remove_keys_steps(bucket, [key for key, _ in objects], job))
+
+def native_transfer_steps(src_bucket: str, src_key: str, dst_bucket: str, dst_key: str,
+                          move: bool = False) -> Steps:
+    """Server-side copy/move to a key that must not exist yet (409 if it does)."""
+    if src_bucket == dst_bucket:
+        yield StorageOp(src_bucket, "move" if move else "copy", (src_key, dst_key))
+        return
+    body = {"bucketId": src_bucket, "sourceKey": src_key, "destinationBucket": dst_bucket,
+            "destinationKey": dst_key}
+    try:
+        yield StorageOp(src_bucket, "_request", ("POST", ["object", "move" if move else "copy"], None, body))
+        return
+    except Exception as ex:
+        if error_status(ex) not in CROSS_BUCKET_UNSUPPORTED:
+            raise
+    yield BlockingCall(stream_object, (src_bucket, src_key, dst_bucket, dst_key))
+    if move:
+        yield StorageOp(src_bucket, "remove", ([src_key],))
+
+def transfer_object_steps(src_bucket: str, src_key: str, dst_bucket: str, dst_key: str, move: bool = False,
+                          overwrite: bool = False) -> Steps:
+    """Copy or move a single object.
+
+    Uses the storage API's native copy/move (with destinationBucket across
+    buckets) so no bytes pass through this process. Servers that refuse a
+    cross-bucket copy get the object streamed from one bucket into the other.
+
+    With `overwrite` an existing destination is replaced, but only once the new
+    data sits next to it under a temporary key: native copy/move refuse to
+    replace a key, and removing it first would lose it if the copy then failed.
+    """
+    try:
+        yield from native_transfer_steps(src_bucket, src_key, dst_bucket, dst_key, move)
+        return
+    except Exception as ex:
+        if not overwrite or error_status(ex) != 409:
+            raise
+    temp_key = f"{dst_key}.{uuid.uuid4().hex[:12]}{TRANSFER_TEMP_SUFFIX}"
+    yield from native_transfer_steps(src_bucket, src_key, dst_bucket, temp_key)
+    try:
+        yield StorageOp(dst_bucket, "remove", ([dst_key],))
+    except Exception:
+        try:
+            yield StorageOp(dst_bucket, "remove", ([temp_key],))
+        except Exception:
+            pass
+        raise
+    try:
+        yield StorageOp(dst_bucket, "move", (temp_key, dst_key))
+    except Exception as ex:
+        # the old object is gone: keep the new data where it is rather than lose both
+        raise RuntimeError(f"replaced {dst_key} but could not move {temp_key} over it: {ex}") from ex
+    if move:
+        yield StorageOp(src_bucket, "remove", ([src_key],))
+
+def remove_keys(bucket: str, keys: List[str], job: Optional[Job] = None) -> Tuple[int, List[str]]:
+    """Remove keys in large batches; returns (deleted, errors)."""
+    return run_steps(remove_keys_steps(bucket, keys, job), job)
+
+def delete_prefix_recursive(bucket: str, prefix: str, job: Optional[Job] = None) -> Tuple[int, List[str]]:
+    """Delete everything under prefix (folder)."""
+    return run_steps(delete_prefix_steps(bucket, prefix, job), job)
+
+def transfer_object(src_bucket: str, src_key: str, dst_bucket: str, dst_key: str, move: bool = False,
+                    overwrite: bool = False, job: Optional[Job] = None):
+    """Copy or move a single object (see transfer_object_steps); each call is retried on its own."""
+    run_steps(transfer_object_steps(src_bucket, src_key, dst_bucket, dst_key, move, overwrite), job)
+
+def copy_file(src_bucket: str, src_key: str, dst_bucket: str, dst_key: str):
+    """Copy single file (server-side when possible)."""
+    transfer_object(src_bucket, src_key, dst_bucket, dst_key)
+
+def transfer_folder_item_steps(src_bucket: str, src_key: str, dst_bucket: str, dst_key: str, e: Dict[str, Any],
+                               move: bool, job: Optional[Job] = None) -> Steps:
+    """One object of transfer_folder_steps; returns an error message or None."""
+    check_cancelled(job)
+    try:
+        yield from transfer_object_steps(src_bucket, src_key, dst_bucket, dst_key, move)
+    except Exception as ex:
+        return f"{src_key} -> {dst_key}: {ex}"
+    if job:
+        job.advance(1, entry_size(e))
+    return None
+
+def transfer_folder_steps(src_bucket: str, src_prefix: str, dst_bucket: str, dst_prefix: str,
+                          move: bool = False, job: Optional[Job] = None) -> Steps:
+    """Copy or move all contents of a folder (unjournaled); returns (done, errors)."""
+    src_prefix = (src_prefix or "").strip("/")
+    dst_prefix = (dst_prefix or "").strip("/")
+    objects = yield from walk_steps(src_bucket, src_prefix)
+    if job:
+        job.set_total(len(objects), sum(entry_size(e) for _, e in objects))
+    if not objects:
+        # nothing to copy: still create the folder so it shows up at the target
+        try:
+            yield StorageOp(dst_bucket, "upload", (join_path(dst_prefix, ".keep"), b""))
+        except Exception:
+            pass
+        return 0, []
+    errors = yield from each_steps(
+        lambda item: transfer_folder_item_steps(src_bucket, item[0], dst_bucket,
+                                                join_path(dst_prefix, item[0][len(src_prefix):]), item[1], move, job),
+        objects, BULK_MAX_CONCURRENCY)
+    return sum(1 for err in errors if err is None), [err for err in errors if err]
+
+def transfer_folder(src_bucket: str, src_prefix: str, dst_bucket: str, dst_prefix: str,
+                    move: bool = False, job: Optional[Job] = None) -> Tuple[int, List[str]]:
+    """Copy or move all contents of a folder (see transfer_folder_steps)."""
+    return run_steps(transfer_folder_steps(src_bucket, src_prefix, dst_bucket, dst_prefix, move, job), job)
+
+def copy_folder_recursive(src_bucket: str, src_prefix: str, dst_bucket: str, dst_prefix: str) -> Tuple[int, List[str]]:
+    """Copy all contents of a folder recursively."""
+    return transfer_folder(src_bucket, src_prefix, dst_bucket, dst_prefix)
+
+def entry_etag(e: Dict[str, Any]) -> Optional[str]:
+    meta = e.get("metadata") or {}
+    etag = meta.get("eTag") if isinstance(meta, dict) else None
+    return etag.strip('"') if etag else None
+
+def objects_differ(src: Dict[str, Any], dst: Dict[str, Any]) -> bool:
+    """True unless dst looks like a copy of src: same size and eTag (or newer, without eTags)."""
+    if entry_size(src) != entry_size(dst):
+        return True
+    src_etag, dst_etag = entry_etag(src), entry_etag(dst)
+    if src_etag and dst_etag:
+        return src_etag != dst_etag
+    return (src.get("updated_at") or "") > (dst.get("updated_at") or "")
+
+@dataclass
+class SyncPlan:
+    copy: List[Tuple[str, str, Dict[str, Any], bool]]  # (src key, dst key, src entry, replaces an existing object)
+    delete: List[str]  # destination keys with no source counterpart
+    skipped: int
+
+def plan_sync(src_objects: List[Tuple[str, Dict[str, Any]]], src_prefix: str,
+              dst_objects: List[Tuple[str, Dict[str, Any]]], dst_prefix: str,
+              delete_extra: bool = False) -> SyncPlan:
+    """Diff two listings by path relative to their prefixes."""
+    def _rel(key: str, prefix: str) -> str:
+        return key[len(prefix) + 1:] if prefix else key
+
+    dst = {_rel(k, dst_prefix): e for k, e in dst_objects}
+    plan = SyncPlan([], [], 0)
+    seen = set()
+    for key, e in src_objects:
+        rel = _rel(key, src_prefix)
+        seen.add(rel)
+        existing = dst.get(rel)
+        if existing is not None and not objects_differ(e, existing):
+            plan.skipped += 1
+        else:
+            plan.copy.append((key, join_path(dst_prefix, rel), e, existing is not None))
+    if delete_extra:
+        plan.delete = [join_path(dst_prefix, rel) for rel in dst if rel not in seen]
+    return plan
+
+def sync_copy_steps(src_bucket: str, dst_bucket: str, item: Tuple[str, str, Dict[str, Any], bool],
+                    job: Optional[Job] = None) -> Steps:
+    """One copy of a SyncPlan; returns an error message or None."""
+    check_cancelled(job)
+    src_key, dst_key, e, replace = item
+    try:
+        yield from transfer_object_steps(src_bucket, src_key, dst_bucket, dst_key, overwrite=replace)
+    except Exception as ex:
+        return f"{src_key} -> {dst_key}: {ex}"
+    if job:
+        job.advance(1, entry_size(e))
+    return None
+
+def sync_folder_steps(src_bucket: str, src_prefix: str, dst_bucket: str, dst_prefix: str,
+                      delete_extra: bool = False, job: Optional[Job] = None) -> Steps:
+    """Make dst_prefix match src_prefix, copying only new or changed objects.
+
+    Returns ({copied, skipped, deleted, failed}, errors).
+    """
+    src_prefix = (src_prefix or "").strip("/")
+    dst_prefix = (dst_prefix or "").strip("/")
+    src_walk = yield Spawn(walk_steps(src_bucket, src_prefix))
+    dst_objects = yield from walk_steps(dst_bucket, dst_prefix)
+    plan = plan_sync((yield Join(src_walk)), src_prefix, dst_objects, dst_prefix, delete_extra)
+    if job:
+        job.set_total(len(plan.copy) + len(plan.delete), sum(entry_size(e) for _, _, e, _ in plan.copy))
+    results = yield from each_steps(lambda item: sync_copy_steps(src_bucket, dst_bucket, item, job),
+                                    plan.copy, BULK_MAX_CONCURRENCY)
+    errors = [err for err in results if err]
+    copied = len(plan.copy) - len(errors)
+    deleted = 0
+    if plan.delete:
+        deleted, del_errors = yield from remove_keys_steps(dst_bucket, plan.delete, job)
+        errors.extend(del_errors)
+    summary = {"copied": copied, "skipped": plan.skipped, "deleted": deleted,
+               "failed": len(plan.copy) - copied + len(plan.delete) - deleted}
+    return summary, errors
+
+def sync_folder(src_bucket: str, src_prefix: str, dst_bucket: str, dst_prefix: str,
+                delete_extra: bool = False, job: Optional[Job] = None) -> Tuple[Dict[str, int], List[str]]:
+    """Make dst_prefix match src_prefix (see sync_folder_steps)."""
+    return run_steps(sync_folder_steps(src_bucket, src_prefix, dst_bucket, dst_prefix, delete_extra, job), job)
+
+def prefixes_overlap(a: str, b: str) -> bool:
+    """True if one folder contains the other ('' is the bucket root)."""
+    return not a or not b or (a + "/").startswith(b + "/") or (b + "/").startswith(a + "/")
+
+def sync_message(src: str, dst: str, summary: Dict[str, int], errors: List[str]) -> str:
+    text = (f"Synced '{src}' → '{dst}': {summary['copied']} copied, {summary['skipped']} unchanged, "
+            f"{summary['deleted']} deleted")
+    if errors:
+        return f"{text}, {summary['failed']} failed (showing first 3): {errors[:3]}"
+    return text + "."
+
+def remove_listed_steps(bucket: str, batch: List[Tuple[str, int]], job: Optional[Job] = None) -> Steps:
+    check_cancelled(job)
+    resp = yield StorageOp(bucket, "remove", ([key for key, _ in batch],))
+    if job:
+        job.advance(len(batch), sum(size for _, size in batch))
+    return len(resp or [])
+
+def remove_as_listed_steps(bucket: str, prefix: str, job: Optional[Job] = None) -> Steps:
+    """One pass over everything under prefix, removing keys in REMOVE_BATCH_SIZE batches
+    while listing continues; returns (listed, removed, errors).
+
+    At most BULK_MAX_CONCURRENCY batches are in flight, so memory stays flat
+    however big the bucket is. Keyset (list-v2) pages are unaffected by the removals.
+    """
+    listed, listed_bytes, removed, errors = 0, 0, 0, []
+    done_before = job.objects_done if job else 0
+    bytes_before = job.bytes_done if job else 0
+    pending: deque = deque()
+
+    def _collect() -> Steps:
+        handle, batch = pending.popleft()
+        try:
+            return (yield Join(handle))
+        except Exception as ex:
+            errors.append(f"{len(batch)} objects starting at {batch[0][0]}: {ex}")
+            return 0
+
+    pages = object_pages_steps(bucket, prefix)
+    batch: List[Tuple[str, int]] = []
+    while True:
+        page = yield from next_output(pages)
+        if page is not END:
+            for key, e in page:
+                batch.append((key, entry_size(e)))
+                listed_bytes += entry_size(e)
+            listed += len(page)
+        while len(batch) >= REMOVE_BATCH_SIZE or (page is END and batch):
+            ready, batch = batch[:REMOVE_BATCH_SIZE], batch[REMOVE_BATCH_SIZE:]
+            if job and (job.objects_total or 0) < done_before + listed:
+                job.set_total(done_before + listed, bytes_before + listed_bytes)
+            pending.append(((yield Spawn(remove_listed_steps(bucket, ready, job))), ready))
+            while len(pending) > BULK_MAX_CONCURRENCY:
+                removed += yield from _collect()
+        if page is END:
+            break
+    while pending:
+        removed += yield from _collect()
+    return listed, removed, errors
+
+def remove_as_listed(bucket: str, prefix: str, job: Optional[Job] = None) -> Tuple[int, int, List[str]]:
+    """One pass over everything under prefix (see remove_as_listed_steps)."""
+    return run_steps(remove_as_listed_steps(bucket, prefix, job), job)
+
+def empty_bucket_steps(bucket: str, job: Optional[Job] = None) -> Steps:
+    """Remove every object in bucket and check that none are left; returns objects removed.
+
+    The server-side empty is tried first (one request when it works), then the
+    bucket is swept with remove_as_listed until a pass lists nothing, which is
+    the verification. Raises if objects remain after EMPTY_BUCKET_ROUNDS passes.
+    """
+    try:
+        yield StorageOp(None, "empty_bucket", (bucket,))
+    except Exception as ex:
+        app.logger.info("Server-side empty of bucket %r failed (%s); removing objects directly", bucket, ex)
+    index = yield BlockingCall(object_index.get, (bucket,))
+    if job and index:
+        job.set_total(*(yield BlockingCall(index.folder_stats, ("",))))
+    removed, errors = 0, []
+    for round_no in range(1, EMPTY_BUCKET_ROUNDS + 1):
+        listed, n, errors = yield from remove_as_listed_steps(bucket, "", job)
+        removed += n
+        if not listed:
+            return removed
+        app.logger.info("Emptying bucket %r, pass %d: removed %d of %d listed objects (%d errors)",
+                        bucket, round_no, n, listed, len(errors))
+    remaining = len((yield from walk_steps(bucket, "")))
+    if not remaining:
+        return removed
+    detail = f"; last errors: {errors[:3]}" if errors else ""
+    raise RuntimeError(f"Removed {removed} objects but {remaining} remain after "
+                       f"{EMPTY_BUCKET_ROUNDS} passes{detail}")
+
+def empty_bucket(bucket: str, job: Optional[Job] = None) -> int:
+    """Remove every object in bucket (see empty_bucket_steps)."""
+    return run_steps(empty_bucket_steps(bucket, job), job)
+
+# ---------------------- Caches ----------------------
+class ListingCache:
+    """LRU + TTL cache of list() pages, keyed by (bucket, prefix).
+
+    Each folder entry holds its pages by (limit, offset); bounded by folder count
+    and total cached rows. Mutations made by this app invalidate it explicitly.
+    """
+
+    def __init__(self, ttl: float, max_folders: int, max_rows: int):
+        self.ttl = ttl
+        self.max_folders = max_folders
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        self._rows = 0
+        self._data: "OrderedDict[Tuple[str, str], Tuple[float, Dict[Tuple[int, int], List[Dict[str, Any]]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, bucket: str, prefix: str, page: Tuple[int, int]) -> Optional[List[Dict[str, Any]]]:
+        key = (bucket, prefix)
+        with self._lock:
+            item = self._data.get(key)
+            if item and time.monotonic() - item[0] > self.ttl:
+                self._drop(key)
+                item = None
+            entries = item[1].get(page) if item else None
+            if entries is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entries
+
+    def put(self, bucket: str, prefix: str, page: Tuple[int, int], entries: List[Dict[str, Any]]):
+        key = (bucket, prefix)
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or time.monotonic() - item[0] > self.ttl:
+                if item is not None:
+                    self._drop(key)
+                item = (time.monotonic(), {})
+                self._data[key] = item
+            old = item[1].get(page)
+            self._rows += len(entries) - (len(old) if old else 0)
+            item[1][page] = entries
+            self._data.move_to_end(key)
+            while self._data and (len(self._data) > self.max_folders or self._rows > self.max_rows):
+                self._drop(next(iter(self._data)))
+
+    def invalidate(self, bucket: str, prefix: str):
+        with self._lock:
+            self._drop((bucket, prefix))
+
+    def invalidate_tree(self, bucket: str, prefix: str):
+        """Drop prefix and every folder below it ("" drops the whole bucket)."""
+        below = prefix + "/"
+        with self._lock:
+            for key in [k for k in self._data if k[0] == bucket and (
+                    not prefix or k[1] == prefix or k[1].startswith(below))]:
+                self._drop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "folders": len(self._data), "rows": self._rows}
+
+    def _drop(self, key: Tuple[str, str]):
+        item = self._data.pop(key, None)
+        if item:
+            self._rows -= sum(len(v) for v in item[1].values())
+
+class BucketCatalog:
+    """Cached bucket names.
+
+    Refreshed explicitly after this app creates/deletes a bucket and by a daemon
+    thread every `interval` seconds; readers only wait on the very first load.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._names: Optional[List[str]] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def names(self) -> List[str]:
+        self._start()
+        if self._names is None:
+            return self.refresh()
+        return list(self._names)
+
+    def refresh(self) -> List[str]:
+        with self._lock:
+            self._names = fetch_bucket_names()
+            return list(self._names)
+
+    def _start(self):
+        # a forked worker inherits the thread object but not the thread
+        if (self._thread is None or not self._thread.is_alive()) and self.interval > 0:
+            self._thread = threading.Thread(target=self._loop, name="bucket-catalog", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as ex:
+                app.logger.warning("Bucket catalog refresh failed: %s", ex)
+            time.sleep(self.interval)
+
+bucket_catalog = BucketCatalog(BUCKET_REFRESH_SECONDS)
+
+listing_cache = ListingCache(LISTING_CACHE_TTL, LISTING_CACHE_MAX_FOLDERS, LISTING_CACHE_MAX_ROWS)
+
+# Called with (bucket, path, recursive, entry) after every mutation made through this app
+change_listeners: List[Callable[[str, str, bool, Any], None]] = []
+UNKNOWN = object()  # notify_changed(): the object's new state has to be looked up
+
+def notify_changed(bucket: str, path: str, recursive: bool = False, entry: Any = UNKNOWN):
+    """Record that the object at path (or the whole folder, if recursive) changed.
+
+    `entry` is the object's new state when the caller knows it (see written_entry;
+    None if it was removed), so listeners need not list it back.
+    """
+    path = (path or "").strip("/")
+    for listener in change_listeners:
+        listener(bucket, path, recursive, entry)
+
+def copied_entry(bucket: str, key: str) -> Any:
+    """written_entry() for a copy of key, from the bucket's object index (UNKNOWN without one)."""
+    index = object_index.built(bucket)
+    e = index.entry(key) if index else None
+    return written_entry(entry_size(e), e["metadata"]["eTag"]) if e else UNKNOWN
+
+def written_entry(size: int, etag: Optional[str] = None) -> Dict[str, Any]:
+    """A list()-style entry for an object this app just wrote, for notify_changed."""
+    return {"metadata": {"size": size, "eTag": etag}, "updated_at": datetime.now(timezone.utc).isoformat()}
+
+def lookup_entry(bucket: str, key: str) -> Optional[Dict[str, Any]]:
+    """The list() entry of one object, or None if it does not exist."""
+    parent, _, name = key.rpartition("/")
+    # a search scoped to the parent folder finds the one entry in a single request
+    entries = sb.storage.from_(bucket).list(parent, {"limit": LIST_PAGE_SIZE, "offset": 0, "search": name}) or []
+    return next((e for e in entries if e.get("name") == name and not is_folder_entry(e)), None)
+
+def _invalidate_listings(bucket: str, path: str, recursive: bool, entry: Any):
+    if recursive:
+        listing_cache.invalidate_tree(bucket, path)
+    # the parent listing changes, and ancestors may gain or lose a folder row
+    parts = split_path(path)
+    for i in range(len(parts)):
+        listing_cache.invalidate(bucket, "/".join(parts[:i]))
+
+change_listeners.append(_invalidate_listings)
+
+@dataclass
+class CachedObject:
+    path: str  # file under the cache directory
+    size: int
+    etag: Optional[str]  # as sent by Storage, quotes included
+    content_type: Optional[str]
+    last_modified: Optional[str]
+    cache_control: Optional[str]
+    validated_at: float
+
+def etag_value(tag: Optional[str]) -> str:
+    """ETag without quotes/weak prefix, for comparing download headers with info()."""
+    return (unquote_etag(tag)[0] or "") if tag else ""
+
+class DownloadCache:
+    """Byte-bounded LRU of whole objects on local disk, served by the download route.
+
+    Entries are checked against Storage (info() ETag) once older than `revalidate`
+    seconds, so hot objects are served without any Storage call in between, and are
+    dropped at once by this app's own mutations. Concurrent misses for one object
+    share a single upstream fetch. Each process keeps its own subdirectory.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, max_object: int, revalidate: float):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_object = min(max_object, max_bytes)
+        self.revalidate = revalidate
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._data: "OrderedDict[Tuple[str, str], CachedObject]" = OrderedDict()
+        # objects seen to be too large, so misses don't fetch them twice
+        self._uncacheable: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self._fills: Dict[Tuple[str, str], threading.Lock] = {}
+        self._stale: set = set()  # fills in progress invalidated meanwhile
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, bucket: str, key: str) -> Optional[CachedObject]:
+        """The cached copy of an object, fetched on a miss; None if it can't be cached
+        (too large, not found, ...), in which case the caller streams it as usual."""
+        k = (bucket, key)
+        entry = self._lookup(k)
+        if entry is not None:
+            return entry
+        with self._lock:
+            self.misses += 1
+            if k in self._uncacheable:
+                return None
+            fill = self._fills.setdefault(k, threading.Lock())
+        try:
+            with fill:
+                # another request may have filled it while this one waited
+                return self._lookup(k, count=False) or self._fill(k)
+        finally:
+            with self._lock:
+                if self._fills.get(k) is fill:
+                    del self._fills[k]
+                    self._stale.discard(k)
+
+    def invalidate(self, bucket: str, path: str, recursive: bool):
+        def _matches(k: Tuple[str, str]) -> bool:
+            return k[0] == bucket and (k[1] == path or (recursive and (not path or k[1].startswith(path + "/"))))
+
+        with self._lock:
+            for k in [k for k in self._data if _matches(k)]:
+                self._drop(k)
+            for k in [k for k in self._uncacheable if _matches(k)]:
+                del self._uncacheable[k]
+            self._stale.update(k for k in self._fills if _matches(k))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "objects": len(self._data),
+                    "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+    def _lookup(self, k: Tuple[str, str], count: bool = True) -> Optional[CachedObject]:
+        with self._lock:
+            self._check_pid()
+            entry = self._data.get(k)
+            if entry is None:
+                return None
+            self._data.move_to_end(k)
+            fresh = time.monotonic() - entry.validated_at < self.revalidate
+        if not fresh:
+            try:
+                current = etag_value((sb.storage.from_(k[0]).info(k[1]) or {}).get("etag"))
+            except Exception:
+                current = None
+            with self._lock:
+                if not current or current != etag_value(entry.etag):
+                    if self._data.get(k) is entry:
+                        self._drop(k)
+                    return None
+                entry.validated_at = time.monotonic()
+        if count:
+            with self._lock:
+                self.hits += 1
+        return entry
+
+    def _fill(self, k: Tuple[str, str]) -> Optional[CachedObject]:
+        upstream = open_object_stream(k[0], k[1], {"Accept-Encoding": "identity"})
+        try:
+            if upstream.status_code != 200:
+                return None
+            length = int(upstream.headers.get("Content-Length") or -1)
+            if not 0 <= length <= self.max_object:
+                with self._lock:
+                    self._uncacheable[k] = None
+                    while len(self._uncacheable) > 10000:
+                        self._uncacheable.popitem(last=False)
+                return None
+            fd, tmp = tempfile.mkstemp(dir=self._dir(), suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as fh:
+                    for chunk in upstream.iter_raw(DOWNLOAD_CHUNK_SIZE):
+                        fh.write(chunk)
+                path = tmp[:-len(".part")]
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        finally:
+            upstream.close()
+        headers = upstream.headers
+        entry = CachedObject(path, os.path.getsize(path), headers.get("ETag"), headers.get("Content-Type"),
+                             headers.get("Last-Modified"), headers.get("Cache-Control"), time.monotonic())
+        with self._lock:
+            if k in self._stale or self._pid != os.getpid():
+                os.unlink(path)
+                return None
+            self._drop(k)
+            self._data[k] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes and len(self._data) > 1:
+                self._drop(next(iter(self._data)))
+        return entry
+
+    def _drop(self, k: Tuple[str, str]):
+        entry = self._data.pop(k, None)
+        if entry is not None:
+            self._bytes -= entry.size
+            try:
+                # responses already sending the file keep their open handle
+                os.unlink(entry.path)
+            except OSError:
+                pass
+
+    def _check_pid(self):
+        # a forked worker must not share (and evict) its parent's files
+        if self._pid != os.getpid():
+            self._data.clear()
+            self._bytes = 0
+            self._pid = os.getpid()
+
+    def _dir(self) -> str:
+        path = os.path.join(self.directory, str(os.getpid()))
+        if not os.path.isdir(path):
+            os.makedirs(path, exist_ok=True)
+            # clear directories left behind by processes that are gone
+            for name in os.listdir(self.directory):
+                if name.isdigit() and int(name) != os.getpid() and not pid_alive(int(name)):
+                    shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+        return path
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+download_cache = DownloadCache(DOWNLOAD_CACHE_DIR, DOWNLOAD_CACHE_MAX_BYTES, DOWNLOAD_CACHE_MAX_OBJECT,
+                               DOWNLOAD_CACHE_REVALIDATE)
+
+def _invalidate_downloads(bucket: str, path: str, recursive: bool, entry: Any):
+    if download_cache.enabled:
+        download_cache.invalidate(bucket, path, recursive)
+
+change_listeners.append(_invalidate_downloads)
+
+# ---------------------- Jobs ----------------------
+class JobCancelled(Exception):
+    pass
+
+@dataclass
+class Job:
+    """A long-running bulk operation executed by `job_runner`."""
+    id: str
+    kind: str
+    description: str
+    status: str = "queued"  # queued | running | done | failed | cancelled
+    objects_total: Optional[int] = None
+    objects_done: int = 0
+    bytes_total: Optional[int] = None
+    bytes_done: int = 0
+    errors: List[str] = field(default_factory=list)
+    message: str = ""
+    transfer_id: Optional[str] = None  # journal entry of folder copies/moves (see TransferJournal)
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    _cancel: threading.Event = field(default_factory=threading.Event, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def sleep(self, seconds: float):
+        """Wait up to `seconds`, raising JobCancelled as soon as the job is cancelled."""
+        self._cancel.wait(seconds)
+        check_cancelled(self)
+
+    def set_total(self, objects: int, nbytes: Optional[int] = None):
+        with self._lock:
+            self.objects_total, self.bytes_total = objects, nbytes
+
+    def advance(self, objects: int = 1, nbytes: int = 0):
+        with self._lock:
+            self.objects_done += objects
+            self.bytes_done += nbytes
+
+    def eta(self) -> Optional[float]:
+        if self.status != "running" or not self.started_at or not self.objects_total or not self.objects_done:
+            return None
+        rate = self.objects_done / max(time.time() - self.started_at, 1e-6)
+        return max(self.objects_total - self.objects_done, 0) / rate
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "id": self.id, "kind": self.kind, "description": self.description,
+                "status": self.status, "message": self.message,
+                "objects_done": self.objects_done, "objects_total": self.objects_total,
+                "bytes_done": self.bytes_done, "bytes_total": self.bytes_total,
+                "errors": self.errors[:20], "error_count": len(self.errors),
+                "eta_seconds": self.eta(), "transfer_id": self.transfer_id,
+                "created_at": self.created_at, "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+def check_cancelled(job: Optional[Job]):
+    if job is not None and job.cancelled:
+        raise JobCancelled()
+
+class JobRunner:
+    """Runs jobs on a thread pool and keeps the most recent ones for polling."""
+
+    def __init__(self, workers: int, history: int):
+        self.workers = workers
+        self.history = history
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, description: str, fn: Callable[[Job], str]) -> Job:
+        """Queue fn(job); its return value becomes the job's final message."""
+        job = self.add(kind, description)
+        self._pool.submit(self._run, job, fn)
+        return job
+
+    def add(self, kind: str, description: str) -> Job:
+        """Register a job that is run elsewhere (see `running`), e.g. on an event loop."""
+        job = Job(uuid.uuid4().hex, kind, description)
+        with self._lock:
+            self._jobs[job.id] = job
+            finished = [j for j in self._jobs.values() if j.finished_at]
+            for old in finished[:max(len(finished) - self.history, 0)]:
+                del self._jobs[old.id]
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def after_fork(self):
+        """In a forked child: the parent's jobs do not run here, and its pool has no threads."""
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job:
+            job._cancel.set()
+        return job
+
+    def _run(self, job: Job, fn: Callable[[Job], str]):
+        with self.running(job):
+            job.message = fn(job)
+
+    @contextmanager
+    def running(self, job: Job):
+        """Status bookkeeping around a job body; the body sets job.message."""
+        job.started_at = time.time()
+        job.status = "running"
+        try:
+            check_cancelled(job)
+            yield job
+            job.status = "done"
+        except JobCancelled:
+            job.status = "cancelled"
+            job.message = f"{job.description}: cancelled after {job.objects_done} objects."
+        except Exception as ex:
+            app.logger.exception("Job %s failed", job.id)
+            job.status = "failed"
+            job.message = f"{job.description} failed: {ex}"
+        finally:
+            job.finished_at = time.time()
+
+job_runner = JobRunner(JOB_WORKERS, JOB_HISTORY)
+
+# ---------------------- Object index ----------------------
+class ObjectIndex:
+    """SQLite index of every object in one bucket.
+
+    `folders` keeps recursive object/byte totals for every folder prefix ("" is
+    the bucket root), maintained on each insert/delete, so folder sizes and
+    listings are single indexed lookups instead of tree walks.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS objects (
+        key TEXT PRIMARY KEY, parent TEXT NOT NULL, name TEXT NOT NULL,
+        size INTEGER NOT NULL, etag TEXT, updated_at TEXT
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS objects_parent ON objects(parent, name);
+    CREATE TABLE IF NOT EXISTS folders (
+        path TEXT PRIMARY KEY, parent TEXT NOT NULL, name TEXT NOT NULL,
+        objects INTEGER NOT NULL, bytes INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS folders_parent ON folders(parent, name);
+    CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT);
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self.SCHEMA)
+
+    @property
+    def ready(self) -> bool:
+        return self.meta("built_at") is not None
+
+    def meta(self, k: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT v FROM meta WHERE k=?", (k,)).fetchone()
+        return row[0] if row else None
+
+    def replace_all(self, objects: List[Tuple[str, Dict[str, Any]]]):
+        """Swap in a complete crawl of the bucket."""
+        with self._lock, self._db:
+            self._db.execute("BEGIN")
+            self._db.execute("DELETE FROM objects")
+            self._db.execute("DELETE FROM folders")
+            for key, e in objects:
+                self._insert(key, e)
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('built_at', ?)", (str(time.time()),))
+
+    def replace_prefix(self, prefix: str, objects: List[Tuple[str, Dict[str, Any]]]):
+        """Replace everything at/under prefix with a fresh crawl of it."""
+        with self._lock, self._db:
+            self._db.execute("BEGIN")
+            if prefix:
+                # "0" sorts right after "/", so this range is exactly the keys below prefix
+                rows = self._db.execute("SELECT key FROM objects WHERE key = ? OR (key > ? AND key < ?)",
+                                        (prefix, prefix + "/", prefix + "0")).fetchall()
+            else:
+                rows = self._db.execute("SELECT key FROM objects").fetchall()
+            for (key,) in rows:
+                self._delete(key)
+            for key, e in objects:
+                self._insert(key, e)
+
+    def upsert(self, key: str, e: Optional[Dict[str, Any]]):
+        """Record the current state of one key (None = it no longer exists)."""
+        with self._lock, self._db:
+            self._db.execute("BEGIN")
+            self._delete(key)
+            if e is not None:
+                self._insert(key, e)
+
+    def keys(self, prefix: str = "") -> List[str]:
+        with self._lock:
+            if not prefix:
+                return [k for (k,) in self._db.execute("SELECT key FROM objects")]
+            return [k for (k,) in self._db.execute(
+                "SELECT key FROM objects WHERE key = ? OR (key > ? AND key < ?)",
+                (prefix, prefix + "/", prefix + "0"))]
+
+    def entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """The indexed object as a list()-style entry, or None."""
+        with self._lock:
+            row = self._db.execute("SELECT size, etag, updated_at FROM objects WHERE key=?", (key,)).fetchone()
+        return {"metadata": {"size": row[0], "eTag": row[1]}, "updated_at": row[2]} if row else None
+
+    def folder_stats(self, prefix: str) -> Tuple[int, int]:
+        with self._lock:
+            row = self._db.execute("SELECT objects, bytes FROM folders WHERE path=?", (prefix,)).fetchone()
+        return (row[0], row[1]) if row else (0, 0)
+
+    def list_page(self, prefix: str, limit: int, offset: int) -> Tuple[List[Item], List[Item], Optional[str]]:
+        """Same contract as list_items: one name-ordered page of folders and files."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT name, 1, bytes, NULL, objects FROM folders WHERE parent = ? AND path != '' "
+                "UNION ALL SELECT name, 0, size, updated_at, NULL FROM objects WHERE parent = ? "
+                "ORDER BY 1 LIMIT ? OFFSET ?",
+                (prefix, prefix, limit, offset),
+            ).fetchall()
+        folders = [Item(n, True, size, None, count) for n, f, size, _, count in rows if f]
+        files = [Item(n, False, size, updated) for n, f, size, updated, _ in rows if not f]
+        next_cursor = str(offset + len(rows)) if len(rows) >= limit else None
+        return folders, files, next_cursor
+
+    def _insert(self, key: str, e: Dict[str, Any]):
+        meta = e.get("metadata") or {}
+        size = entry_size(e)
+        parts = split_path(key)
+        self._db.execute(
+            "INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?, ?)",
+            ("/".join(parts), "/".join(parts[:-1]), parts[-1], size,
+             meta.get("eTag") if isinstance(meta, dict) else None, e.get("updated_at")),
+        )
+        for i in range(len(parts)):
+            path = "/".join(parts[:i])
+            self._db.execute(
+                "INSERT INTO folders VALUES (?, ?, ?, 1, ?) ON CONFLICT(path) DO UPDATE "
+                "SET objects = objects + 1, bytes = bytes + excluded.bytes",
+                (path, "/".join(parts[:i - 1]) if i else "", parts[i - 1] if i else "", size),
+            )
+
+    def _delete(self, key: str):
+        row = self._db.execute("SELECT size FROM objects WHERE key=?", (key,)).fetchone()
+        if not row:
+            return
+        self._db.execute("DELETE FROM objects WHERE key=?", (key,))
+        parts = split_path(key)
+        for i in range(len(parts)):
+            path = "/".join(parts[:i])
+            self._db.execute("UPDATE folders SET objects = objects - 1, bytes = bytes - ? WHERE path=?",
+                             (row[0], path))
+            self._db.execute("DELETE FROM folders WHERE path=? AND objects <= 0", (path,))
+
+class ObjectIndexes:
+    """Opens one ObjectIndex per bucket on demand, and keeps them current.
+
+    Recursive changes are recrawled on a background thread rather than in the
+    request that made them; until a recrawl lands, get() turns down the folders
+    it touches so callers list live. Single-key changes made while a crawl is
+    running are replayed over its result, which may predate them.
+    """
+
+    def __init__(self, directory: str, max_age: float):
+        self.directory = directory
+        self.max_age = max_age
+        self._indexes: Dict[str, ObjectIndex] = {}
+        self._lock = threading.Lock()
+        self._queued: set = set()  # (bucket, prefix) recrawls not started yet
+        self._stale: Dict[str, Dict[str, int]] = {}  # bucket -> {prefix: recrawls pending after a change}
+        self._crawling: Dict[str, int] = {}  # bucket -> recrawls queued or running
+        self._touched: Dict[str, Dict[str, Any]] = {}  # bucket -> {key: entry} changed while crawling
+
+    def after_fork(self):
+        """In a forked child: drop the parent's connections (unclosed, they are still its)
+        and its crawl bookkeeping; crawls it queued run in the parent, on the same files."""
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self._queued, self._stale, self._crawling, self._touched = set(), {}, {}, {}
+
+    def _file(self, bucket: str) -> str:
+        safe = re.sub(r"[^A-Za-z0-9._-]", "_", bucket)
+        digest = hashlib.sha1(bucket.encode("utf-8")).hexdigest()[:8]
+        return os.path.join(self.directory, f"{safe}-{digest}.sqlite3")
+
+    def open(self, bucket: str) -> ObjectIndex:
+        with self._lock:
+            index = self._indexes.get(bucket)
+            if index is None:
+                os.makedirs(self.directory, exist_ok=True)
+                index = self._indexes[bucket] = ObjectIndex(self._file(bucket))
+            return index
+
+    def built(self, bucket: str) -> Optional[ObjectIndex]:
+        """The bucket's index if it has been built, however old, else None."""
+        if bucket not in self._indexes and not os.path.exists(self._file(bucket)):
+            return None
+        index = self.open(bucket)
+        return index if index.ready else None
+
+    def get(self, bucket: str, prefix: str = "") -> Optional[ObjectIndex]:
+        """The bucket's index if it can answer for prefix ("" = the whole bucket), else None.
+
+        None when it is older than max_age, or while a recrawl after a change at,
+        above or below prefix is pending (listings and folder totals there may be
+        out of date).
+        """
+        index = self.built(bucket)
+        if index is None:
+            return None
+        age = time.time() - float(index.meta("built_at"))
+        if age > self.max_age / 2:
+            self.recrawl(bucket, "", stale=False)
+        if age > self.max_age:
+            return None
+        with self._lock:
+            if any(prefixes_overlap(prefix, p) for p in self._stale.get(bucket, ())):
+                return None
+        return index
+
+    def recrawl(self, bucket: str, prefix: str, stale: bool = True):
+        """Re-list prefix ("" = the whole bucket, which also renews built_at) into the
+        index in the background. `stale`: the index is known to be wrong there until then."""
+        with self._lock:
+            if stale:
+                pending = self._stale.setdefault(bucket, {})
+                pending[prefix] = pending.get(prefix, 0) + 1
+            elif (bucket, prefix) in self._queued:
+                return
+            self._queued.add((bucket, prefix))
+            self._crawling[bucket] = self._crawling.get(bucket, 0) + 1
+        index_refresher.submit(self._recrawl, bucket, prefix, stale)
+
+    def touched(self, bucket: str, key: str, entry: Optional[Dict[str, Any]]):
+        """Note a single-key change, to replay over any crawl already running."""
+        with self._lock:
+            if self._crawling.get(bucket):
+                self._touched.setdefault(bucket, {})[key] = entry
+
+    def _recrawl(self, bucket: str, prefix: str, stale: bool):
+        with self._lock:
+            self._queued.discard((bucket, prefix))
+        try:
+            index = self.built(bucket)
+            if index is not None:
+                objects = walk_objects(bucket, prefix)
+                if prefix:
+                    index.replace_prefix(prefix, objects)
+                else:
+                    index.replace_all(objects)
+                with self._lock:
+                    replay = [(k, e) for k, e in self._touched.get(bucket, {}).items()
+                              if prefixes_overlap(prefix, k)]
+                for key, e in replay:
+                    index.upsert(key, e)
+        except Exception as ex:
+            app.logger.warning("Object index recrawl of %s/%s failed: %s", bucket, prefix, ex)
+        finally:
+            with self._lock:
+                if stale:
+                    pending = self._stale[bucket]
+                    pending[prefix] -= 1
+                    if not pending[prefix]:
+                        del pending[prefix]
+                self._crawling[bucket] -= 1
+                if not self._crawling[bucket]:
+                    del self._crawling[bucket]
+                    self._touched.pop(bucket, None)
+
+    def drop(self, bucket: str):
+        with self._lock:
+            index = self._indexes.pop(bucket, None)
+            if index:
+                index._db.close()
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(self._file(bucket) + suffix)
+                except OSError:
+                    pass
+
+# recrawls for the object and search indexes, one at a time and in the order they were asked for
+index_refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-refresh")
+object_index = ObjectIndexes(OBJECT_INDEX_DIR, OBJECT_INDEX_MAX_AGE)
+
+def build_object_index(bucket: str, job: Optional[Job] = None) -> str:
+    objects = walk_objects(bucket, "")
+    object_index.open(bucket).replace_all(objects)
+    if job:
+        job.set_total(len(objects), sum(entry_size(e) for _, e in objects))
+        job.advance(len(objects), job.bytes_total or 0)
+    return f"Indexed {len(objects)} objects in '{bucket}'."
+
+def _update_object_index(bucket: str, path: str, recursive: bool, entry: Any):
+    index = object_index.built(bucket)
+    if not index:
+        return
+    if recursive:
+        object_index.recrawl(bucket, path)
+        return
+    try:
+        if entry is UNKNOWN:
+            entry = lookup_entry(bucket, path)
+        index.upsert(path, entry)
+        object_index.touched(bucket, path, entry)
+    except Exception as ex:
+        app.logger.warning("Object index update for %s/%s failed: %s", bucket, path, ex)
+
+change_listeners.append(_update_object_index)
+
+# ---------------------- Transfer journal ----------------------
+class TransferJournal:
+    """SQLite journal of folder copies and moves.
+
+    A transfer's keys are planned first; each object is then marked copied and,
+    for moves, done as soon as its source is removed. Resuming an interrupted
+    transfer picks up the keys that are not done, so finished objects are never
+    transferred again.
+    """
+
+    PLANNED, COPIED, DONE = 0, 1, 2
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS transfers (
+        id TEXT PRIMARY KEY, op TEXT NOT NULL,
+        src_bucket TEXT NOT NULL, src_prefix TEXT NOT NULL,
+        dst_bucket TEXT NOT NULL, dst_prefix TEXT NOT NULL,
+        status TEXT NOT NULL,  -- planning | running | interrupted | failed | done
+        planned INTEGER, owner INTEGER, runs INTEGER NOT NULL DEFAULT 0,
+        created_at REAL NOT NULL, updated_at REAL NOT NULL, message TEXT
+    );
+    CREATE TABLE IF NOT EXISTS items (
+        transfer_id TEXT NOT NULL, key TEXT NOT NULL, size INTEGER NOT NULL,
+        state INTEGER NOT NULL DEFAULT 0, error TEXT,
+        PRIMARY KEY (transfer_id, key)
+    ) WITHOUT ROWID;
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._db: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._active: set = set()  # transfers running in this process
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        # opened lazily, and again in forked workers (connections must not cross a fork)
+        if self._db is None or self._pid != os.getpid():
+            os.makedirs(self.directory, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(self.directory, "journal.sqlite3"),
+                                       check_same_thread=False, isolation_level=None, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(self.SCHEMA)
+            self._pid = os.getpid()
+            self._active = set()
+        return self._db
+
+    def create(self, op: str, src_bucket: str, src_prefix: str, dst_bucket: str, dst_prefix: str) -> str:
+        transfer_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn().execute(
+                "INSERT INTO transfers (id, op, src_bucket, src_prefix, dst_bucket, dst_prefix, status, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 'planning', ?, ?)",
+                (transfer_id, op, src_bucket, src_prefix, dst_bucket, dst_prefix, now, now))
+        return transfer_id
+
+    def get(self, transfer_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            db = self._conn()
+            cur = db.execute("SELECT * FROM transfers WHERE id=?", (transfer_id,))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            out = dict(zip([c[0] for c in cur.description], row))
+            out["done"], out["done_bytes"], out["total_bytes"], out["failed"] = db.execute(
+                "SELECT COUNT(*) FILTER (WHERE state=2), COALESCE(SUM(size) FILTER (WHERE state=2), 0), "
+                "COALESCE(SUM(size), 0), COUNT(*) FILTER (WHERE error IS NOT NULL) "
+                "FROM items WHERE transfer_id=?", (transfer_id,)).fetchone()
+        out["running"] = self.running(out)
+        return out
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            ids = [r[0] for r in self._conn().execute(
+                "SELECT id FROM transfers WHERE status != 'done' ORDER BY created_at")]
+        return [t for t in (self.get(i) for i in ids) if t]
+
+    def running(self, t: Dict[str, Any]) -> bool:
+        """True while some live process is working on the transfer."""
+        if t["status"] not in ("planning", "running"):
+            return False
+        if t["owner"] == os.getpid():
+            return t["id"] in self._active
+        return bool(t["owner"]) and pid_alive(t["owner"])
+
+    def claim(self, transfer_id: str) -> Optional[Dict[str, Any]]:
+        """Take ownership of a transfer for this process; None if it is running elsewhere
+        (or here) or already done."""
+        t = self.get(transfer_id)
+        if t is None or t["status"] == "done" or self.running(t):
+            return None
+        with self._lock:
+            claimed = self._conn().execute(
+                "UPDATE transfers SET owner=?, runs=runs+1, updated_at=?, "
+                "status=CASE WHEN planned IS NULL THEN 'planning' ELSE 'running' END "
+                "WHERE id=? AND status=? AND owner IS ?",
+                (os.getpid(), time.time(), transfer_id, t["status"], t["owner"])).rowcount
+            if not claimed:
+                return None
+            self._active.add(transfer_id)
+        return self.get(transfer_id)
+
+    def release(self, transfer_id: str, status: str, message: str = ""):
+        with self._lock, self._conn() as db:
+            db.execute("BEGIN")
+            db.execute("UPDATE transfers SET status=?, message=?, updated_at=? WHERE id=?",
+                       (status, message, time.time(), transfer_id))
+            if status == "done":
+                db.execute("DELETE FROM items WHERE transfer_id=?", (transfer_id,))
+            self._active.discard(transfer_id)
+
+    def plan(self, transfer_id: str, items: List[Tuple[str, int]]):
+        """Record keys to transfer (idempotent, so an interrupted plan is just redone)."""
+        with self._lock, self._conn() as db:
+            db.execute("BEGIN")
+            db.executemany("INSERT OR IGNORE INTO items (transfer_id, key, size) VALUES (?, ?, ?)",
+                           [(transfer_id, key, size) for key, size in items])
+
+    def planned(self, transfer_id: str) -> int:
+        with self._lock, self._conn() as db:
+            db.execute("BEGIN")
+            n = db.execute("SELECT COUNT(*) FROM items WHERE transfer_id=?", (transfer_id,)).fetchone()[0]
+            db.execute("UPDATE transfers SET planned=?, status='running', updated_at=? WHERE id=?",
+                       (n, time.time(), transfer_id))
+        return n
+
+    def pending(self, transfer_id: str, after: str, limit: int) -> List[Tuple[str, int, int]]:
+        """Up to `limit` (key, size, state) not yet done, in key order after `after`."""
+        with self._lock:
+            return self._conn().execute(
+                "SELECT key, size, state FROM items WHERE transfer_id=? AND key > ? AND state < 2 "
+                "ORDER BY key LIMIT ?", (transfer_id, after, limit)).fetchall()
+
+    def mark(self, transfer_id: str, key: str, state: int, error: Optional[str] = None):
+        with self._lock:
+            self._conn().execute("UPDATE items SET state=?, error=? WHERE transfer_id=? AND key=?",
+                                 (state, error, transfer_id, key))
+
+transfer_journal = TransferJournal(TRANSFER_JOURNAL_DIR)
+
+def object_exists_steps(bucket: str, key: str) -> Steps:
+    try:
+        yield StorageOp(bucket, "info", (key,))
+        return True
+    except Exception as ex:
+        if error_status(ex) == 404:
+            return False
+        raise
+
+def transfer_item_steps(t: Dict[str, Any], item: Tuple[str, int, int], job: Job) -> Steps:
+    """Transfer one planned object of journal transfer t and record it; returns an error message or None."""
+    check_cancelled(job)
+    transfer_id, src_bucket, src_prefix, dst_bucket = t["id"], t["src_bucket"], t["src_prefix"], t["dst_bucket"]
+    move = t["op"] == "move"
+    # objects in flight when an earlier run stopped may already (partly) exist at the target
+    resumed = t["runs"] > 1
+    key, size, state = item
+    dst_key = join_path(t["dst_prefix"], key[len(src_prefix):])
+    try:
+        if move and src_bucket == dst_bucket:
+            try:
+                yield StorageOp(src_bucket, "move", (key, dst_key))
+            except Exception:
+                if not (resumed and not (yield from object_exists_steps(src_bucket, key))
+                        and (yield from object_exists_steps(dst_bucket, dst_key))):
+                    raise
+            state = TransferJournal.DONE
+        elif state == TransferJournal.PLANNED:
+            yield from transfer_object_steps(src_bucket, key, dst_bucket, dst_key, overwrite=resumed)
+            state = TransferJournal.COPIED if move else TransferJournal.DONE
+            yield BlockingCall(transfer_journal.mark, (transfer_id, key, state))
+        if state == TransferJournal.COPIED:
+            yield StorageOp(src_bucket, "remove", ([key],))
+            state = TransferJournal.DONE
+    except Exception as ex:
+        error = f"{key} -> {dst_key}: {ex}"
+        yield BlockingCall(transfer_journal.mark, (transfer_id, key, state, error))
+        return error
+    yield BlockingCall(transfer_journal.mark, (transfer_id, key, state))
+    job.advance(1, size)
+    return None
+
+def run_transfer_steps(transfer_id: str, job: Job) -> Steps:
+    """Carry out (or resume) a claimed journal transfer; returns (objects done, errors).
+
+    Objects already done are skipped. A move removes each source as soon as its
+    copy is confirmed, instead of after the whole tree. Journal reads and writes
+    are BlockingCalls, so the asyncio driver keeps them off the event loop.
+    """
+    t = yield BlockingCall(transfer_journal.get, (transfer_id,))
+    src_bucket, src_prefix, dst_bucket, dst_prefix = t["src_bucket"], t["src_prefix"], t["dst_bucket"], t["dst_prefix"]
+    if t["planned"] is None:
+        pages = object_pages_steps(src_bucket, src_prefix)
+        while True:
+            page = yield from next_output(pages)
+            if page is END:
+                break
+            check_cancelled(job)
+            yield BlockingCall(transfer_journal.plan, (transfer_id, [(key, entry_size(e)) for key, e in page]))
+        if not (yield BlockingCall(transfer_journal.planned, (transfer_id,))):
+            # nothing to copy: still create the folder so it shows up at the target
+            try:
+                yield StorageOp(dst_bucket, "upload", (join_path(dst_prefix, ".keep"), b""))
+            except Exception:
+                pass
+            if t["op"] == "move":
+                yield StorageOp(src_bucket, "remove", ([join_path(src_prefix, ".keep")],))
+            return 0, []
+        t = yield BlockingCall(transfer_journal.get, (transfer_id,))
+    job.set_total(t["planned"], t["total_bytes"])
+    job.advance(t["done"], t["done_bytes"])
+
+    errors: List[str] = []
+    after = ""
+    while True:
+        items = yield BlockingCall(transfer_journal.pending, (transfer_id, after, LIST_PAGE_SIZE))
+        if not items:
+            break
+        results = yield from each_steps(lambda item: transfer_item_steps(t, item, job), items, BULK_MAX_CONCURRENCY)
+        errors.extend(err for err in results if err)
+        after = items[-1][0]
+    return (yield BlockingCall(transfer_journal.get, (transfer_id,)))["done"], errors
+
+def run_transfer(transfer_id: str, job: Job) -> Tuple[int, List[str]]:
+    """Carry out (or resume) a claimed journal transfer (see run_transfer_steps)."""
+    return run_steps(run_transfer_steps(transfer_id, job), job)
+
+def transfer_description(t: Dict[str, Any]) -> str:
+    verb = "Move" if t["op"] == "move" else "Copy"
+    return f"{verb} '{t['src_bucket']}/{t['src_prefix']}' → '{t['dst_bucket']}/{t['dst_prefix']}'"
+
+def transfer_outcome(t: Dict[str, Any], done: int, errors: List[str]) -> Tuple[str, str]:
+    """(journal status, job message) for a journal transfer run that finished."""
+    verb = "Moved" if t["op"] == "move" else "Copied"
+    if errors:
+        return "failed", (f"{verb} {done} objects with some errors (showing first 3): {errors[:3]}; "
+                          f"resume to retry the rest.")
+    return "done", f"{verb} folder '{t['src_bucket']}/{t['src_prefix']}' → '{t['dst_bucket']}/{t['dst_prefix']}' ({done} objects)."
+
+def transfer_job(transfer_id: str) -> Callable[[Job], str]:
+    """Job body for a journal transfer: runs it and records how it ended."""
+
+    def _run(job: Job) -> str:
+        t = transfer_journal.get(transfer_id)
+        status, message = "interrupted", ""
+        try:
+            done, errors = run_transfer(transfer_id, job)
+            job.errors.extend(errors)
+            status, message = transfer_outcome(t, done, errors)
+            return message
+        except Exception as ex:
+            message = str(ex)
+            raise
+        finally:
+            transfer_journal.release(transfer_id, status, message)
+            notify_changed(t["dst_bucket"], t["dst_prefix"], recursive=True)
+            if t["op"] == "move":
+                notify_changed(t["src_bucket"], t["src_prefix"], recursive=True)
+
+    return _run
+
+def submit_transfer(transfer_id: str) -> Optional[Job]:
+    """Claim a journal transfer and run it as a job; None if it can't be claimed."""
+    t = transfer_journal.claim(transfer_id)
+    if t is None:
+        return None
+    job = job_runner.submit(t["op"], transfer_description(t), transfer_job(transfer_id))
+    job.transfer_id = transfer_id
+    return job
+
+# ---------------------- Search ----------------------
+def glob_tokens(pattern: str) -> Iterator[Tuple[str, str]]:
+    """Split a glob into ("*" | "?" | "[" | "literal", text) tokens.
+
+    A "[" with no closing "]" is a literal, as in fnmatch; for "[" tokens the
+    text is the class body without its brackets.
+    """
+    i, n = 0, len(pattern)
+    while i < n:
+        ch = pattern[i]
+        if ch in "*?":
+            yield ch, ch
+        elif ch == "[":
+            j = i + 1
+            if j < n and pattern[j] == "!":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 1
+            if j >= n:
+                yield "literal", ch
+            else:
+                yield "[", pattern[i + 1:j]
+                i = j
+        else:
+            yield "literal", ch
+        i += 1
+
+def glob_to_regex(pattern: str) -> str:
+    """Translate a glob (*, ?, [...]) into a regex matching one line of the key blob."""
+    out = []
+    for kind, text in glob_tokens(pattern):
+        if kind == "*":
+            out.append(r"[^\n]*")
+        elif kind == "?":
+            out.append(r"[^\n]")
+        elif kind == "[":
+            body = text.replace("\\", "\\\\")
+            if body.startswith("!"):
+                body = r"^\n" + body[1:]
+            out.append(f"[{body}]")
+        else:
+            out.append(re.escape(text))
+    return "^" + "".join(out) + "$"
+
+def glob_literal(pattern: str) -> str:
+    """The longest run of plain characters in a glob ("" if it has none).
+
+    Characters inside [...] classes are not literals: "*a[xy]b*" gives "a",
+    never "xy".
+    """
+    runs, run = [], []
+    for kind, text in glob_tokens(pattern):
+        if kind == "literal":
+            run.append(text)
+        else:
+            runs.append("".join(run))
+            run = []
+    runs.append("".join(run))
+    return max(runs, key=len)
+
+class KeySearchIndex:
+    """Every key of one bucket, sorted, plus a newline-joined copy for fast scans.
+
+    Prefix queries bisect the sorted list; substring and glob queries run
+    str.find / a compiled regex over the joined text, so they stay in C.
+    """
+
+    def __init__(self, keys: List[str]):
+        self.built_at = time.monotonic()
+        self._keys = sorted(keys)
+        self._text: Optional[str] = "\n" + "\n".join(self._keys) + "\n"
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: str):
+        with self._lock:
+            i = bisect.bisect_left(self._keys, key)
+            if i == len(self._keys) or self._keys[i] != key:
+                self._keys.insert(i, key)
+                if self._text is not None:
+                    # splice into the text instead of re-joining every key
+                    nxt = self._keys[i + 1] if i + 1 < len(self._keys) else None
+                    pos = self._text.find("\n" + nxt + "\n") + 1 if nxt else len(self._text)
+                    self._text = self._text[:pos] + key + "\n" + self._text[pos:]
+
+    def discard(self, key: str):
+        with self._lock:
+            i = bisect.bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                del self._keys[i]
+                if self._text is not None:
+                    pos = self._text.find("\n" + key + "\n") + 1
+                    self._text = self._text[:pos] + self._text[pos + len(key) + 1:]
+
+    def replace_prefix(self, prefix: str, keys: List[str]):
+        """Replace the key itself and everything below prefix."""
+        with self._lock:
+            lo = bisect.bisect_left(self._keys, prefix)
+            hi = bisect.bisect_left(self._keys, prefix + "0") if prefix else len(self._keys)
+            kept = [k for k in self._keys[lo:hi] if k != prefix and not k.startswith(prefix + "/")] if prefix else []
+            self._keys[lo:hi] = sorted(kept + keys)
+            self._text = None
+
+    def search(self, query: str, mode: str):
+        """Yield matching keys in key order."""
+        with self._lock:
+            keys = self._keys
+            if mode == "prefix":
+                i = bisect.bisect_left(keys, query)
+                snapshot = keys[i:bisect.bisect_left(keys, query + "\U0010ffff")]
+                text = None
+            else:
+                if self._text is None:
+                    self._text = "\n" + "\n".join(keys) + "\n"
+                text = self._text
+        if text is None:
+            yield from snapshot
+        elif mode == "glob":
+            regex = re.compile(glob_to_regex(query), re.M)
+            # narrow with the longest literal run, then check whole lines with the regex
+            literal = glob_literal(query)
+            if not literal:
+                # no literal to narrow with: one regex pass over the whole blob
+                for m in regex.finditer(text):
+                    if m.group(0):  # not the empty lines at the blob's ends
+                        yield m.group(0)
+                return
+            for line in self._lines_containing(text, literal):
+                if regex.fullmatch(line):
+                    yield line
+        else:
+            yield from self._lines_containing(text, query)
+
+    @staticmethod
+    def _lines_containing(text: str, needle: str):
+        pos = text.find(needle, 1)
+        while pos != -1:
+            start = text.rfind("\n", 0, pos) + 1
+            end = text.find("\n", pos)
+            if end == -1:
+                break
+            yield text[start:end]
+            pos = text.find(needle, end + 1)
+
+class SearchIndexes:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._indexes: Dict[str, KeySearchIndex] = {}
+        self._lock = threading.Lock()
+
+    def get(self, bucket: str) -> KeySearchIndex:
+        """The bucket's key index, built (or rebuilt after `ttl`) on demand."""
+        return self.fresh(bucket) or self.build(bucket, keys_under(bucket, ""))
+
+    def fresh(self, bucket: str) -> Optional[KeySearchIndex]:
+        """The bucket's index, unless it is missing or older than `ttl`."""
+        index = self._indexes.get(bucket)
+        if index is None or time.monotonic() - index.built_at > self.ttl:
+            return None
+        return index
+
+    def build(self, bucket: str, keys: List[str]) -> KeySearchIndex:
+        index = KeySearchIndex(keys)
+        with self._lock:
+            self._indexes[bucket] = index
+        return index
+
+    def peek(self, bucket: str) -> Optional[KeySearchIndex]:
+        return self._indexes.get(bucket)
+
+    def drop(self, bucket: str):
+        with self._lock:
+            self._indexes.pop(bucket, None)
+
+search_indexes = SearchIndexes(SEARCH_INDEX_TTL)
+
+def keys_under_steps(bucket: str, prefix: str) -> Steps:
+    """All keys at/under prefix, from the object index when the bucket has one."""
+    index = yield BlockingCall(object_index.get, (bucket, prefix))
+    if index:
+        return (yield BlockingCall(index.keys, (prefix,)))
+    return [key for key, _ in (yield from walk_steps(bucket, prefix))]
+
+def keys_under(bucket: str, prefix: str) -> List[str]:
+    return run_steps(keys_under_steps(bucket, prefix))
+
+def _refresh_search_prefix(bucket: str, index: KeySearchIndex, prefix: str):
+    try:
+        index.replace_prefix(prefix, keys_under(bucket, prefix))
+    except Exception as ex:
+        app.logger.warning("Search index update for %s/%s failed: %s", bucket, prefix, ex)
+        search_indexes.drop(bucket)
+
+def _update_search_index(bucket: str, path: str, recursive: bool, entry: Any):
+    index = search_indexes.peek(bucket)
+    if index is None:
+        return
+    if recursive:
+        # after the object index's recrawl of the same folder, when there is one
+        index_refresher.submit(_refresh_search_prefix, bucket, index, path)
+        return
+    try:
+        if entry is UNKNOWN:
+            obj_index = object_index.get(bucket, path)
+            entry = obj_index.entry(path) if obj_index else lookup_entry(bucket, path)
+        if entry is not None:
+            index.add(path)
+        else:
+            index.discard(path)
+    except Exception as ex:
+        # rebuild from scratch on the next search rather than serve a wrong index
+        app.logger.warning("Search index update for %s/%s failed: %s", bucket, path, ex)
+        search_indexes.drop(bucket)
+
+change_listeners.append(_update_search_index)
+
+# ---------------------- Chunked uploads ----------------------
+# An upload is a spool file plus a JSON sidecar under UPLOAD_SPOOL_DIR. The id is
+# derived from the target and the client's file fingerprint, so re-initialising
+# the same file resumes from whatever was already received.
+UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+
+def _spool_paths(upload_id: str) -> Tuple[str, str]:
+    base = os.path.join(UPLOAD_SPOOL_DIR, upload_id)
+    return base + ".part", base + ".json"
+
+class UploadChunkError(Exception):
+    """A chunk that was not appended; the client should resume from `offset`."""
+
+    def __init__(self, message: str, status: int, offset: int):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+@contextmanager
+def _spool_locked(fh):
+    """Hold an exclusive lock on an open spool file. flock locks belong to the open
+    file, so this serialises threads of one process as well as worker processes."""
+    if fcntl is None:
+        with _spool_fallback_lock:
+            try:
+                yield
+            finally:
+                fh.flush()
+        return
+    fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        # the next holder must see what was written, not what is still buffered here
+        fh.flush()
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+_spool_fallback_lock = threading.Lock()
+
+def _check_spool_size(fh, size: int) -> int:
+    """Bytes received so far; a spool longer than the file (an earlier run went
+    wrong) can't be trusted and is emptied so the upload starts over."""
+    received = fh.seek(0, os.SEEK_END)
+    if received > size:
+        app.logger.warning("Upload spool %s has %d bytes for a %d byte file; restarting it",
+                           fh.name, received, size)
+        fh.truncate(0)
+        received = 0
+    return received
+
+def init_chunked_upload(bucket: str, key: str, size: int, fingerprint: str) -> Tuple[str, int]:
+    """Create (or find) the spool for an upload; returns (upload_id, bytes received)."""
+    os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+    sweep_upload_spools()
+    raw = "\n".join([bucket, key, str(size), fingerprint])
+    upload_id = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+    part, meta = _spool_paths(upload_id)
+    # "ab" creates the spool without truncating one another request is writing to
+    with open(part, "ab") as fh, _spool_locked(fh):
+        if not os.path.exists(meta):
+            with open(meta, "w") as out:
+                json.dump({"bucket": bucket, "key": key, "size": size}, out)
+        return upload_id, _check_spool_size(fh, size)
+
+def load_chunked_upload(upload_id: str) -> Optional[Dict[str, Any]]:
+    if not UPLOAD_ID.match(upload_id or ""):
+        return None
+    part, meta = _spool_paths(upload_id)
+    try:
+        with open(meta) as fh:
+            info = json.load(fh)
+        info["received"] = os.path.getsize(part)
+    except (OSError, ValueError):
+        return None
+    if info["received"] > info["size"]:
+        info["received"] = 0  # the next chunk restarts it (see _check_spool_size)
+    return info
+
+def append_upload_chunk(upload_id: str, offset: int, stream, size: int) -> int:
+    """Append a chunk that starts exactly at the received size; returns the new size.
+
+    Runs under the spool's lock, so of two requests racing for the same offset
+    one appends and the other gets a 409. A chunk that would run past `size` is
+    refused (413) and nothing of it is kept.
+    """
+    part, _ = _spool_paths(upload_id)
+    with open(part, "r+b") as fh, _spool_locked(fh):
+        received = _check_spool_size(fh, size)
+        if received != offset:
+            raise UploadChunkError("Offset mismatch.", 409, received)
+        remaining = size - offset
+        try:
+            while True:
+                chunk = stream.read(min(DOWNLOAD_CHUNK_SIZE, remaining + 1))
+                if not chunk:
+                    break
+                if len(chunk) > remaining:
+                    raise UploadChunkError("Chunk runs past the end of the file.", 413, offset)
+                fh.write(chunk)
+                remaining -= len(chunk)
+        except BaseException:
+            # drop the partial chunk so the client can resend it; only this request
+            # has written past offset since it holds the lock
+            fh.truncate(offset)
+            raise
+        return fh.tell()
+
+def discard_chunked_upload(upload_id: str):
+    for p in _spool_paths(upload_id):
+        try:
+            os.remove(p)
+        except OSError:
+            pass
+
+def sweep_upload_spools():
+    """Remove uploads that have not been touched for UPLOAD_SPOOL_TTL seconds.
+
+    A chunked upload's spool and sidecar go together, by the newer of the two:
+    chunks only touch the spool, and the sidecar must outlive the upload.
+    """
+    cutoff = time.time() - UPLOAD_SPOOL_TTL
+    try:
+        names = os.listdir(UPLOAD_SPOOL_DIR)
+    except OSError:
+        return
+    groups: Dict[str, List[str]] = {}
+    for fn in names:
+        stem, ext = os.path.splitext(fn)
+        group = stem if ext in (".part", ".json") and UPLOAD_ID.match(stem) else fn
+        groups.setdefault(group, []).append(os.path.join(UPLOAD_SPOOL_DIR, fn))
+    for paths in groups.values():
+        try:
+            if max(os.path.getmtime(path) for path in paths) >= cutoff:
+                continue
+        except OSError:
+            continue
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+# ---------------------- Multi-file uploads ----------------------
+@dataclass
+class UploadItem:
+    path: str  # relative path as sent by the browser, or the member name inside a .zip
+    key: str = ""
+    error: Optional[str] = None
+    source: Optional[Callable[[], Union[bytes, str]]] = None  # bytes, or a spool file path
+    size: Optional[int] = None  # bytes uploaded, once it has been
+
+def source_size(src: Union[bytes, str]) -> int:
+    return len(src) if isinstance(src, bytes) else os.path.getsize(src)
+
+def upload_key(current_path: str, rel: str) -> Tuple[str, Optional[str]]:
+    """Object key for a relative upload path; every segment must pass validate_segment."""
+    segments = [seg for seg in re.split(r"[\\/]+", rel or "") if seg]
+    if not segments:
+        return "", "Name is required."
+    for seg in segments:
+        err = validate_segment(seg)
+        if err:
+            return "", f"{err} ('{seg}')"
+    return join_path(current_path, *segments), None
+
+def _read_source(fh, size: int) -> Union[bytes, str]:
+    if size <= UPLOAD_INLINE_MAX:
+        return fh.read()
+    os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=UPLOAD_SPOOL_DIR, suffix=".multi")
+    with os.fdopen(fd, "wb") as out:
+        shutil.copyfileobj(fh, out, DOWNLOAD_CHUNK_SIZE)
+    return tmp
+
+def _stream_source(stream) -> Union[bytes, str]:
+    size = stream.seek(0, os.SEEK_END)
+    stream.seek(0)
+    return _read_source(stream, size)
+
+def zip_upload_items(current_path: str, name: str, stream) -> List[UploadItem]:
+    """One item per file in the archive, expanded into current_path."""
+    try:
+        zf = zipfile.ZipFile(stream)
+    except zipfile.BadZipFile as ex:
+        return [UploadItem(name, error=f"Not a valid zip file: {ex}")]
+    infos = [i for i in zf.infolist() if not i.is_dir() and not i.filename.startswith("__MACOSX/")]
+    if len(infos) > UPLOAD_ZIP_MAX_FILES or sum(i.file_size for i in infos) > UPLOAD_ZIP_MAX_BYTES:
+        return [UploadItem(name, error=f"Archive is too large to expand "
+                                       f"(limits: {UPLOAD_ZIP_MAX_FILES} files, {UPLOAD_ZIP_MAX_BYTES} bytes).")]
+    items = []
+    for info in infos:
+        key, err = upload_key(current_path, info.filename)
+        # ZipFile serialises reads of the shared archive, so members can be read from workers
+        items.append(UploadItem(f"{name}/{info.filename}", key, err,
+                                lambda info=info: _read_source(zf.open(info), info.file_size)))
+    return items
+
+def collect_upload_items(current_path: str, files: List[Tuple[str, Any]],
+                         expand_zip: bool = False) -> List[UploadItem]:
+    """Upload items for (relative path, FileStorage) pairs; sources are read lazily by the workers."""
+    items: List[UploadItem] = []
+    for rel, fs in files:
+        if expand_zip and rel.lower().endswith(".zip"):
+            items.extend(zip_upload_items(current_path, rel, fs.stream))
+            continue
+        key, err = upload_key(current_path, rel)
+        items.append(UploadItem(rel, key, err, lambda stream=fs.stream: _stream_source(stream)))
+    return items
+
+def upload_file_options(key: str, overwrite: bool) -> Dict[str, str]:
+    mime, _ = mimetypes.guess_type(key)
+    options = {"content-type": mime or "application/octet-stream"}
+    if overwrite:
+        options["upsert"] = "true"
+    return options
+
+def upload_items(bucket: str, items: List[UploadItem], overwrite: bool = False) -> List[UploadItem]:
+    """Upload valid items on a bounded worker pool; failures are recorded in item.error."""
+
+    def _one(item: UploadItem):
+        src = None
+        try:
+            src = item.source()
+            storage_call(sb.storage.from_(bucket).upload, item.key, src, upload_file_options(item.key, overwrite))
+            item.size = source_size(src)
+        except Exception as ex:
+            item.error = str(ex)
+        finally:
+            if isinstance(src, str):
+                os.remove(src)
+
+    with ContextExecutor(max_workers=BULK_MAX_CONCURRENCY) as pool:
+        list(pool.map(_one, [i for i in items if not i.error]))
+    return items
+
+def upload_results(items: List[UploadItem]) -> Dict[str, Any]:
+    failed = [i for i in items if i.error]
+    return {
+        "uploaded": len(items) - len(failed),
+        "failed": len(failed),
+        "results": [{"path": i.path, "key": i.key, "error": i.error} for i in items],
+    }
+
+def notify_uploaded(bucket: str, items: List[UploadItem]):
+    """Report uploaded items to the change listeners, with the sizes just written."""
+    for item in items:
+        if not item.error:
+            notify_changed(bucket, item.key, entry=written_entry(item.size))
+
+# ---------------------- Folder ZIP downloads ----------------------
+class ZipSink:
+    """Write-only file object for ZipFile, drained after each write.
+
+    It has no seek/tell, so zipfile writes data descriptors after each member
+    instead of seeking back to patch headers, which is what lets it stream.
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+
+    def write(self, data) -> int:
+        self._buf += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        out = bytes(self._buf)
+        self._buf.clear()
+        return out
 
-    _walk_delete(prefix.strip("/"))
-    return deleted, errors
+# already-compressed media is stored as is; only text-like types are deflated
+DEFLATE_TYPES = {"application/json", "application/xml", "application/javascript", "image/svg+xml"}
 
-def copy_file(src_bucket: str, src_key: str, dst_bucket: str, dst_key: str):
-    """Copy single file via download+upload; compatible across SDK versions."""
-    data = sb.storage.from_(src_bucket).download(src_key)
-    sb.storage.from_(dst_bucket).upload(dst_key, data)
+def zip_info(arcname: str, e: Dict[str, Any]) -> zipfile.ZipInfo:
+    try:
+        stamp = datetime.fromisoformat((e.get("updated_at") or "").replace("Z", "+00:00")).timetuple()[:6]
+    except ValueError:
+        stamp = time.localtime()[:6]
+    info = zipfile.ZipInfo(arcname, max(stamp, (1980, 1, 1, 0, 0, 0)))
+    mime, _ = mimetypes.guess_type(arcname)
+    deflate = mime and (mime.startswith("text/") or mime in DEFLATE_TYPES)
+    info.compress_type = zipfile.ZIP_DEFLATED if deflate else zipfile.ZIP_STORED
+    return info
 
-def copy_folder_recursive(src_bucket: str, src_prefix: str, dst_bucket: str, dst_prefix: str) -> Tuple[int, List[str]]:
-    """Copy all contents of a folder recursively."""
-    copied, errors = 0, []
-    src_prefix = (src_prefix or "").strip("/")
-    dst_prefix = (dst_prefix or "").strip("/")
+def zip_fetch_steps(bucket: str, key: str, size: int) -> Steps:
+    """An object's bytes, or None when it is too big to prefetch and gets streamed instead."""
+    if size > ZIP_PREFETCH_MAX_BYTES:
+        return None
+    return (yield StorageOp(bucket, "download", (key,)))
 
-    def _walk_copy(pfx_src: str, pfx_dst: str):
-        nonlocal copied
-        # create placeholder for folder visibility
-        try:
-            ensure_placeholder_for_folder(dst_bucket, pfx_dst)
-        except Exception:
-            pass
-        resp = sb.storage.from_(src_bucket).list(pfx_src or "", {"limit": 1000, "offset": 0})
-        for e in resp or []:
-            name = e.get("name") or ""
-            meta = e.get("metadata") or {}
-            size = meta.get("size") if isinstance(meta, dict) else None
-            src_full = join_path(pfx_src, name)
-            dst_full = join_path(pfx_dst, name.rstrip("/"))
-            if size in (None, 0) and e.get("id") is None and not name.endswith(".keep"):
-                # subfolder
-                _walk_copy(src_full, dst_full)
+def folder_zip_steps(bucket: str, prefix: str) -> Steps:
+    """Output a ZIP64 archive of everything under prefix, one piece at a time.
+
+    Listing, prefetching and writing overlap: objects are fetched ZIP_PREFETCH
+    ahead while earlier ones are written, and only that window is held in
+    memory. Objects that fail are listed in _errors.txt at the end.
+    """
+    prefix = (prefix or "").strip("/")
+    root = os.path.basename(prefix) or bucket
+    pages = object_pages_steps(bucket, prefix)
+    listed: deque = deque()  # (key, entry) not yet being fetched
+    window: deque = deque()  # (key, entry, fetch handle)
+    errors: List[str] = []
+    listing = True
+    sink = ZipSink()
+
+    def _fill() -> Steps:
+        nonlocal listing
+        while len(window) < ZIP_PREFETCH:
+            if not listed and listing:
+                try:
+                    page = yield from next_output(pages)
+                except Exception as ex:
+                    errors.append(f"listing stopped early: {ex}")
+                    page = END
+                if page is END:
+                    listing = False
+                else:
+                    listed.extend(page)
                 continue
+            if not listed:
+                return
+            key, e = listed.popleft()
+            window.append((key, e, (yield Spawn(zip_fetch_steps(bucket, key, entry_size(e))))))
+
+    yield b""  # send the headers before the first listing comes back
+    with zipfile.ZipFile(sink, "w") as zf:
+        yield from _fill()
+        while window:
+            key, e, fetch = window.popleft()
+            yield from _fill()
+            rel = key[len(prefix) + 1:] if prefix else key
+            info = zip_info(f"{root}/{rel}", e)
             try:
-                copy_file(src_bucket, src_full, dst_bucket, dst_full)
-                copied += 1
+                data = yield Join(fetch)
+                if os.path.basename(rel) == ".keep":
+                    # folder placeholder: keep the (possibly empty) folder in the archive
+                    zf.writestr(zip_info(f"{root}/{os.path.dirname(rel)}/".replace("//", "/"), e), b"")
+                elif data is not None:
+                    with zf.open(info, "w", force_zip64=True) as w:
+                        for i in range(0, len(data), DOWNLOAD_CHUNK_SIZE):
+                            w.write(data[i:i + DOWNLOAD_CHUNK_SIZE])
+                            yield sink.drain()
+                else:
+                    yield PipeObject(bucket, key, lambda: zf.open(info, "w", force_zip64=True), sink.drain)
             except Exception as ex:
-                errors.append(f"{src_full} -> {dst_full}: {ex}")
-
-    _walk_copy(src_prefix, dst_prefix)
-    return copied, errors
+                errors.append(f"{key}: {ex}")
+            yield sink.drain()
+        if errors:
+            zf.writestr(f"{root}/_errors.txt", "\n".join(errors) + "\n")
+    yield sink.drain()
 
-# tries to empty bucket using SDK if available; otherwise manual recursive delete
-def empty_bucket(bucket: str):
-    try:
-        if hasattr(sb.storage, "empty_bucket"):
-            sb.storage.empty_bucket(bucket)
-            return
-    except Exception:
-        pass
-    # Fallback: list at root and delete recursively
-    # supabase storage isn't hierarchical at API level, but we simulate folders (prefixes)
-    # We'll recursively delete every top-level entry
-    try:
-        items = sb.storage.from_(bucket).list("", {"limit": 1000, "offset": 0})
-        for e in items or []:
-            name = e.get("name") or ""
-            meta = e.get("metadata") or {}
-            size = meta.get("size") if isinstance(meta, dict) else None
-            if size in (None, 0) and e.get("id") is None and not name.endswith(".keep"):
-                delete_prefix_recursive(bucket, name)
-            else:
-                try:
-                    sb.storage.from_(bucket).remove([name])
-                except Exception:
-                    pass
-    except Exception:
-        pass
+def iter_folder_zip(bucket: str, prefix: str) -> Iterator[bytes]:
+    """Yield a ZIP64 archive of everything under prefix (see folder_zip_steps)."""
+    return iter_steps(folder_zip_steps(bucket, prefix))
 
 # ---------------------- Templates ----------------------
 PAGE = r"""
@@ -226,6 +3037,14 @@ PAGE = r"""
   <meta name="viewport" content="width=device-width, initial-scale=1" />
   <title>Supabase File Manager</title>
   <script src="https://cdn.tailwindcss.com"></script>
+  <style>
+    /* panel table rows (see rowsHtml) */
+    .fm-rows td { padding: .5rem .75rem; }
+    .fm-actions { text-align: right; white-space: nowrap; }
+    .fm-btn { display: inline-block; border-radius: .5rem; padding: .25rem .625rem; border: 1px solid #d1d5db;
+              background: #f3f4f6; color: #374151; }
+    .fm-btn:hover { background: #e5e7eb; }
+  </style>
 </head>
 <body class="min-h-screen" style="background:#FAFAFA;">
   <div class="max-w-6xl mx-auto p-2 sm:p-6">
@@ -265,12 +3084,13 @@ PAGE = r"""
         <div class="rounded-lg border border-gray-200 bg-white p-4 text-sm text-gray-500">No buckets yet. Create one above.</div>
       {% endif %}
       {% for b in buckets %}
-        <div class="rounded-xl border border-gray-200 bg-white">
+        <div class="rounded-xl border border-gray-200 bg-white" data-bucket-row>
           <div class="flex items-center justify-between p-4">
             <button class="text-left font-medium text-indigo-700 hover:underline"
                     onclick="togglePanel('{{ b }}')"
                     title="Click to expand">{{ b }}</button>
-            <form method="post" action="{{ url_for('delete_bucket', bucket=b) }}"
+            <span class="text-sm text-gray-600" data-bucket-job></span>
+            <form method="post" action="{{ url_for('delete_bucket', bucket=b) }}" data-ajax-job
                   onsubmit="return confirm('Delete bucket {{ b }} and all its contents?');">
               <button class="rounded-lg px-3 py-1.5 border bg-gray-100 border-gray-300 text-gray-700 hover:bg-gray-200"
                       type="submit">Delete</button>
@@ -282,67 +3102,568 @@ PAGE = r"""
     </section>
   </div>
 
+  <!-- One transfer dialog for every row of every panel -->
+  <dialog id="transfer-dialog" class="rounded-xl p-0 w-full max-w-md">
+    <form method="post" action="{{ url_for('transfer') }}" class="p-4 space-y-3">
+      <h3 class="font-semibold text-gray-800" data-transfer-title></h3>
+      <input type="hidden" name="op" />
+      <input type="hidden" name="is_folder" />
+      <input type="hidden" name="src_bucket" />
+      <input type="hidden" name="src_path" />
+      <label class="block text-sm">Destination bucket
+        <select class="mt-1 w-full rounded-lg border border-gray-300 px-2 py-1" name="dst_bucket" required>
+          {% for b in buckets %}<option value="{{ b }}">{{ b }}</option>{% endfor %}
+        </select>
+      </label>
+      <label class="block text-sm">Target path
+        <input class="mt-1 w-full rounded-lg border border-gray-300 px-2 py-1" name="dst_path" placeholder="Target path (optional)" />
+      </label>
+      <!-- sync mirrors into the target folder itself (default: the same path) -->
+      <label class="flex items-center gap-2 text-sm" data-sync-only>
+        <input type="checkbox" name="delete_extra" value="1" /> Delete objects missing from the source
+      </label>
+      <div class="flex justify-end gap-2">
+        <button class="rounded-lg px-3 py-1.5 border bg-gray-100 border-gray-300 text-gray-700 hover:bg-gray-200"
+                type="submit" value="cancel" formnovalidate>Cancel</button>
+        <button class="rounded-lg px-3 py-1.5 border bg-indigo-600 text-white border-indigo-600 hover:bg-indigo-700"
+                type="submit" value="ok" data-transfer-submit>Copy</button>
+      </div>
+    </form>
+  </dialog>
+
   <script>
     function togglePanel(bucket) {
       const el = document.getElementById('panel-' + bucket);
       const isHidden = el.classList.contains('hidden');
       if (isHidden && !el.dataset.loaded) {
+        el.addEventListener('click', e => onPanelClick(bucket, e));
         loadPanel(bucket, "");
       }
       el.classList.toggle('hidden');
     }
 
-    function loadPanel(bucket, path) {
-      const el = document.getElementById('panel-' + bucket);
-      const params = new URLSearchParams();
+    const JSON_ACCEPT = { 'Accept': 'application/json' };
+    const panelJobs = {};  // bucket -> {job id -> last job status}, re-shown after panel reloads
+
+    function fmtBytes(n) {
+      const units = ['B', 'KB', 'MB', 'GB', 'TB'];
+      let i = 0;
+      while (n >= 1024 && i < units.length - 1) { n /= 1024; i++; }
+      return `${n.toFixed(i ? 1 : 0)} ${units[i]}`;
+    }
+
+    function jobText(j) {
+      if (!['queued', 'running'].includes(j.status)) return j.message;
+      let text = `${j.description}: ${j.objects_done}/${j.objects_total ?? '?'} objects, ${fmtBytes(j.bytes_done)}`;
+      if (j.error_count) text += `, ${j.error_count} errors`;
+      if (j.eta_seconds != null) text += `, ~${Math.ceil(j.eta_seconds)}s left`;
+      return text;
+    }
+
+    function renderJob(bucket, j) {
+      const box = document.querySelector(`#panel-${CSS.escape(bucket)} [data-job-status]`);
+      if (!box) return;
+      let row = box.querySelector(`[data-job-id="${j.id}"]`);
+      if (!row) {
+        row = document.createElement('div');
+        row.dataset.jobId = j.id;
+        row.className = 'p-3 rounded-lg text-sm border flex items-center justify-between gap-2';
+        row.innerHTML = '<span></span><button type="button" class="underline" data-cancel>Cancel</button>'
+          + '<button type="button" class="underline" data-resume hidden>Resume</button>';
+        row.querySelector('[data-cancel]').addEventListener('click', () =>
+          fetch(`/jobs/${j.id}/cancel`, { method: 'POST', credentials: 'same-origin' }));
+        row.querySelector('[data-resume]').addEventListener('click', () => {
+          fetch(`/transfers/${j.transfer_id}/resume`, { method: 'POST', credentials: 'same-origin', headers: JSON_ACCEPT })
+            .then(r => r.json()).then(next => {
+              if (!next.id) { alert(next.message || 'Resume failed'); return; }
+              row.remove();
+              watchJob(bucket, next);
+            });
+        });
+        box.appendChild(row);
+      }
+      const active = ['queued', 'running'].includes(j.status);
+      const bad = j.status !== 'done' || j.error_count;
+      row.classList.toggle('bg-red-50', !active && !!bad);
+      row.classList.toggle('bg-green-50', !active && !bad);
+      row.querySelector('span').textContent = jobText(j);
+      row.querySelector('[data-cancel]').hidden = !active;
+      row.querySelector('[data-resume]').hidden = active || !bad || !j.transfer_id;
+    }
+
+    // Poll a background job until it finishes, then refresh the panel
+    function watchJob(bucket, job) {
+      panelJobs[bucket] = panelJobs[bucket] || {};
+      const tick = j => {
+        panelJobs[bucket][j.id] = j;
+        renderJob(bucket, j);
+        if (['queued', 'running'].includes(j.status)) {
+          setTimeout(() => fetch(`/jobs/${j.id}`, { credentials: 'same-origin', headers: JSON_ACCEPT })
+            .then(r => r.json()).then(tick), 1000);
+          return;
+        }
+        refreshPanel(bucket);
+      };
+      tick(job);
+    }
+
+    // Bucket deletion runs as a job too; progress is shown next to the bucket
+    document.querySelectorAll('form[data-ajax-job]').forEach(form => {
+      form.addEventListener('submit', function(e) {
+        if (e.defaultPrevented) return;
+        e.preventDefault();
+        const status = form.parentElement.querySelector('[data-bucket-job]');
+        const tick = j => {
+          status.textContent = jobText(j);
+          if (['queued', 'running'].includes(j.status)) {
+            setTimeout(() => fetch(`/jobs/${j.id}`, { credentials: 'same-origin', headers: JSON_ACCEPT })
+              .then(r => r.json()).then(tick), 1000);
+          } else if (j.status === 'done') {
+            form.closest('[data-bucket-row]').classList.add('opacity-50');
+            form.remove();
+          }
+        };
+        fetch(form.action, { method: 'POST', credentials: 'same-origin', headers: JSON_ACCEPT })
+          .then(r => r.json()).then(tick)
+          .catch(err => alert('Action failed: ' + err));
+      });
+    });
+
+    function panelUrl(bucket, path, extra) {
+      const params = new URLSearchParams(extra || {});
       params.set('partial', '1');
       if (path) params.set('path', path);
-      fetch(`/b/${encodeURIComponent(bucket)}?` + params.toString(), { credentials: 'same-origin' })
+      return `/b/${encodeURIComponent(bucket)}?` + params.toString();
+    }
+
+    function listUrl(bucket, path, extra) {
+      const params = new URLSearchParams(extra || {});
+      if (path) params.set('path', path);
+      return `/api/v1/b/${encodeURIComponent(bucket)}/list?` + params.toString();
+    }
+
+    function esc(s) {
+      return String(s).replace(/[&<>"']/g, c => `&#${c.charCodeAt(0)};`);
+    }
+
+    // Table rows for one page of a listing (compact arrays, see listing_payload).
+    // Kept small on purpose: styling lives in the .fm-* rules, and actions are
+    // wired by delegation from data-path/data-folder.
+    function rowsHtml(bucket, data) {
+      const base = data.path ? data.path + '/' : '';
+      const acts = '<button class="fm-btn" data-row-action="copy">Copy</button> <button class="fm-btn" data-row-action="move">Move</button> <button class="fm-btn" data-row-action="delete">Delete</button>';
+      const dl = `/download/${encodeURIComponent(bucket)}/`;
+      const zip = `/download-zip/${encodeURIComponent(bucket)}/`;
+      let html = '';
+      const sync = '<button class="fm-btn" data-row-action="sync">Sync</button>';
+      for (const [name, size, count, updated] of data.folders) {
+        const full = base + name;
+        const href = zip + full.split('/').map(encodeURIComponent).join('/');
+        html += `<tr class="border-t" data-path="${esc(full)}" data-folder="1"><td class="font-medium"><button class="text-indigo-700 hover:underline" data-browse>${esc(name)}</button></td><td>Folder</td><td>${size ?? '—'}${count != null ? ` <span class="text-gray-500">(${count} objects)</span>` : ''}</td><td class="text-gray-500">${esc(updated || '—')}</td><td class="fm-actions"><a class="fm-btn" href="${href}">Zip</a> ${sync} ${acts}</td></tr>`;
+      }
+      for (const [name, size, updated] of data.files) {
+        const full = base + name;
+        const href = dl + full.split('/').map(encodeURIComponent).join('/');
+        html += `<tr class="border-t" data-path="${esc(full)}" data-folder="0"><td>${esc(name)}</td><td>File</td><td>${size ?? '—'}</td><td class="text-gray-500">${esc(updated || '—')}</td><td class="fm-actions"><a class="fm-btn" href="${href}">Download</a> ${acts}</td></tr>`;
+      }
+      if (data.next_cursor) {
+        html += `<tr data-next-cursor="${esc(data.next_cursor)}"><td colspan="5" class="text-center text-gray-500">Loading more…</td></tr>`;
+      }
+      return html;
+    }
+
+    // Replace the rows with a first page, or append a further page
+    function renderListing(bucket, data, append) {
+      const container = document.getElementById('panel-' + bucket);
+      const tbody = container.querySelector('tbody.fm-rows');
+      if (!append) {
+        tbody.innerHTML = data.folders.length || data.files.length ? ''
+          : '<tr><td colspan="5" class="px-3 py-6 text-center text-gray-500">Empty</td></tr>';
+      }
+      tbody.insertAdjacentHTML('beforeend', rowsHtml(bucket, data));
+      const sentinel = tbody.querySelector('tr[data-next-cursor]');
+      if (sentinel) {
+        const obs = new IntersectionObserver(entries => {
+          if (entries.some(e => e.isIntersecting)) {
+            obs.disconnect();
+            loadMoreRows(bucket, sentinel);
+          }
+        });
+        obs.observe(sentinel);
+      }
+    }
+
+    function panelPath(container) {
+      const cur = container.querySelector('input[name="__panel_path"]');
+      return cur ? cur.value : "";
+    }
+
+    function listExtra(container) {
+      const size = container.querySelector('input[name="__panel_page_size"]');
+      return size && size.value ? { limit: size.value } : {};
+    }
+
+    // Re-fetch the first page after a change; an unchanged folder answers 304
+    // to If-None-Match and the rows already on screen are kept.
+    function refreshPanel(bucket) {
+      const container = document.getElementById('panel-' + bucket);
+      if (!container || !container.dataset.loaded) return Promise.resolve();
+      const path = panelPath(container);
+      const headers = { ...JSON_ACCEPT };
+      if (container.dataset.etag) headers['If-None-Match'] = container.dataset.etag;
+      return fetch(listUrl(bucket, path, listExtra(container)), { credentials: 'same-origin', cache: 'no-store', headers })
+        .then(r => {
+          if (r.status === 304) return;
+          if (!r.ok) return loadPanel(bucket, path);
+          const etag = r.headers.get('ETag');
+          return r.json().then(data => {
+            if (panelPath(container) !== path) return;
+            container.dataset.etag = etag || '';
+            renderListing(bucket, data, false);
+          });
+        })
+        .catch(err => showPanelMessage(bucket, 'Refresh failed: ' + err, 'error'));
+    }
+
+    function showPanelMessage(bucket, message, category) {
+      const box = document.querySelector(`#panel-${CSS.escape(bucket)} [data-job-status]`);
+      if (!box || !message) return;
+      const row = document.createElement('div');
+      row.className = 'p-3 rounded-lg text-sm border ' + (category === 'error' ? 'bg-red-50' : 'bg-green-50');
+      row.textContent = message;
+      box.appendChild(row);
+      setTimeout(() => row.remove(), 6000);
+    }
+
+    // Action routes answer JSON: 202 with a job to watch, or {message, category}
+    function handleActionResponse(bucket, r) {
+      return r.json().catch(() => ({})).then(body => {
+        if (r.status === 202) return watchJob(bucket, body);
+        showPanelMessage(bucket, body.message || body.error, body.category || (r.ok ? 'success' : 'error'));
+        return refreshPanel(bucket);
+      });
+    }
+
+    function loadPanel(bucket, path) {
+      const el = document.getElementById('panel-' + bucket);
+      return fetch(panelUrl(bucket, path), { credentials: 'same-origin' })
         .then(r => r.text())
         .then(html => {
           el.innerHTML = html;
           el.dataset.loaded = '1';
           initPanelScripts(bucket);
+          Object.values(panelJobs[bucket] || {}).forEach(j => renderJob(bucket, j));
         })
         .catch(err => {
           el.innerHTML = `<div class="p-4 text-sm text-red-700 bg-red-50 border border-red-200">Failed to load: ${err}</div>`;
         });
     }
 
+    // Fetch the next page of rows when the "load more" row scrolls into view
+    function loadMoreRows(bucket, sentinel) {
+      const container = document.getElementById('panel-' + bucket);
+      const extra = { ...listExtra(container), cursor: sentinel.dataset.nextCursor };
+      fetch(listUrl(bucket, panelPath(container), extra), { credentials: 'same-origin', headers: JSON_ACCEPT })
+        .then(r => r.ok ? r.json() : Promise.reject(r.status))
+        .then(data => {
+          sentinel.remove();
+          renderListing(bucket, data, true);
+        })
+        .catch(err => {
+          sentinel.querySelector('td').textContent = 'Failed to load more: ' + err;
+        });
+    }
+
+    // Send a file in slices; the server reports how much it already has, so
+    // re-submitting the same file after a failure resumes instead of restarting.
+    async function uploadChunked(form, file, onProgress) {
+      const fd = new FormData();
+      fd.set('current_path', form.querySelector('input[name="current_path"]').value);
+      fd.set('filename', file.name);
+      fd.set('size', file.size);
+      fd.set('fingerprint', `${file.name}:${file.size}:${file.lastModified}`);
+      const init = await fetch(form.action, { method: 'POST', body: fd, credentials: 'same-origin' });
+      let st = await init.json();
+      if (!init.ok) throw new Error(st.error || init.status);
+      const base = form.action + '/' + st.upload_id;
+      let offset = st.offset, failures = 0;
+      while (offset < file.size) {
+        onProgress(Math.floor(offset * 100 / file.size));
+        try {
+          const r = await fetch(`${base}?offset=${offset}`, {
+            method: 'PUT', body: file.slice(offset, offset + st.chunk_size), credentials: 'same-origin'
+          });
+          const body = await r.json();
+          if (!r.ok && r.status !== 409) throw new Error(body.error || r.status);
+          offset = body.offset;
+          failures = 0;
+        } catch (err) {
+          if (++failures > 5) throw err;
+          await new Promise(res => setTimeout(res, 500 * 2 ** failures));
+          const r = await fetch(base, { credentials: 'same-origin' });
+          if (r.ok) offset = (await r.json()).offset;
+        }
+      }
+      onProgress(100);
+      const done = await fetch(base + '/complete', { method: 'POST', credentials: 'same-origin' });
+      if (!done.ok) throw new Error((await done.json()).error || done.status);
+    }
+
+    // Many small files go up in multi-file requests (a few in flight at once); the
+    // server pushes each request's files upstream in parallel and reports per file
+    const UPLOAD_BATCH_FILES = 100, UPLOAD_BATCH_BYTES = 16 * 1024 * 1024, UPLOAD_BATCHES_IN_FLIGHT = 2;
+
+    async function uploadMany(form, files, onProgress) {
+      const batches = [];
+      let cur = [], bytes = 0;
+      for (const f of files) {
+        if (cur.length && (cur.length >= UPLOAD_BATCH_FILES || bytes + f[1].size > UPLOAD_BATCH_BYTES)) {
+          batches.push(cur);
+          cur = [];
+          bytes = 0;
+        }
+        cur.push(f);
+        bytes += f[1].size;
+      }
+      if (cur.length) batches.push(cur);
+      const totals = { total: files.length, uploaded: 0, failed: 0, errors: [] };
+      let next = 0;
+      const worker = async () => {
+        while (next < batches.length) {
+          const batch = batches[next++];
+          const fd = new FormData();
+          for (const name of ['current_path', 'expand_zip', 'overwrite']) {
+            const el = form.elements[name];
+            if (el && (el.type !== 'checkbox' || el.checked)) fd.set(name, el.value);
+          }
+          for (const [rel, file] of batch) {
+            fd.append('files', file, file.name);
+            fd.append('paths', rel);
+          }
+          try {
+            const r = await fetch(form.action, { method: 'POST', body: fd, credentials: 'same-origin' });
+            const body = await r.json();
+            if (!r.ok) throw new Error(body.error || r.status);
+            totals.uploaded += body.uploaded;
+            totals.failed += body.failed;
+            totals.errors.push(...body.results.filter(x => x.error));
+          } catch (err) {
+            totals.failed += batch.length;
+            totals.errors.push(...batch.map(([rel]) => ({ path: rel, error: String(err) })));
+          }
+          onProgress(totals);
+        }
+      };
+      await Promise.all(Array.from({ length: Math.min(UPLOAD_BATCHES_IN_FLIGHT, batches.length) }, worker));
+      return totals;
+    }
+
+    // [relative path, File] pairs from a drop, descending into dropped folders
+    async function droppedFiles(dt) {
+      const entries = [...dt.items].map(i => i.webkitGetAsEntry && i.webkitGetAsEntry()).filter(Boolean);
+      if (!entries.length) return [...dt.files].map(f => [f.name, f]);
+      const out = [];
+      const walk = async (entry, base) => {
+        if (entry.isFile) {
+          out.push([base + entry.name, await new Promise((res, rej) => entry.file(res, rej))]);
+          return;
+        }
+        const reader = entry.createReader();
+        for (;;) {
+          const batch = await new Promise((res, rej) => reader.readEntries(res, rej));
+          if (!batch.length) break;
+          for (const e of batch) await walk(e, base + entry.name + '/');
+        }
+      };
+      for (const e of entries) await walk(e, '');
+      return out;
+    }
+
+    function startMultiUpload(bucket, form, files) {
+      if (!files.length) return;
+      const progress = form.querySelector('[data-upload-progress]');
+      const errors = form.querySelector('[data-upload-errors]');
+      errors.innerHTML = '';
+      const show = t => {
+        progress.textContent = `Uploaded ${t.uploaded}/${t.total}` + (t.failed ? `, ${t.failed} failed` : '');
+      };
+      show({ total: files.length, uploaded: 0, failed: 0 });
+      uploadMany(form, files, show).then(t => {
+        show(t);
+        for (const e of t.errors.slice(0, 20)) {
+          const li = document.createElement('li');
+          li.textContent = `${e.path}: ${e.error}`;
+          errors.appendChild(li);
+        }
+        form.reset();
+        return refreshPanel(bucket);
+      });
+    }
+
+    // Results arrive as NDJSON and are shown as soon as each line is read
+    async function searchBucket(bucket, form) {
+      const container = document.getElementById('panel-' + bucket);
+      const box = container.querySelector('[data-search-box]');
+      const list = box.querySelector('[data-search-results]');
+      const summary = box.querySelector('[data-search-summary]');
+      const params = new URLSearchParams(new FormData(form));
+      list.innerHTML = '';
+      summary.textContent = 'Searching…';
+      box.classList.remove('hidden');
+      const r = await fetch(form.action + '?' + params.toString(), { credentials: 'same-origin' });
+      if (!r.ok) { summary.textContent = 'Search failed: ' + ((await r.json()).error || r.status); return; }
+      const reader = r.body.getReader();
+      const decoder = new TextDecoder();
+      let buf = '';
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buf += decoder.decode(value, { stream: true });
+        const lines = buf.split('\n');
+        buf = lines.pop();
+        for (const line of lines) {
+          if (!line) continue;
+          const hit = JSON.parse(line);
+          if (hit.done) {
+            summary.textContent = `${hit.count}${hit.truncated ? '+' : ''} matches in ${hit.ms} ms`;
+            continue;
+          }
+          const li = document.createElement('li');
+          li.className = 'flex items-center justify-between gap-2';
+          const parent = hit.key.includes('/') ? hit.key.slice(0, hit.key.lastIndexOf('/')) : '';
+          li.innerHTML = '<button type="button" class="text-indigo-700 hover:underline text-left"></button><a class="text-gray-600 hover:underline">Download</a>';
+          li.querySelector('button').textContent = hit.key;
+          li.querySelector('button').addEventListener('click', () => loadPanel(bucket, parent));
+          li.querySelector('a').href = `/download/${encodeURIComponent(bucket)}/` + hit.key.split('/').map(encodeURIComponent).join('/');
+          list.appendChild(li);
+        }
+      }
+    }
+
     function initPanelScripts(bucket) {
       const container = document.getElementById('panel-' + bucket);
       if (!container) return;
 
       // Intercept all panel forms marked with data-ajax-panel
-      container.querySelectorAll('form[data-ajax-panel]').forEach(form => {
+      container.querySelectorAll('form[data-ajax-panel]:not([data-bound])').forEach(form => {
+        form.dataset.bound = '1';
+        form.addEventListener('submit', function(e) {
+          // an inline confirm() that was declined has already cancelled the submit
+          if (e.defaultPrevented) return;
+          e.preventDefault();
+          postPanelAction(bucket, form.action, new FormData(form)).then(() => form.reset());
+        });
+      });
+
+      container.querySelectorAll('form[data-chunked-upload]:not([data-bound])').forEach(form => {
+        form.dataset.bound = '1';
         form.addEventListener('submit', function(e) {
           e.preventDefault();
-          const fd = new FormData(form);
-          fetch(form.action, { method: 'POST', body: fd, credentials: 'same-origin' })
-            .then(r => r.text())
-            .then(_ => {
-              // Reload current path for this panel
-              const cur = container.querySelector('input[name="__panel_path"]');
-              const path = cur ? cur.value : "";
-              loadPanel(bucket, path);
-            })
-            .catch(err => alert('Action failed: ' + err));
+          const file = form.querySelector('input[type="file"]').files[0];
+          if (!file) return;
+          const progress = form.querySelector('[data-upload-progress]');
+          uploadChunked(form, file, pct => { progress.textContent = `Uploading ${file.name}: ${pct}%`; })
+            .then(() => { progress.textContent = `Uploaded ${file.name}`; return refreshPanel(bucket); })
+            .catch(err => { progress.textContent = `Upload of ${file.name} stopped: ${err}. Submit again to resume.`; });
+        });
+      });
+
+      container.querySelectorAll('form[data-multi-upload]:not([data-bound])').forEach(form => {
+        form.dataset.bound = '1';
+        form.addEventListener('submit', function(e) {
+          e.preventDefault();
+          const picked = [...form.elements.files.files, ...form.elements.folder.files];
+          startMultiUpload(bucket, form, picked.map(f => [f.webkitRelativePath || f.name, f]));
+        });
+        const zone = form.querySelector('[data-drop-zone]');
+        zone.addEventListener('dragover', e => { e.preventDefault(); zone.classList.add('bg-indigo-50'); });
+        zone.addEventListener('dragleave', () => zone.classList.remove('bg-indigo-50'));
+        zone.addEventListener('drop', e => {
+          e.preventDefault();
+          zone.classList.remove('bg-indigo-50');
+          droppedFiles(e.dataTransfer).then(files => startMultiUpload(bucket, form, files));
+        });
+      });
+
+      container.querySelectorAll('form[data-search]:not([data-bound])').forEach(form => {
+        form.dataset.bound = '1';
+        form.addEventListener('submit', function(e) {
+          e.preventDefault();
+          searchBucket(bucket, form);
         });
       });
 
       // Attach click handlers for breadcrumb buttons that carry data-path
-      container.querySelectorAll('[data-path-btn]').forEach(btn => {
+      container.querySelectorAll('[data-path-btn]:not([data-bound])').forEach(btn => {
+        btn.dataset.bound = '1';
         btn.addEventListener('click', () => {
           const p = btn.getAttribute('data-path-btn') || "";
           loadPanel(bucket, p);
         });
       });
+
+      // First page of rows is embedded in the fragment along with its ETag
+      const listing = container.querySelector('script[data-listing]');
+      if (listing) {
+        container.dataset.etag = listing.dataset.etag;
+        renderListing(bucket, JSON.parse(listing.textContent), false);
+        listing.remove();
+      }
+    }
+
+    function postPanelAction(bucket, url, fd) {
+      return fetch(url, { method: 'POST', body: fd, credentials: 'same-origin', headers: JSON_ACCEPT })
+        .then(r => handleActionResponse(bucket, r))
+        .catch(err => alert('Action failed: ' + err));
     }
 
-    // Allow folder link buttons to navigate inside the panel
-    function browsePanel(bucket, path) {
-      loadPanel(bucket, path);
+    // Row buttons carry no forms of their own: rows only hold data-path/data-folder,
+    // and copy/move share the one transfer dialog on the page
+    function onPanelClick(bucket, e) {
+      const row = e.target.closest('tr[data-path]');
+      if (!row) return;
+      const path = row.dataset.path, isFolder = row.dataset.folder === '1';
+      if (e.target.closest('[data-browse]')) {
+        loadPanel(bucket, path);
+        return;
+      }
+      const btn = e.target.closest('[data-row-action]');
+      if (!btn) return;
+      const action = btn.dataset.rowAction;
+      if (action === 'delete') {
+        const what = isFolder ? `folder ${path} and everything inside` : `file ${path}`;
+        if (!confirm(`Delete ${what}?`)) return;
+        const root = document.querySelector(`#panel-${CSS.escape(bucket)} [data-delete-file-url]`);
+        const fd = new FormData();
+        fd.set(isFolder ? 'current_path' : 'file_path', path);
+        postPanelAction(bucket, isFolder ? root.dataset.deletePrefixUrl : root.dataset.deleteFileUrl, fd);
+        return;
+      }
+      const dialog = document.getElementById('transfer-dialog');
+      const form = dialog.querySelector('form');
+      form.elements.op.value = action;
+      form.elements.is_folder.value = isFolder ? '1' : '0';
+      form.elements.src_bucket.value = bucket;
+      form.elements.src_path.value = path;
+      form.elements.dst_bucket.value = bucket;
+      form.elements.dst_path.value = '';
+      form.elements.delete_extra.checked = false;
+      dialog.querySelector('[data-sync-only]').hidden = action !== 'sync';
+      form.elements.dst_path.placeholder = action === 'sync' ? 'Target folder (default: same path)' : 'Target path (optional)';
+      const label = { move: 'Move', sync: 'Sync' }[action] || 'Copy';
+      dialog.querySelector('[data-transfer-title]').textContent = `${label} ${path}`;
+      dialog.querySelector('[data-transfer-submit]').textContent = label;
+      dialog.showModal();
     }
+
+    document.querySelector('#transfer-dialog form').addEventListener('submit', function(e) {
+      e.preventDefault();
+      const dialog = document.getElementById('transfer-dialog');
+      if (e.submitter && e.submitter.value === 'cancel') { dialog.close(); return; }
+      const fd = new FormData(this);
+      dialog.close();
+      postPanelAction(fd.get('src_bucket'), this.action, fd);
+    });
   </script>
 </body>
 </html>
@@ -350,12 +3671,15 @@ PAGE = r"""
 
 # This is the HTML fragment returned for a single bucket panel (contents)
 PANEL = r"""
-{% set _buckets = buckets %}
 {% set _bucket = bucket %}
 {% set _path = path or '' %}
-<div class="p-4">
+<div class="p-4" data-delete-prefix-url="{{ url_for('delete_prefix', bucket=_bucket) }}"
+     data-delete-file-url="{{ url_for('delete_file', bucket=_bucket) }}">
   <!-- Keep track of current path inside this panel for AJAX refresh -->
   <input type="hidden" name="__panel_path" value="{{ _path }}"/>
+  <input type="hidden" name="__panel_page_size" value="{{ page_size }}"/>
+  <!-- Progress of background jobs started from this panel -->
+  <div class="space-y-2 mb-3" data-job-status></div>
 
   {% with messages = get_flashed_messages(with_categories=true) %}
     {% if messages %}
@@ -387,6 +3711,8 @@ PANEL = r"""
     <section class="lg:col-span-2 rounded-xl border border-gray-200 overflow-hidden bg-white">
       <div class="px-4 py-3 border-b border-gray-200 flex items-center justify-between">
         <div class="font-semibold text-gray-800">Contents: <span class="text-gray-500">{{ _path or '/' }}</span></div>
+        <a class="ml-auto mr-2 text-sm text-gray-700 hover:underline"
+           href="{{ url_for('download_zip', bucket=_bucket, path=_path) }}">Download as .zip</a>
         {% if _path %}
           <form method="post" action="{{ url_for('delete_prefix', bucket=_bucket) }}" data-ajax-panel
                 onsubmit="return confirm('Delete this folder and everything inside?');">
@@ -396,6 +3722,23 @@ PANEL = r"""
           </form>
         {% endif %}
       </div>
+      <!-- Search the whole bucket by key: substring, prefix or glob (*, ?, [...]) -->
+      <form action="{{ url_for('search', bucket=_bucket) }}" data-search class="px-4 py-3 border-b border-gray-200 flex gap-2">
+        <input class="flex-1 rounded-lg border border-gray-300 px-3 py-1.5" type="search" name="q"
+               placeholder="Search this bucket (e.g. report, 2024/*.pdf)" />
+        <select class="rounded-lg border border-gray-300 px-2 py-1" name="mode">
+          <option value="">auto</option>
+          <option value="substring">contains</option>
+          <option value="prefix">starts with</option>
+          <option value="glob">glob</option>
+        </select>
+        <button class="rounded-lg px-3 py-1.5 border bg-gray-100 border-gray-300 text-gray-700 hover:bg-gray-200" type="submit">Search</button>
+      </form>
+      <div class="px-4 py-2 text-sm hidden" data-search-box>
+        <p class="text-gray-500 mb-1" data-search-summary></p>
+        <ul class="space-y-1" data-search-results></ul>
+      </div>
+      <script type="application/json" data-listing data-etag="&quot;{{ etag }}&quot;">{{ listing|tojson }}</script>
       <table class="w-full text-sm">
         <thead class="bg-gray-50 text-gray-600">
           <tr>
@@ -406,117 +3749,8 @@ PANEL = r"""
             <th class="text-right px-3 py-2">Actions</th>
           </tr>
         </thead>
-        <tbody>
-          {% if folders|length == 0 and files|length == 0 %}
-            <tr><td colspan="5" class="px-3 py-6 text-center text-gray-500">Empty</td></tr>
-          {% endif %}
-
-          {% for f in folders %}
-            {% set full = (_path + '/' if _path else '') + f.name %}
-            <tr class="border-t">
-              <td class="px-3 py-2 font-medium">
-                <button class="text-indigo-700 hover:underline" onclick="browsePanel('{{ _bucket }}', '{{ full }}')">{{ f.name }}</button>
-              </td>
-              <td class="px-3 py-2">Folder</td>
-              <td class="px-3 py-2">—</td>
-              <td class="px-3 py-2 text-gray-500">{{ f.updated_at or '—' }}</td>
-              <td class="px-3 py-2">
-                <div class="flex flex-col items-end gap-2">
-                  <!-- Delete -->
-                  <form method="post" action="{{ url_for('delete_prefix', bucket=_bucket) }}" data-ajax-panel
-                        onsubmit="return confirm('Delete folder {{ f.name }} and everything inside?');">
-                    <input type="hidden" name="current_path" value="{{ full }}" />
-                    <button class="rounded-lg px-3 py-1.5 border bg-gray-100 border-gray-300 text-gray-700 hover:bg-gray-200" type="submit">Delete</button>
-                  </form>
-                  <!-- Copy -->
-                  <form method="post" action="{{ url_for('transfer') }}" data-ajax-panel class="text-right">
-                    <input type="hidden" name="op" value="copy" />
-                    <input type="hidden" name="is_folder" value="1" />
-                    <input type="hidden" name="src_bucket" value="{{ _bucket }}" />
-                    <input type="hidden" name="src_path" value="{{ full }}" />
-                    <div class="flex flex-col items-end gap-2">
-                      <select class="rounded-lg border border-gray-300 px-2 py-1" name="dst_bucket" required>
-                        {% for bn in _buckets %}
-                          <option value="{{ bn }}" {% if bn==_bucket %}selected{% endif %}>{{ bn }}</option>
-                        {% endfor %}
-                      </select>
-                      <input class="rounded-lg border border-gray-300 px-2 py-1 w-56" name="dst_path" placeholder="Target path (optional)" />
-                      <button class="rounded-lg px-3 py-1.5 border bg-indigo-600 text-white border-indigo-600 hover:bg-indigo-700" type="submit">Copy</button>
-                    </div>
-                  </form>
-                  <!-- Move -->
-                  <form method="post" action="{{ url_for('transfer') }}" data-ajax-panel class="text-right">
-                    <input type="hidden" name="op" value="move" />
-                    <input type="hidden" name="is_folder" value="1" />
-                    <input type="hidden" name="src_bucket" value="{{ _bucket }}" />
-                    <input type="hidden" name="src_path" value="{{ full }}" />
-                    <div class="flex flex-col items-end gap-2">
-                      <select class="rounded-lg border border-gray-300 px-2 py-1" name="dst_bucket" required>
-                        {% for bn in _buckets %}
-                          <option value="{{ bn }}" {% if bn==_bucket %}selected{% endif %}>{{ bn }}</option>
-                        {% endfor %}
-                      </select>
-                      <input class="rounded-lg border border-gray-300 px-2 py-1 w-56" name="dst_path" placeholder="Target path (optional)" />
-                      <button class="rounded-lg px-3 py-1.5 border bg-amber-600 text-white border-amber-600 hover:bg-amber-700" type="submit">Move</button>
-                    </div>
-                  </form>
-                </div>
-              </td>
-            </tr>
-          {% endfor %}
-
-          {% for f in files %}
-            {% set full = (_path + '/' if _path else '') + f.name %}
-            <tr class="border-t">
-              <td class="px-3 py-2">{{ f.name }}</td>
-              <td class="px-3 py-2">File</td>
-              <td class="px-3 py-2">{{ f.size if f.size is not none else '—' }}</td>
-              <td class="px-3 py-2 text-gray-500">{{ f.updated_at or '—' }}</td>
-              <td class="px-3 py-2">
-                <div class="flex flex-col items-end gap-2">
-                  <a class="rounded-lg px-3 py-1.5 border bg-gray-100 border-gray-300 text-gray-700 hover:bg-gray-200"
-                     href="{{ url_for('download', bucket=_bucket, path=full) }}">Download</a>
-                  <form method="post" action="{{ url_for('delete_file', bucket=_bucket) }}" data-ajax-panel
-                        onsubmit="return confirm('Delete file {{ f.name }}?');">
-                    <input type="hidden" name="file_path" value="{{ full }}" />
-                    <button class="rounded-lg px-3 py-1.5 border bg-gray-100 border-gray-300 text-gray-700 hover:bg-gray-200" type="submit">Delete</button>
-                  </form>
-                  <!-- Copy -->
-                  <form method="post" action="{{ url_for('transfer') }}" data-ajax-panel class="text-right">
-                    <input type="hidden" name="op" value="copy" />
-                    <input type="hidden" name="is_folder" value="0" />
-                    <input type="hidden" name="src_bucket" value="{{ _bucket }}" />
-                    <input type="hidden" name="src_path" value="{{ full }}" />
-                    <div class="flex flex-col items-end gap-2">
-                      <select class="rounded-lg border border-gray-300 px-2 py-1" name="dst_bucket" required>
-                        {% for bn in _buckets %}
-                          <option value="{{ bn }}" {% if bn==_bucket %}selected{% endif %}>{{ bn }}</option>
-                        {% endfor %}
-                      </select>
-                      <input class="rounded-lg border border-gray-300 px-2 py-1 w-56" name="dst_path" placeholder="Target path (optional)" />
-                      <button class="rounded-lg px-3 py-1.5 border bg-indigo-600 text-white border-indigo-600 hover:bg-indigo-700" type="submit">Copy</button>
-                    </div>
-                  </form>
-                  <!-- Move -->
-                  <form method="post" action="{{ url_for('transfer') }}" data-ajax-panel class="text-right">
-                    <input type="hidden" name="op" value="move" />
-                    <input type="hidden" name="is_folder" value="0" />
-                    <input type="hidden" name="src_bucket" value="{{ _bucket }}" />
-                    <input type="hidden" name="src_path" value="{{ full }}" />
-                    <div class="flex flex-col items-end gap-2">
-                      <select class="rounded-lg border border-gray-300 px-2 py-1" name="dst_bucket" required>
-                        {% for bn in _buckets %}
-                          <option value="{{ bn }}" {% if bn==_bucket %}selected{% endif %}>{{ bn }}</option>
-                        {% endfor %}
-                      </select>
-                      <input class="rounded-lg border border-gray-300 px-2 py-1 w-56" name="dst_path" placeholder="Target path (optional)" />
-                      <button class="rounded-lg px-3 py-1.5 border bg-amber-600 text-white border-amber-600 hover:bg-amber-700" type="submit">Move</button>
-                    </div>
-                  </form>
-                </div>
-              </td>
-            </tr>
-          {% endfor %}
+        <tbody class="fm-rows">
+          <!-- rows are rendered by the page JS from this listing (see renderListing) -->
         </tbody>
       </table>
     </section>
@@ -534,12 +3768,40 @@ PANEL = r"""
         </form>
       </section>
 
+      <section class="rounded-xl border border-gray-200 p-4 bg-white">
+        <h3 class="font-semibold mb-2">Object index</h3>
+        <form method="post" action="{{ url_for('bucket_index', bucket=_bucket) }}" data-ajax-panel class="space-y-2">
+          <p class="text-xs text-gray-500">
+            {% if indexed %}Listings and folder sizes come from the local index.{% else %}Not indexed: folder sizes are unknown.{% endif %}
+          </p>
+          <button class="w-full rounded-lg px-4 py-2 font-medium border bg-gray-100 border-gray-300 text-gray-700 hover:bg-gray-200" type="submit">
+            {% if indexed %}Rebuild index{% else %}Build index{% endif %}
+          </button>
+        </form>
+      </section>
+
       <section class="rounded-xl border border-gray-200 p-4 bg-white">
         <h3 class="font-semibold mb-2">Upload file</h3>
-        <form method="post" action="{{ url_for('upload', bucket=_bucket) }}" enctype="multipart/form-data" data-ajax-panel class="space-y-2">
+        <form method="post" action="{{ url_for('upload_init', bucket=_bucket) }}" enctype="multipart/form-data" data-chunked-upload class="space-y-2">
           <input type="hidden" name="current_path" value="{{ _path }}" />
           <input class="w-full rounded-lg border border-gray-300 px-3 py-2" type="file" name="file" required />
           <button class="w-full rounded-lg px-4 py-2 font-medium border bg-indigo-600 text-white border-indigo-600 hover:bg-indigo-700" type="submit">Upload File</button>
+          <p class="text-xs text-gray-500" data-upload-progress></p>
+        </form>
+      </section>
+
+      <section class="rounded-xl border border-gray-200 p-4 bg-white">
+        <h3 class="font-semibold mb-2">Upload files or a folder</h3>
+        <form method="post" action="{{ url_for('upload_many', bucket=_bucket) }}" enctype="multipart/form-data" data-multi-upload class="space-y-2">
+          <input type="hidden" name="current_path" value="{{ _path }}" />
+          <input class="w-full text-sm" type="file" name="files" multiple />
+          <input class="w-full text-sm" type="file" name="folder" webkitdirectory />
+          <div class="rounded-lg border-2 border-dashed border-gray-300 p-4 text-center text-sm text-gray-500" data-drop-zone>Drop files or folders here</div>
+          <label class="flex items-center gap-2 text-sm"><input type="checkbox" name="expand_zip" value="1" /> Expand .zip files</label>
+          <label class="flex items-center gap-2 text-sm"><input type="checkbox" name="overwrite" value="1" /> Overwrite existing</label>
+          <button class="w-full rounded-lg px-4 py-2 font-medium border bg-indigo-600 text-white border-indigo-600 hover:bg-indigo-700" type="submit">Upload</button>
+          <p class="text-xs text-gray-500" data-upload-progress></p>
+          <ul class="text-xs text-red-700 space-y-1" data-upload-errors></ul>
         </form>
       </section>
     </aside>
@@ -547,10 +3809,17 @@ PANEL = r"""
 </div>
 """
 
+
+# Compiled once at startup; Jinja's cache then serves every render
+TEMPLATES = {"page.html": PAGE, "panel.html": PANEL}
+app.jinja_loader = ChoiceLoader([DictLoader(TEMPLATES)] + ([app.jinja_loader] if app.jinja_loader else []))
+for _name in TEMPLATES:
+    app.jinja_env.get_template(_name)
+
 # ---------------------- Routes ----------------------
 @app.route("/", methods=["GET"])
 def home():
-    return render_template_string(PAGE, buckets=get_bucket_names())
+    return render_template("page.html", buckets=get_bucket_names())
 
 @app.route("/create-bucket", methods=["POST"])
 def create_bucket():
@@ -570,6 +3839,8 @@ def create_bucket():
             sb.storage.create_bucket(name, {"public": False})
             created = True
         if created:
+            notify_changed(name, "", recursive=True)
+            refresh_bucket_catalog()
             flash(f"Bucket '{name}' created.", "success")
         else:
             flash("Failed to create bucket (unknown SDK signature).", "error")
@@ -577,48 +3848,83 @@ def create_bucket():
         flash(f"Failed to create bucket: {ex}", "error")
     return redirect(url_for("home"))
 
-@app.route("/delete-bucket/<bucket>", methods=["POST"])
-def delete_bucket(bucket: str):
+def job_response(job: Job):
+    """JSON (202) for the panel JS; flash + redirect for plain form posts."""
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify(job.to_dict()), 202
+    flash(f"{job.description} started in the background.", "success")
+    return redirect(url_for("home"))
+
+def panel_result(message: str, category: str = "success"):
+    """Outcome of a quick panel action: JSON for the panel JS, a flash otherwise."""
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify({"message": message, "category": category})
+    flash(message, category)
+    return ("", 200)
+
+def delete_bucket_job(bucket: str, job: Job) -> str:
+    """Empty (verified) and then delete a bucket."""
     try:
-        empty_bucket(bucket)
+        removed = empty_bucket(bucket, job)
         if hasattr(sb.storage, "delete_bucket"):
-            sb.storage.delete_bucket(bucket)
+            storage_call(sb.storage.delete_bucket, bucket, job=job)
         else:
             # Some versions expose remove_bucket
             if hasattr(sb.storage, "remove_bucket"):
-                sb.storage.remove_bucket(bucket)
+                storage_call(sb.storage.remove_bucket, bucket, job=job)
             else:
                 raise RuntimeError("SDK does not support bucket deletion in this version.")
-        flash(f"Bucket '{bucket}' deleted.", "success")
+    finally:
+        object_index.drop(bucket)
+        notify_changed(bucket, "", recursive=True)
+        try:
+            bucket_catalog.refresh()
+        except Exception as ex:
+            app.logger.warning("Bucket catalog refresh failed: %s", ex)
+    return f"Bucket '{bucket}' deleted ({removed} objects removed)."
+
+@app.route("/delete-bucket/<bucket>", methods=["POST"])
+def delete_bucket(bucket: str):
+    job = job_runner.submit("delete-bucket", f"Delete bucket '{bucket}'",
+                            lambda j: delete_bucket_job(bucket, j))
+    return job_response(job)
+
+def refresh_bucket_catalog():
+    try:
+        bucket_catalog.refresh()
     except Exception as ex:
-        flash(f"Failed to delete bucket '{bucket}': {ex}", "error")
-    return redirect(url_for("home"))
+        flash(f"Failed to list buckets: {ex}", "error")
 
 @app.route("/b/<bucket>", methods=["GET"])
 def browse(bucket: str):
-    """Return either full page (unused by main UI) or a panel fragment when ?partial=1."""
+    """Return either full page (unused by main UI) or a panel fragment when ?partial=1.
+
+    The fragment embeds the first page of the listing (`limit` rows); further
+    pages and refreshes come from the JSON API.
+    """
     path = (request.args.get("path") or "").strip("/")
     partial = request.args.get("partial")
+    limit = request.args.get("limit", PANEL_PAGE_SIZE, type=int)
     segments = split_path(path)
     try:
-        folders, files = list_items(bucket, path)
+        folders, files, next_cursor = list_items(bucket, path, limit)
     except Exception as ex:
         flash(f"Failed to list: {ex}", "error")
-        folders, files = [], []
+        folders, files, next_cursor = [], [], None
     if partial:
-        return render_template_string(
-            PANEL,
-            buckets=get_bucket_names(),
+        listing = listing_payload(bucket, path, folders, files, next_cursor)
+        return render_template(
+            "panel.html",
             bucket=bucket,
             path=path,
             segments=segments,
-            folders=folders,
-            files=files,
+            listing=listing,
+            etag=listing_etag(listing),
+            page_size=limit,
+            indexed=object_index.built(bucket) is not None,
         )
     # Fallback full page rendering if someone navigates directly
-    return render_template_string(
-        PAGE, buckets=get_bucket_names()
-    )
+    return render_template("page.html", buckets=get_bucket_names())
 
 @app.route("/b/<bucket>/mkdir", methods=["POST"])
 def mkdir(bucket: str):
@@ -626,15 +3932,13 @@ def mkdir(bucket: str):
     name = (request.form.get("folder_name") or "").strip()
     err = validate_segment(name)
     if err:
-        flash(err, "error")
-        return ("", 200)
+        return panel_result(err, "error")
     full = join_path(current_path, name)
     ok, msg = ensure_placeholder_for_folder(bucket, full)
     if ok:
-        flash(f"Folder '{name}' created.", "success")
-    else:
-        flash(msg, "error")
-    return ("", 200)
+        notify_changed(bucket, msg, entry=written_entry(0))
+        return panel_result(f"Folder '{name}' created.")
+    return panel_result(msg, "error")
 
 @app.route("/b/<bucket>/upload", methods=["POST"])
 def upload(bucket: str):
@@ -649,48 +3953,137 @@ def upload(bucket: str):
         flash(seg_err, "error")
         return ("", 200)
     key = join_path(current_path, filename)
+    os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=UPLOAD_SPOOL_DIR, suffix=".form")
+    os.close(fd)
+    entry: Any = UNKNOWN
     try:
-        data = file.read()
-        sb.storage.from_(bucket).upload(key, data)
+        # upload from a path so the body is streamed from disk, not held in memory
+        file.save(tmp)
+        sb.storage.from_(bucket).upload(key, tmp, upload_file_options(key, False))
+        entry = written_entry(os.path.getsize(tmp))
         flash(f"Uploaded '{filename}'", "success")
     except Exception as ex:
         flash(f"Upload failed: {ex}", "error")
+    finally:
+        os.remove(tmp)
+    notify_changed(bucket, key, entry=entry)
     return ("", 200)
 
+@app.route("/b/<bucket>/upload-many", methods=["POST"])
+def upload_many(bucket: str):
+    """Upload several files in one request, keeping their relative paths under current_path.
+
+    Form fields: current_path, files (repeated), paths (the files' relative paths, in
+    order; defaults to their filenames), expand_zip=1 to unpack .zip files and
+    overwrite=1 to replace existing objects.
+    Replies with per-file results.
+    """
+    current_path = (request.form.get("current_path") or "").strip("/")
+    files = request.files.getlist("files")
+    if not files:
+        return jsonify({"error": "Please choose files to upload."}), 400
+    # browsers may strip directories from multipart filenames, so paths can be sent alongside
+    paths = request.form.getlist("paths")
+    named = [(paths[i] if i < len(paths) else fs.filename or "", fs) for i, fs in enumerate(files)]
+    items = collect_upload_items(current_path, named, request.form.get("expand_zip") == "1")
+    upload_items(bucket, items, request.form.get("overwrite") == "1")
+    notify_uploaded(bucket, items)
+    return jsonify(upload_results(items))
+
+@app.route("/b/<bucket>/uploads", methods=["POST"])
+def upload_init(bucket: str):
+    """Start or resume a chunked upload; replies with the offset to continue from."""
+    current_path = (request.form.get("current_path") or "").strip("/")
+    filename = os.path.basename(request.form.get("filename") or "")
+    size = request.form.get("size", -1, type=int)
+    seg_err = validate_segment(filename)
+    if seg_err or size < 0:
+        return jsonify({"error": seg_err or "File size is required."}), 400
+    key = join_path(current_path, filename)
+    upload_id, received = init_chunked_upload(bucket, key, size, request.form.get("fingerprint") or "")
+    return jsonify({"upload_id": upload_id, "offset": received, "size": size,
+                    "chunk_size": UPLOAD_CHUNK_SIZE})
+
+@app.route("/b/<bucket>/uploads/<upload_id>", methods=["GET", "PUT"])
+def upload_chunk(bucket: str, upload_id: str):
+    """GET reports progress; PUT appends the raw request body at ?offset=."""
+    info = load_chunked_upload(upload_id)
+    if not info or info["bucket"] != bucket:
+        return jsonify({"error": "Unknown upload."}), 404
+    if request.method == "PUT":
+        offset = request.args.get("offset", -1, type=int)
+        if offset != info["received"]:
+            return jsonify({"error": "Offset mismatch.", "offset": info["received"]}), 409
+        if offset + (request.content_length or 0) > info["size"]:
+            return jsonify({"error": "Chunk runs past the end of the file.", "offset": offset}), 413
+        try:
+            info["received"] = append_upload_chunk(upload_id, offset, request.stream, info["size"])
+        except UploadChunkError as ex:
+            return jsonify({"error": str(ex), "offset": ex.offset}), ex.status
+    return jsonify({"upload_id": upload_id, "offset": info["received"], "size": info["size"]})
+
+@app.route("/b/<bucket>/uploads/<upload_id>/complete", methods=["POST"])
+def upload_complete(bucket: str, upload_id: str):
+    info = load_chunked_upload(upload_id)
+    if not info or info["bucket"] != bucket:
+        return jsonify({"error": "Unknown upload."}), 404
+    if info["received"] != info["size"]:
+        return jsonify({"error": "Upload is incomplete.", "offset": info["received"]}), 409
+    key = info["key"]
+    part, _ = _spool_paths(upload_id)
+    try:
+        sb.storage.from_(bucket).upload(key, part, upload_file_options(key, False))
+    except Exception as ex:
+        # keep the spool so completing can be retried without resending data
+        return jsonify({"error": f"Upload failed: {ex}"}), 502
+    discard_chunked_upload(upload_id)
+    notify_changed(bucket, key, entry=written_entry(info["size"]))
+    return jsonify({"key": key, "message": f"Uploaded '{os.path.basename(key)}'"})
+
 @app.route("/b/<bucket>/delete-file", methods=["POST"])
 def delete_file(bucket: str):
     file_path = (request.form.get("file_path") or "").strip("/")
+    entry: Any = UNKNOWN
     try:
         sb.storage.from_(bucket).remove([file_path])
-        flash(f"Deleted '{file_path}'", "success")
+        entry = None
+        result = panel_result(f"Deleted '{file_path}'")
     except Exception as ex:
-        flash(f"Delete failed: {ex}", "error")
-    return ("", 200)
+        result = panel_result(f"Delete failed: {ex}", "error")
+    notify_changed(bucket, file_path, entry=entry)
+    return result
 
 @app.route("/b/<bucket>/delete-prefix", methods=["POST"])
 def delete_prefix(bucket: str):
     current_path = (request.form.get("current_path") or "").strip("/")
     if not current_path:
-        flash("Nothing to delete at root. Use file delete instead.", "error")
-        return ("", 200)
-    deleted, errors = delete_prefix_recursive(bucket, current_path)
-    if errors:
-        more = " ..." if len(errors) > 3 else ""
-        flash(f"Deleted {deleted} objects, with errors: {errors[:3]}{more}", "error")
-    else:
-        flash(f"Deleted {deleted} objects under '{current_path}'", "success")
-    return ("", 200)
+        return panel_result("Nothing to delete at root. Use file delete instead.", "error")
+
+    def _run(job: Job) -> str:
+        try:
+            deleted, errors = delete_prefix_recursive(bucket, current_path, job)
+        finally:
+            notify_changed(bucket, current_path, recursive=True)
+        job.errors.extend(errors)
+        if errors:
+            more = " ..." if len(errors) > 3 else ""
+            return f"Deleted {deleted} objects, with errors: {errors[:3]}{more}"
+        return f"Deleted {deleted} objects under '{current_path}'"
+
+    return job_response(job_runner.submit("delete-prefix", f"Delete '{bucket}/{current_path}'", _run))
 
 @app.route("/transfer", methods=["POST"])
 def transfer():
     """
-    Copy/Move files or folders.
+    Copy/Move files or folders, or sync a folder.
     Form fields:
-      - op: 'copy' | 'move'
+      - op: 'copy' | 'move' | 'sync'
       - is_folder: '1' for folder, '0' for file
       - src_bucket, src_path
       - dst_bucket
       - dst_path (optional)
+      - delete_extra: '1' to delete destination objects missing from the source (sync only)
     """
     op = (request.form.get("op") or "").strip().lower()
     is_folder = (request.form.get("is_folder") or "0").strip() == "1"
@@ -699,9 +4092,16 @@ def transfer():
     src_path = (request.form.get("src_path") or "").strip("/")
     dst_path = (request.form.get("dst_path") or "").strip("/")
 
-    if not (op in {"copy", "move"} and src_bucket and dst_bucket and src_path):
-        flash("Invalid transfer request.", "error")
-        return ("", 200)
+    if not (op in {"copy", "move", "sync"} and src_bucket and dst_bucket and src_path):
+        return panel_result("Invalid transfer request.", "error")
+    if op == "sync":
+        if not is_folder:
+            return panel_result("Only folders can be synced.", "error")
+        dst_full = (dst_path or src_path).strip("/")
+        if src_bucket == dst_bucket and prefixes_overlap(src_path.strip("/"), dst_full):
+            return panel_result("Source and target folders must not overlap.", "error")
+        return job_response(submit_sync(src_bucket, src_path, dst_bucket, dst_full,
+                                        request.form.get("delete_extra") == "1"))
 
     name = os.path.basename(src_path.rstrip("/"))
     # default target path: same name at root (or under provided folder)
@@ -719,50 +4119,321 @@ def transfer():
     else:
         dst_full = name
 
+    if not is_folder and (not dst_full or dst_full.endswith("/")):
+        dst_full = join_path(dst_full, name)
+    move = op == "move"
+    if is_folder:
+        # journaled, so an interrupted copy/move can be resumed (POST /transfers/<id>/resume)
+        return job_response(submit_transfer(transfer_journal.create(op, src_bucket, src_path, dst_bucket, dst_full)))
+
+    def _run(job: Job) -> str:
+        copied = copied_entry(src_bucket, src_path)
+        entries: Tuple[Any, Any] = (UNKNOWN, UNKNOWN)
+        try:
+            job.set_total(1)
+            transfer_object(src_bucket, src_path, dst_bucket, dst_full, move=move)
+            entries = (copied, None)
+            job.advance(1)
+            return f"{op.capitalize()}ed file to '{dst_bucket}/{dst_full}'."
+        finally:
+            notify_changed(dst_bucket, dst_full, entry=entries[0])
+            if move:
+                notify_changed(src_bucket, src_path, entry=entries[1])
+
+    verb = "Move" if move else "Copy"
+    return job_response(job_runner.submit(
+        op, f"{verb} '{src_bucket}/{src_path}' → '{dst_bucket}/{dst_full}'", _run))
+
+def submit_sync(src_bucket: str, src_path: str, dst_bucket: str, dst_path: str, delete_extra: bool) -> Job:
+    """Sync mirrors into dst_path itself (unlike copy, which nests the folder under it)."""
+
+    def _run(job: Job) -> str:
+        try:
+            summary, errors = sync_folder(src_bucket, src_path, dst_bucket, dst_path, delete_extra, job)
+        finally:
+            notify_changed(dst_bucket, dst_path, recursive=True)
+        job.errors.extend(errors)
+        return sync_message(f"{src_bucket}/{src_path}", f"{dst_bucket}/{dst_path}", summary, errors)
+
+    return job_runner.submit("sync", f"Sync '{src_bucket}/{src_path}' → '{dst_bucket}/{dst_path}'", _run)
+
+@app.route("/transfers", methods=["GET"])
+def list_transfers():
+    """Journaled folder copies/moves that have not finished (resumable unless running)."""
+    return jsonify(transfer_journal.unfinished())
+
+@app.route("/transfers/<transfer_id>/resume", methods=["POST"])
+def resume_transfer(transfer_id: str):
+    job = submit_transfer(transfer_id)
+    if job is None:
+        t = transfer_journal.get(transfer_id)
+        reason = "Unknown transfer." if t is None else (
+            "Transfer already finished." if t["status"] == "done" else "Transfer is still running.")
+        return panel_result(reason, "error")
+    return job_response(job)
+
+@app.route("/b/<bucket>/index", methods=["GET", "POST"])
+def bucket_index(bucket: str):
+    """GET: index status; POST: (re)build the bucket's object index as a job."""
+    if request.method == "POST":
+        return job_response(job_runner.submit(
+            "index", f"Index bucket '{bucket}'", lambda j: build_object_index(bucket, j)))
+    index = object_index.built(bucket)
+    if not index:
+        return jsonify({"bucket": bucket, "ready": False})
+    objects, nbytes = index.folder_stats("")
+    return jsonify({"bucket": bucket, "ready": True, "built_at": float(index.meta("built_at")),
+                    "objects": objects, "bytes": nbytes})
+
+@app.route("/b/<bucket>/du", methods=["GET"])
+def folder_usage(bucket: str):
+    """Recursive object count and bytes under ?path= (from the index when built)."""
+    path = (request.args.get("path") or "").strip("/")
+    index = object_index.get(bucket, path)
+    if index:
+        objects, nbytes = index.folder_stats(path)
+        return jsonify({"path": path, "objects": objects, "bytes": nbytes, "source": "index"})
     try:
-        if is_folder:
-            copied, errors = copy_folder_recursive(src_bucket, src_path, dst_bucket, dst_full)
-            if errors:
-                flash(f"Copied {copied} objects with some errors (showing first 3): {errors[:3]}", "error")
-            else:
-                flash(f"Copied folder '{src_path}' → '{dst_bucket}/{dst_full}' ({copied} objects).", "success")
-            if op == "move":
-                del_count, del_errors = delete_prefix_recursive(src_bucket, src_path)
-                if del_errors:
-                    flash(f"Move completed, but cleanup had errors: {del_errors[:3]}", "error")
-                else:
-                    flash(f"Moved folder. Deleted {del_count} source objects.", "success")
-        else:
-            # single file
-            if not dst_full or dst_full.endswith("/"):
-                dst_full = join_path(dst_full, name)
-            copy_file(src_bucket, src_path, dst_bucket, dst_full)
-            if op == "move":
-                try:
-                    sb.storage.from_(src_bucket).remove([src_path])
-                except Exception as ex:
-                    flash(f"Copied, but failed to delete source: {ex}", "error")
-                    return ("", 200)
-            flash(f"{op.capitalize()}ed file to '{dst_bucket}/{dst_full}'.", "success")
+        found = walk_objects(bucket, path)
     except Exception as ex:
-        flash(f"Transfer failed: {ex}", "error")
-    return ("", 200)
+        return jsonify({"error": str(ex)}), 502
+    return jsonify({"path": path, "objects": len(found),
+                    "bytes": sum(entry_size(e) for _, e in found), "source": "walk"})
+
+@app.route("/b/<bucket>/search", methods=["GET"])
+def search(bucket: str):
+    """Stream keys matching ?q= as NDJSON; ?mode=substring|prefix|glob (default: guessed)."""
+    q = request.args.get("q") or ""
+    mode = request.args.get("mode") or ("glob" if any(c in q for c in "*?[") else "substring")
+    limit = max(1, min(request.args.get("limit", SEARCH_MAX_RESULTS, type=int), SEARCH_MAX_RESULTS))
+    if not q or mode not in {"substring", "prefix", "glob"}:
+        return jsonify({"error": "A query and a valid mode are required."}), 400
+    try:
+        index = search_indexes.get(bucket)
+    except Exception as ex:
+        return jsonify({"error": f"Failed to index bucket: {ex}"}), 502
+
+    def _results():
+        started, count = time.perf_counter(), 0
+        for key in index.search(q, mode):
+            yield json.dumps({"key": key}) + "\n"
+            count += 1
+            if count >= limit:
+                break
+        ms = round((time.perf_counter() - started) * 1000, 1)
+        yield json.dumps({"done": True, "count": count, "truncated": count >= limit, "ms": ms}) + "\n"
+
+    return Response(stream_with_context(_results()), mimetype="application/x-ndjson")
+
+# ---------------------- JSON API ----------------------
+def listing_payload(bucket: str, path: str, folders: List[Item], files: List[Item],
+                    next_cursor: Optional[str]) -> Dict[str, Any]:
+    """Compact listing: rows are arrays in the order given by "fields"."""
+    return {
+        "bucket": bucket,
+        "path": path,
+        "fields": {"folders": ["name", "size", "count", "updated_at"], "files": ["name", "size", "updated_at"]},
+        "folders": [[f.name, f.size, f.count, f.updated_at] for f in folders],
+        "files": [[f.name, f.size, f.updated_at] for f in files],
+        "next_cursor": next_cursor,
+    }
+
+def json_bytes(payload: Any) -> bytes:
+    return json.dumps(payload, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+def listing_etag(payload: Dict[str, Any]) -> str:
+    return hashlib.sha256(json_bytes(payload)).hexdigest()[:32]
+
+def etag_matches(if_none_match, etag: str) -> bool:
+    # compressed representations carry a suffixed tag (see compress_body)
+    return any(if_none_match.contains(etag + sfx) for sfx in ("", "-gzip", "-br"))
+
+def api_json(payload: Any, etag: Optional[str] = None) -> Response:
+    """JSON response with a strong ETag; answers a matching If-None-Match with 304."""
+    body = json_bytes(payload)
+    etag = etag or hashlib.sha256(body).hexdigest()[:32]
+    if etag_matches(request.if_none_match, etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(body, mimetype="application/json")
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.vary.add("Accept-Encoding")
+    return resp
+
+@app.route("/api/v1/buckets", methods=["GET"])
+def api_buckets():
+    try:
+        names = bucket_catalog.names()
+    except Exception as ex:
+        return jsonify({"error": f"Failed to list buckets: {ex}"}), 502
+    return api_json({"buckets": names})
+
+@app.route("/api/v1/b/<bucket>/list", methods=["GET"])
+def api_list(bucket: str):
+    """One page of a folder listing: ?path=&limit=&cursor= (cursor from next_cursor)."""
+    path = (request.args.get("path") or "").strip("/")
+    limit = request.args.get("limit", PANEL_PAGE_SIZE, type=int)
+    try:
+        folders, files, next_cursor = list_items(bucket, path, limit, request.args.get("cursor"))
+    except Exception as ex:
+        return jsonify({"error": f"Failed to list: {ex}"}), 502
+    payload = listing_payload(bucket, path, folders, files, next_cursor)
+    return api_json(payload, listing_etag(payload))
+
+COMPRESSIBLE_TYPES = {"application/json", "text/html"}
+
+def compressible(resp: Response) -> bool:
+    return not (resp.direct_passthrough or resp.is_streamed or resp.status_code != 200
+                or resp.mimetype not in COMPRESSIBLE_TYPES or "Content-Encoding" in resp.headers)
+
+def compress_body(resp: Response, data: bytes, accepted) -> Optional[bytes]:
+    """Compressed body for the client's Accept-Encoding (setting the headers), or None."""
+    resp.vary.add("Accept-Encoding")
+    if brotli is not None and accepted["br"]:
+        encoding = "br"
+    elif accepted["gzip"]:
+        encoding = "gzip"
+    else:
+        return None
+    if len(data) < COMPRESS_MIN_BYTES:
+        return None
+    resp.headers["Content-Encoding"] = encoding
+    etag, weak = resp.get_etag()
+    if etag:
+        resp.set_etag(f"{etag}-{encoding}", weak)
+    return brotli.compress(data, quality=5) if encoding == "br" else gzip.compress(data, compresslevel=6)
+
+@app.after_request
+def compress_response(resp: Response) -> Response:
+    """gzip/brotli-compress buffered JSON and HTML responses."""
+    if compressible(resp):
+        body = compress_body(resp, resp.get_data(), request.accept_encodings)
+        if body is not None:
+            resp.set_data(body)
+    return resp
+
+@app.route("/jobs", methods=["GET"])
+def list_jobs():
+    return jsonify([j.to_dict() for j in job_runner.list()])
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id: str):
+    job = job_runner.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job."}), 404
+    return jsonify(job.to_dict())
+
+@app.route("/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id: str):
+    job = job_runner.cancel(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job."}), 404
+    return jsonify(job.to_dict())
+
+# request headers forwarded upstream / response headers passed back on downloads
+DOWNLOAD_REQUEST_HEADERS = ("Range", "If-Range", "If-None-Match", "If-Modified-Since")
+DOWNLOAD_RESPONSE_HEADERS = (
+    "Content-Length", "Content-Range", "Content-Encoding", "Accept-Ranges",
+    "ETag", "Last-Modified", "Cache-Control",
+)
 
 @app.route("/download/<bucket>/<path:path>")
 def download(bucket: str, path: str):
+    """Stream an object to the client chunk by chunk, honouring Range/conditional headers."""
+    if download_cache.enabled:
+        try:
+            cached = download_cache.get(bucket, path)
+            if cached is not None:
+                return send_cached(cached, path)
+        except FileNotFoundError:
+            pass  # evicted between lookup and open; stream it instead
+        except Exception as ex:
+            app.logger.warning("Download cache failed for %s/%s: %s", bucket, path, ex)
+    fwd = {h: request.headers[h] for h in DOWNLOAD_REQUEST_HEADERS if h in request.headers}
     try:
-        data = sb.storage.from_(bucket).download(path)
-        mime, _ = mimetypes.guess_type(path)
-        return send_file(
-            io.BytesIO(data if isinstance(data, (bytes, bytearray)) else bytes(data)),
-            mimetype=mime or "application/octet-stream",
-            as_attachment=True,
-            download_name=os.path.basename(path),
-        )
+        upstream = open_object_stream(bucket, path, fwd)
     except Exception as ex:
         flash(f"Download failed: {ex}", "error")
         return redirect(url_for("home"))
+    if upstream.status_code >= 400 and upstream.status_code != 416:
+        try:
+            detail = upstream.read().decode("utf-8", "replace")[:200]
+        finally:
+            upstream.close()
+        flash(f"Download failed: {upstream.status_code} {detail}", "error")
+        return redirect(url_for("home"))
+
+    def _body():
+        try:
+            yield from upstream.iter_raw(DOWNLOAD_CHUNK_SIZE)
+        finally:
+            upstream.close()
+
+    mime, _ = mimetypes.guess_type(path)
+    resp = Response(
+        stream_with_context(_body()),
+        status=upstream.status_code,
+        mimetype=mime or "application/octet-stream",
+        direct_passthrough=True,
+    )
+    for h in DOWNLOAD_RESPONSE_HEADERS:
+        if h in upstream.headers:
+            resp.headers[h] = upstream.headers[h]
+    resp.headers["Content-Disposition"] = attachment_header(os.path.basename(path))
+    return resp
+
+def cached_file_options(cached: CachedObject, path: str) -> Dict[str, Any]:
+    """send_file arguments for a cached object (shared with the Quart app)."""
+    tag, weak = unquote_etag(cached.etag) if cached.etag else (None, False)
+    last_modified = None
+    if cached.last_modified:
+        try:
+            last_modified = parsedate_to_datetime(cached.last_modified)
+        except (TypeError, ValueError):
+            pass
+    return {"mimetype": cached.content_type or mimetypes.guess_type(path)[0] or "application/octet-stream",
+            "as_attachment": True, "download_name": os.path.basename(path),
+            "etag": tag if tag and not weak else False, "last_modified": last_modified}
+
+def send_cached(cached: CachedObject, path: str) -> Response:
+    """A cached object as a file response: sendfile, Range and conditional requests
+    are handled by send_file."""
+    resp = send_file(cached.path, **cached_file_options(cached, path))
+    if cached.cache_control:
+        resp.headers["Cache-Control"] = cached.cache_control
+    return resp
+
+def attachment_header(name: str) -> str:
+    try:
+        name.encode("ascii")
+        return dump_options_header("attachment", {"filename": name})
+    except UnicodeEncodeError:
+        # same RFC 2231 fallback send_file uses for non-ASCII names
+        return f"attachment; filename*=UTF-8''{quote(name)}"
+
+@app.route("/download-zip/<bucket>/", defaults={"path": ""})
+@app.route("/download-zip/<bucket>/<path:path>")
+def download_zip(bucket: str, path: str):
+    """Stream a folder (or the whole bucket) as a ZIP archive."""
+    name = (os.path.basename(path.strip("/")) or bucket) + ".zip"
+    resp = Response(stream_with_context(iter_folder_zip(bucket, path)),
+                    mimetype="application/zip", direct_passthrough=True)
+    resp.headers["Content-Disposition"] = attachment_header(name)
+    return resp
+
+@app.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/cache-stats")
+def cache_stats():
+    return jsonify({"listing": listing_cache.stats(), "download": download_cache.stats()})
 
 if __name__ == "__main__":
+    try:
+        storage_endpoint()
+    except RuntimeError as ex:
+        raise SystemExit(str(ex))
     # Use host='0.0.0.0' to expose on LAN if needed
     app.run(debug=True)
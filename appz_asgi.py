@@ -0,0 +1,877 @@
+"""Async (ASGI) serving mode for the storage file manager.
+
+Serves the same routes and pages as appz.py, on Quart, with storage3's
+AsyncStorageClient. Listings, recursive walks and bulk transfers issue their
+Storage calls concurrently, bounded per operation and process-wide by
+ASYNC_STORAGE_CONCURRENCY, so one process keeps hundreds of slow calls in flight.
+
+    pip install quart hypercorn
+    hypercorn appz_asgi:app
+
+Bulk operations (walks, deletes, syncs, folder ZIPs) are appz's step
+generators, driven here by iter_steps/run_steps, so only the I/O differs.
+Local work (object index, search index, upload spools) is shared with appz and
+runs in worker threads so it never blocks the event loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import itertools
+import json
+import mimetypes
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from jinja2 import DictLoader
+from quart import Quart, Response, request, redirect, url_for, render_template, flash, jsonify, send_file
+from quart.signals import before_render_template, template_rendered
+from quart.wrappers.response import DataBody
+from storage3 import AsyncStorageClient
+
+import appz as core
+from appz import (
+    DOWNLOAD_CHUNK_SIZE, DOWNLOAD_REQUEST_HEADERS, DOWNLOAD_RESPONSE_HEADERS, LIST_PAGE_SIZE, PANEL_PAGE_SIZE,
+    SEARCH_MAX_RESULTS, UPLOAD_CHUNK_SIZE, UPLOAD_SPOOL_DIR,
+    Item, Job, JobCancelled, bucket_catalog, entry_size, items_from_entries, join_path,
+    job_runner, listing_cache, object_index, parse_cursor, search_indexes, split_path,
+    validate_segment,
+)
+
+# most Storage calls in flight at once, across all requests and jobs of this process
+# (the limit adapts below this when the backend throttles)
+ASYNC_STORAGE_CONCURRENCY = int(os.getenv("ASYNC_STORAGE_CONCURRENCY", "256"))
+
+app = Quart(__name__)
+app.config["MAX_CONTENT_LENGTH"] = core.app.config["MAX_CONTENT_LENGTH"]
+app.secret_key = core.app.secret_key
+app.jinja_loader = DictLoader(core.TEMPLATES)
+
+# ---------------------- Storage client ----------------------
+_storage: Optional[AsyncStorageClient] = None
+_http: Optional[httpx.AsyncClient] = None
+_limit: Optional[AsyncAdaptiveLimit] = None
+_tasks: set = set()  # running job tasks (the loop only keeps weak references)
+
+async def _apply_operation_timeout(req: httpx.Request) -> None:
+    core._apply_operation_timeout(req)
+
+async def _start_storage_timer(req: httpx.Request) -> None:
+    core._start_storage_timer(req)
+
+async def _record_storage_response(resp: httpx.Response) -> None:
+    core._record_storage_response(resp)
+
+class AsyncAdaptiveLimit:
+    """core.AdaptiveLimit for coroutines: same AIMD rule, waiters park on an asyncio.Condition."""
+
+    def __init__(self, maximum: int):
+        # starts at the ceiling; throttling halves it
+        self.state = core.AdaptiveLimit(maximum, core.BULK_MIN_CONCURRENCY, maximum)
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> float:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.state.in_flight < int(self.state.limit))
+            self.state.in_flight += 1
+        return time.monotonic()
+
+    async def release(self, started: float, outcome: Optional[str]):
+        async with self._cond:
+            self.state.in_flight -= 1
+            self.state.adjust(started, outcome)
+            self._cond.notify_all()
+
+    @asynccontextmanager
+    async def slot(self):
+        started = await self.acquire()
+        try:
+            yield
+        finally:
+            await self.release(started, None)
+
+@app.before_serving
+async def open_storage():
+    global _storage, _http, _limit
+    options = core.http_client_options()
+    options["limits"] = httpx.Limits(
+        max_connections=max(core.HTTP_MAX_CONNECTIONS, ASYNC_STORAGE_CONCURRENCY),
+        max_keepalive_connections=core.HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=core.HTTP_KEEPALIVE_EXPIRY,
+    )
+    _http = httpx.AsyncClient(**options, event_hooks={
+        "request": [_apply_operation_timeout, _start_storage_timer],
+        "response": [_record_storage_response],
+    })
+    url, headers = core.storage_endpoint()
+    _storage = AsyncStorageClient(url, headers, http_client=_http)
+    _limit = AsyncAdaptiveLimit(ASYNC_STORAGE_CONCURRENCY)
+
+@app.after_serving
+async def close_storage():
+    if _http is not None:
+        await _http.aclose()
+
+def storage() -> AsyncStorageClient:
+    return _storage
+
+async def call(fn: Callable[..., Awaitable[Any]], *args) -> Any:
+    """Await one Storage call under the process-wide adaptive concurrency limit and the
+    bucket's circuit breaker, retrying transient errors (see core.storage_call)."""
+    breaker = core.breaker_for(core.call_bucket(fn))
+    attempt = 0
+    while True:
+        started = await _limit.acquire()
+        wait = breaker.wait_time()
+        if wait:
+            await _limit.release(started, "skipped")
+            await asyncio.sleep(wait)
+            continue
+        outcome: Optional[str] = "skipped"  # until the call answers or fails
+        try:
+            result = await fn(*args)
+            outcome = None
+            return result
+        except Exception as ex:
+            outcome, retry_after = core.classify_error(ex)
+            if outcome is None:
+                # answered, but a 404/409/400 says nothing of the bucket's health or
+                # headroom: it neither closes the breaker nor grows the limit
+                outcome = "skipped"
+                raise
+            attempt += 1
+            if attempt >= core.RETRY_ATTEMPTS:
+                raise
+        finally:
+            await _limit.release(started, outcome)
+            breaker.record(outcome)
+        core.metrics.inc("sfm_storage_retries_total",
+                         {"operation": getattr(fn, "__name__", "call"), "reason": outcome})
+        await asyncio.sleep(core.retry_delay(attempt, retry_after))
+
+async def map_concurrent(fn: Callable[[Any], Awaitable[Any]], items: List[Any],
+                         limit: int = ASYNC_STORAGE_CONCURRENCY) -> List[Any]:
+    """Results of fn(item) in order, at most `limit` running at once.
+
+    A fixed set of workers pulls from one iterator, so a million items do not
+    become a million pending tasks; if one raises, the others are cancelled.
+    """
+    results: List[Any] = [None] * len(items)
+    pending = iter(enumerate(items))
+
+    async def _worker():
+        for i, item in pending:
+            results[i] = await fn(item)
+
+    workers = [asyncio.ensure_future(_worker()) for _ in range(min(limit, len(items)))]
+    try:
+        await asyncio.gather(*workers)
+    except BaseException:
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        raise
+    return results
+
+async def iter_steps(steps: core.Steps, job: Optional[Job] = None,
+                     result: Optional[List[Any]] = None) -> AsyncIterator[Any]:
+    """core.iter_steps on the event loop: Storage calls are awaited, spawned steps run
+    as tasks and blocking work in a thread. Yields the steps' output; their return
+    value is appended to `result`."""
+    tasks: set = set()
+    send: Any = None
+    error: Optional[BaseException] = None
+    try:
+        while True:
+            try:
+                step = steps.throw(error) if error is not None else steps.send(send)
+            except StopIteration as stop:
+                if result is not None:
+                    result.append(stop.value)
+                return
+            send, error = None, None
+            try:
+                if isinstance(step, core.StorageOp):
+                    send = await call(core.storage_method(storage(), step), *step.args)
+                elif isinstance(step, core.BlockingCall):
+                    send = await asyncio.to_thread(step.fn, *step.args)
+                elif isinstance(step, core.Spawn):
+                    send = asyncio.ensure_future(run_steps(step.steps, job))
+                    tasks.add(send)
+                elif isinstance(step, core.Join):
+                    send = await step.handle
+                elif isinstance(step, core.PipeObject):
+                    async for out in pipe_object(step):
+                        yield out
+                else:
+                    yield step
+            except JobCancelled:
+                raise
+            except Exception as ex:
+                error = ex
+    finally:
+        steps.close()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def run_steps(steps: core.Steps, job: Optional[Job] = None) -> Any:
+    """Drive steps that produce no output to completion; returns their return value."""
+    result: List[Any] = []
+    driver = iter_steps(steps, job, result)
+    async for out in driver:
+        await driver.aclose()
+        raise TypeError(f"steps yielded output {out!r} where none was expected")
+    return result[0]
+
+async def pipe_object(step: core.PipeObject) -> AsyncIterator[bytes]:
+    upstream = await open_object_stream(step.bucket, step.key)
+    try:
+        if upstream.status_code >= 400:
+            raise RuntimeError(f"{upstream.status_code} {(await upstream.aread())[:200]!r}")
+        with step.open_writer() as w:
+            async for chunk in upstream.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                w.write(chunk)
+                yield step.drain()
+    finally:
+        await upstream.aclose()
+
+# each request runs in its own task, so core.current_timings is per request here too
+@app.before_request
+async def start_request_timings():
+    core.current_timings.set(core.RequestTimings(time.perf_counter()))
+
+before_render_template.connect(core._render_started, app)
+template_rendered.connect(core._render_finished, app)
+
+@app.after_request
+async def record_request_timings(resp: Response) -> Response:
+    return core.finish_request_timings(resp, request.endpoint, request.method)
+
+async def notify_changed(bucket: str, path: str, recursive: bool = False, entry: Any = core.UNKNOWN):
+    # listeners update the SQLite/search indexes with blocking calls
+    await asyncio.to_thread(core.notify_changed, bucket, path, recursive, entry)
+
+# ---------------------- Helpers ----------------------
+async def get_bucket_names() -> List[str]:
+    """Bucket names from the shared catalog (refreshed in the background)."""
+    try:
+        return await asyncio.to_thread(bucket_catalog.names)
+    except Exception as ex:
+        await flash(f"Failed to list buckets: {ex}", "error")
+        return []
+
+async def list_page(bucket: str, prefix: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+    return await call(storage().from_(bucket).list, prefix or "", core.list_options(limit, offset)) or []
+
+async def list_items(bucket: str, prefix: str, limit: int = PANEL_PAGE_SIZE,
+                     cursor: Optional[str] = None) -> Tuple[List[Item], List[Item], Optional[str]]:
+    """Return one page of (folders, files, next_cursor) in name order."""
+    prefix = (prefix or "").strip("/")
+    limit = max(1, min(limit, LIST_PAGE_SIZE))
+    offset = parse_cursor(cursor)
+    index = await asyncio.to_thread(object_index.get, bucket, prefix)
+    if index:
+        return await asyncio.to_thread(index.list_page, prefix, limit, offset)
+    entries = listing_cache.get(bucket, prefix, (limit, offset))
+    if entries is None:
+        entries = await list_page(bucket, prefix, limit, offset)
+        listing_cache.put(bucket, prefix, (limit, offset), entries)
+    next_cursor = str(offset + len(entries)) if len(entries) >= limit else None
+    folders, files = items_from_entries(entries)
+    return folders, files, next_cursor
+
+async def walk_objects(bucket: str, prefix: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """Return (full key, entry) for every object under prefix."""
+    return await run_steps(core.walk_steps(bucket, prefix))
+
+async def keys_under(bucket: str, prefix: str) -> List[str]:
+    """All keys at/under prefix, from the object index when the bucket has one."""
+    return await run_steps(core.keys_under_steps(bucket, prefix))
+
+async def ensure_placeholder_for_folder(bucket: str, prefix: str) -> Tuple[bool, str]:
+    placeholder_key = join_path(prefix, ".keep")
+    try:
+        await call(storage().from_(bucket).upload, placeholder_key, b"")
+        return True, placeholder_key
+    except Exception as ex:
+        return False, f"Failed to create folder placeholder: {ex}"
+
+async def delete_prefix_recursive(bucket: str, prefix: str, job: Optional[Job] = None) -> Tuple[int, List[str]]:
+    """Delete everything under prefix (folder)."""
+    return await run_steps(core.delete_prefix_steps(bucket, prefix, job), job)
+
+async def transfer_object(src_bucket: str, src_key: str, dst_bucket: str, dst_key: str, move: bool = False,
+                          overwrite: bool = False):
+    """Copy or move a single object (see core.transfer_object_steps)."""
+    await run_steps(core.transfer_object_steps(src_bucket, src_key, dst_bucket, dst_key, move, overwrite))
+
+async def sync_folder(src_bucket: str, src_prefix: str, dst_bucket: str, dst_prefix: str,
+                      delete_extra: bool = False, job: Optional[Job] = None) -> Tuple[Dict[str, int], List[str]]:
+    """Make dst_prefix match src_prefix (see core.sync_folder_steps)."""
+    return await run_steps(
+        core.sync_folder_steps(src_bucket, src_prefix, dst_bucket, dst_prefix, delete_extra, job), job)
+
+async def empty_bucket(bucket: str, job: Optional[Job] = None) -> int:
+    """Remove every object in bucket and check that none are left (see core.empty_bucket_steps)."""
+    return await run_steps(core.empty_bucket_steps(bucket, job), job)
+
+# ---------------------- Jobs ----------------------
+def submit_job(kind: str, description: str, fn: Callable[[Job], Awaitable[str]]) -> Job:
+    """Run fn(job) as a task on the event loop; tracked by the shared job runner."""
+    job = job_runner.add(kind, description)
+
+    async def _run():
+        with job_runner.running(job):
+            job.message = await fn(job)
+
+    task = asyncio.get_running_loop().create_task(_run())
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
+
+def transfer_job(transfer_id: str, t: Dict[str, Any]) -> Callable[[Job], Awaitable[str]]:
+    """Job body for a journal transfer (see core.transfer_job); only the journal
+    reads and writes leave the event loop."""
+
+    async def _run(job: Job) -> str:
+        status, message = "interrupted", ""
+        try:
+            done, errors = await run_steps(core.run_transfer_steps(transfer_id, job), job)
+            job.errors.extend(errors)
+            status, message = core.transfer_outcome(t, done, errors)
+            return message
+        except Exception as ex:
+            message = str(ex)
+            raise
+        finally:
+            await asyncio.to_thread(core.transfer_journal.release, transfer_id, status, message)
+            await notify_changed(t["dst_bucket"], t["dst_prefix"], recursive=True)
+            if t["op"] == "move":
+                await notify_changed(t["src_bucket"], t["src_prefix"], recursive=True)
+
+    return _run
+
+async def submit_transfer(transfer_id: str) -> Optional[Job]:
+    """Claim a journal transfer and run it as a task; None if it can't be claimed."""
+    t = await asyncio.to_thread(core.transfer_journal.claim, transfer_id)
+    if t is None:
+        return None
+    job = submit_job(t["op"], core.transfer_description(t), transfer_job(transfer_id, t))
+    job.transfer_id = transfer_id
+    return job
+
+async def job_response(job: Job):
+    """JSON (202) for the panel JS; flash + redirect for plain form posts."""
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify(job.to_dict()), 202
+    await flash(f"{job.description} started in the background.", "success")
+    return redirect(url_for("home"))
+
+async def panel_result(message: str, category: str = "success"):
+    """Outcome of a quick panel action: JSON for the panel JS, a flash otherwise."""
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify({"message": message, "category": category})
+    await flash(message, category)
+    return ("", 200)
+
+# ---------------------- Routes ----------------------
+@app.route("/", methods=["GET"])
+async def home():
+    return await render_template("page.html", buckets=await get_bucket_names())
+
+@app.route("/create-bucket", methods=["POST"])
+async def create_bucket():
+    name = ((await request.form).get("bucket_name") or "").strip()
+    err = validate_segment(name)
+    if err:
+        await flash(err, "error")
+        return redirect(url_for("home"))
+    try:
+        await call(storage().create_bucket, name)
+        await notify_changed(name, "", recursive=True)
+        await asyncio.to_thread(bucket_catalog.refresh)
+        await flash(f"Bucket '{name}' created.", "success")
+    except Exception as ex:
+        await flash(f"Failed to create bucket: {ex}", "error")
+    return redirect(url_for("home"))
+
+@app.route("/delete-bucket/<bucket>", methods=["POST"])
+async def delete_bucket(bucket: str):
+    async def _run(job: Job) -> str:
+        try:
+            removed = await empty_bucket(bucket, job)
+            await call(storage().delete_bucket, bucket)
+        finally:
+            await asyncio.to_thread(object_index.drop, bucket)
+            await notify_changed(bucket, "", recursive=True)
+            try:
+                await asyncio.to_thread(bucket_catalog.refresh)
+            except Exception as ex:
+                app.logger.warning("Bucket catalog refresh failed: %s", ex)
+        return f"Bucket '{bucket}' deleted ({removed} objects removed)."
+
+    return await job_response(submit_job("delete-bucket", f"Delete bucket '{bucket}'", _run))
+
+@app.route("/b/<bucket>", methods=["GET"])
+async def browse(bucket: str):
+    """Return either full page (unused by main UI) or a panel fragment when ?partial=1."""
+    path = (request.args.get("path") or "").strip("/")
+    limit = request.args.get("limit", PANEL_PAGE_SIZE, type=int)
+    try:
+        folders, files, next_cursor = await list_items(bucket, path, limit)
+    except Exception as ex:
+        await flash(f"Failed to list: {ex}", "error")
+        folders, files, next_cursor = [], [], None
+    if request.args.get("partial"):
+        listing = core.listing_payload(bucket, path, folders, files, next_cursor)
+        return await render_template(
+            "panel.html",
+            bucket=bucket,
+            path=path,
+            segments=split_path(path),
+            listing=listing,
+            etag=core.listing_etag(listing),
+            page_size=limit,
+            indexed=await asyncio.to_thread(object_index.built, bucket) is not None,
+        )
+    return await render_template("page.html", buckets=await get_bucket_names())
+
+@app.route("/b/<bucket>/mkdir", methods=["POST"])
+async def mkdir(bucket: str):
+    form = await request.form
+    current_path = (form.get("current_path") or "").strip("/")
+    name = (form.get("folder_name") or "").strip()
+    err = validate_segment(name)
+    if err:
+        return await panel_result(err, "error")
+    full = join_path(current_path, name)
+    ok, msg = await ensure_placeholder_for_folder(bucket, full)
+    if ok:
+        await notify_changed(bucket, msg, entry=core.written_entry(0))
+        return await panel_result(f"Folder '{name}' created.")
+    return await panel_result(msg, "error")
+
+@app.route("/b/<bucket>/upload", methods=["POST"])
+async def upload(bucket: str):
+    current_path = ((await request.form).get("current_path") or "").strip("/")
+    file = (await request.files).get("file")
+    if not file or not file.filename:
+        await flash("Please choose a file to upload.", "error")
+        return ("", 200)
+    filename = os.path.basename(file.filename)
+    seg_err = validate_segment(filename)
+    if seg_err:
+        await flash(seg_err, "error")
+        return ("", 200)
+    key = join_path(current_path, filename)
+    os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=UPLOAD_SPOOL_DIR, suffix=".form")
+    os.close(fd)
+    entry: Any = core.UNKNOWN
+    try:
+        await file.save(tmp)
+        await call(storage().from_(bucket).upload, key, tmp, core.upload_file_options(key, False))
+        entry = core.written_entry(os.path.getsize(tmp))
+        await flash(f"Uploaded '{filename}'", "success")
+    except Exception as ex:
+        await flash(f"Upload failed: {ex}", "error")
+    finally:
+        os.remove(tmp)
+    await notify_changed(bucket, key, entry=entry)
+    return ("", 200)
+
+@app.route("/b/<bucket>/upload-many", methods=["POST"])
+async def upload_many(bucket: str):
+    """Upload several files in one request; same form fields and reply as appz.upload_many."""
+    form, files = await request.form, (await request.files).getlist("files")
+    current_path = (form.get("current_path") or "").strip("/")
+    if not files:
+        return jsonify({"error": "Please choose files to upload."}), 400
+    paths = form.getlist("paths")
+    named = [(paths[i] if i < len(paths) else fs.filename or "", fs) for i, fs in enumerate(files)]
+    items = await asyncio.to_thread(core.collect_upload_items, current_path, named, form.get("expand_zip") == "1")
+    overwrite = form.get("overwrite") == "1"
+
+    async def _one(item: core.UploadItem):
+        src = None
+        try:
+            src = await asyncio.to_thread(item.source)
+            await call(storage().from_(bucket).upload, item.key, src, core.upload_file_options(item.key, overwrite))
+            item.size = core.source_size(src)
+        except Exception as ex:
+            item.error = str(ex)
+        finally:
+            if isinstance(src, str):
+                os.remove(src)
+
+    await map_concurrent(_one, [i for i in items if not i.error])
+    await asyncio.to_thread(core.notify_uploaded, bucket, items)
+    return jsonify(core.upload_results(items))
+
+@app.route("/b/<bucket>/uploads", methods=["POST"])
+async def upload_init(bucket: str):
+    """Start or resume a chunked upload; replies with the offset to continue from."""
+    form = await request.form
+    current_path = (form.get("current_path") or "").strip("/")
+    filename = os.path.basename(form.get("filename") or "")
+    size = form.get("size", -1, type=int)
+    seg_err = validate_segment(filename)
+    if seg_err or size < 0:
+        return jsonify({"error": seg_err or "File size is required."}), 400
+    key = join_path(current_path, filename)
+    upload_id, received = await asyncio.to_thread(
+        core.init_chunked_upload, bucket, key, size, form.get("fingerprint") or "")
+    return jsonify({"upload_id": upload_id, "offset": received, "size": size,
+                    "chunk_size": UPLOAD_CHUNK_SIZE})
+
+@app.route("/b/<bucket>/uploads/<upload_id>", methods=["GET", "PUT"])
+async def upload_chunk(bucket: str, upload_id: str):
+    """GET reports progress; PUT appends the raw request body at ?offset=."""
+    info = core.load_chunked_upload(upload_id)
+    if not info or info["bucket"] != bucket:
+        return jsonify({"error": "Unknown upload."}), 404
+    if request.method == "PUT":
+        offset = request.args.get("offset", -1, type=int)
+        if offset != info["received"]:
+            return jsonify({"error": "Offset mismatch.", "offset": info["received"]}), 409
+        if offset + (request.content_length or 0) > info["size"]:
+            return jsonify({"error": "Chunk runs past the end of the file.", "offset": offset}), 413
+        # one chunk (at most UPLOAD_CHUNK_SIZE) is buffered, then written off the loop
+        body = io.BytesIO(await request.get_data(cache=False))
+        try:
+            info["received"] = await asyncio.to_thread(
+                core.append_upload_chunk, upload_id, offset, body, info["size"])
+        except core.UploadChunkError as ex:
+            return jsonify({"error": str(ex), "offset": ex.offset}), ex.status
+    return jsonify({"upload_id": upload_id, "offset": info["received"], "size": info["size"]})
+
+@app.route("/b/<bucket>/uploads/<upload_id>/complete", methods=["POST"])
+async def upload_complete(bucket: str, upload_id: str):
+    info = core.load_chunked_upload(upload_id)
+    if not info or info["bucket"] != bucket:
+        return jsonify({"error": "Unknown upload."}), 404
+    if info["received"] != info["size"]:
+        return jsonify({"error": "Upload is incomplete.", "offset": info["received"]}), 409
+    key = info["key"]
+    part, _ = core._spool_paths(upload_id)
+    try:
+        await call(storage().from_(bucket).upload, key, part, core.upload_file_options(key, False))
+    except Exception as ex:
+        # keep the spool so completing can be retried without resending data
+        return jsonify({"error": f"Upload failed: {ex}"}), 502
+    core.discard_chunked_upload(upload_id)
+    await notify_changed(bucket, key, entry=core.written_entry(info["size"]))
+    return jsonify({"key": key, "message": f"Uploaded '{os.path.basename(key)}'"})
+
+@app.route("/b/<bucket>/delete-file", methods=["POST"])
+async def delete_file(bucket: str):
+    file_path = ((await request.form).get("file_path") or "").strip("/")
+    entry: Any = core.UNKNOWN
+    try:
+        await call(storage().from_(bucket).remove, [file_path])
+        entry = None
+        result = await panel_result(f"Deleted '{file_path}'")
+    except Exception as ex:
+        result = await panel_result(f"Delete failed: {ex}", "error")
+    await notify_changed(bucket, file_path, entry=entry)
+    return result
+
+@app.route("/b/<bucket>/delete-prefix", methods=["POST"])
+async def delete_prefix(bucket: str):
+    current_path = ((await request.form).get("current_path") or "").strip("/")
+    if not current_path:
+        return await panel_result("Nothing to delete at root. Use file delete instead.", "error")
+
+    async def _run(job: Job) -> str:
+        try:
+            deleted, errors = await delete_prefix_recursive(bucket, current_path, job)
+        finally:
+            await notify_changed(bucket, current_path, recursive=True)
+        job.errors.extend(errors)
+        if errors:
+            more = " ..." if len(errors) > 3 else ""
+            return f"Deleted {deleted} objects, with errors: {errors[:3]}{more}"
+        return f"Deleted {deleted} objects under '{current_path}'"
+
+    return await job_response(submit_job("delete-prefix", f"Delete '{bucket}/{current_path}'", _run))
+
+@app.route("/transfer", methods=["POST"])
+async def transfer():
+    """Copy/Move files or folders, or sync a folder; same form fields as appz.transfer."""
+    form = await request.form
+    op = (form.get("op") or "").strip().lower()
+    is_folder = (form.get("is_folder") or "0").strip() == "1"
+    src_bucket = (form.get("src_bucket") or "").strip()
+    dst_bucket = (form.get("dst_bucket") or "").strip()
+    src_path = (form.get("src_path") or "").strip("/")
+    dst_path = (form.get("dst_path") or "").strip("/")
+
+    if not (op in {"copy", "move", "sync"} and src_bucket and dst_bucket and src_path):
+        return await panel_result("Invalid transfer request.", "error")
+    if op == "sync":
+        if not is_folder:
+            return await panel_result("Only folders can be synced.", "error")
+        target = dst_path or src_path
+        if src_bucket == dst_bucket and core.prefixes_overlap(src_path, target):
+            return await panel_result("Source and target folders must not overlap.", "error")
+        delete_extra = form.get("delete_extra") == "1"
+
+        async def _sync(job: Job) -> str:
+            try:
+                summary, errors = await sync_folder(src_bucket, src_path, dst_bucket, target, delete_extra, job)
+            finally:
+                await notify_changed(dst_bucket, target, recursive=True)
+            job.errors.extend(errors)
+            return core.sync_message(f"{src_bucket}/{src_path}", f"{dst_bucket}/{target}", summary, errors)
+
+        return await job_response(submit_job(
+            "sync", f"Sync '{src_bucket}/{src_path}' → '{dst_bucket}/{target}'", _sync))
+
+    name = os.path.basename(src_path.rstrip("/"))
+    dst_full = join_path(dst_path, name) if is_folder or not dst_path else dst_path
+    move = op == "move"
+    if is_folder:
+        # journaled, so an interrupted copy/move can be resumed (POST /transfers/<id>/resume)
+        transfer_id = await asyncio.to_thread(
+            core.transfer_journal.create, op, src_bucket, src_path, dst_bucket, dst_full)
+        return await job_response(await submit_transfer(transfer_id))
+
+    async def _run(job: Job) -> str:
+        copied = await asyncio.to_thread(core.copied_entry, src_bucket, src_path)
+        entries: Tuple[Any, Any] = (core.UNKNOWN, core.UNKNOWN)
+        try:
+            job.set_total(1)
+            await transfer_object(src_bucket, src_path, dst_bucket, dst_full, move=move)
+            entries = (copied, None)
+            job.advance(1)
+            return f"{'Moved' if move else 'Copied'} file to '{dst_bucket}/{dst_full}'."
+        finally:
+            await notify_changed(dst_bucket, dst_full, entry=entries[0])
+            if move:
+                await notify_changed(src_bucket, src_path, entry=entries[1])
+
+    verb = "Move" if move else "Copy"
+    return await job_response(submit_job(
+        op, f"{verb} '{src_bucket}/{src_path}' → '{dst_bucket}/{dst_full}'", _run))
+
+@app.route("/transfers", methods=["GET"])
+async def list_transfers():
+    return jsonify(await asyncio.to_thread(core.transfer_journal.unfinished))
+
+@app.route("/transfers/<transfer_id>/resume", methods=["POST"])
+async def resume_transfer(transfer_id: str):
+    job = await submit_transfer(transfer_id)
+    if job is None:
+        t = await asyncio.to_thread(core.transfer_journal.get, transfer_id)
+        reason = "Unknown transfer." if t is None else (
+            "Transfer already finished." if t["status"] == "done" else "Transfer is still running.")
+        return await panel_result(reason, "error")
+    return await job_response(job)
+
+@app.route("/b/<bucket>/index", methods=["GET", "POST"])
+async def bucket_index(bucket: str):
+    """GET: index status; POST: (re)build the bucket's object index as a job."""
+    if request.method == "POST":
+        # the SQLite build is blocking work, so it stays on the thread-pool runner
+        return await job_response(job_runner.submit(
+            "index", f"Index bucket '{bucket}'", lambda j: core.build_object_index(bucket, j)))
+    index = await asyncio.to_thread(object_index.built, bucket)
+    if not index:
+        return jsonify({"bucket": bucket, "ready": False})
+    objects, nbytes = await asyncio.to_thread(index.folder_stats, "")
+    return jsonify({"bucket": bucket, "ready": True, "built_at": float(index.meta("built_at")),
+                    "objects": objects, "bytes": nbytes})
+
+@app.route("/b/<bucket>/du", methods=["GET"])
+async def folder_usage(bucket: str):
+    """Recursive object count and bytes under ?path= (from the index when built)."""
+    path = (request.args.get("path") or "").strip("/")
+    index = await asyncio.to_thread(object_index.get, bucket, path)
+    if index:
+        objects, nbytes = await asyncio.to_thread(index.folder_stats, path)
+        return jsonify({"path": path, "objects": objects, "bytes": nbytes, "source": "index"})
+    try:
+        found = await walk_objects(bucket, path)
+    except Exception as ex:
+        return jsonify({"error": str(ex)}), 502
+    return jsonify({"path": path, "objects": len(found),
+                    "bytes": sum(entry_size(e) for _, e in found), "source": "walk"})
+
+@app.route("/b/<bucket>/search", methods=["GET"])
+async def search(bucket: str):
+    """Stream keys matching ?q= as NDJSON; ?mode=substring|prefix|glob (default: guessed)."""
+    q = request.args.get("q") or ""
+    mode = request.args.get("mode") or ("glob" if any(c in q for c in "*?[") else "substring")
+    limit = max(1, min(request.args.get("limit", SEARCH_MAX_RESULTS, type=int), SEARCH_MAX_RESULTS))
+    if not q or mode not in {"substring", "prefix", "glob"}:
+        return jsonify({"error": "A query and a valid mode are required."}), 400
+    try:
+        index = search_indexes.fresh(bucket)
+        if index is None:
+            index = await asyncio.to_thread(search_indexes.build, bucket, await keys_under(bucket, ""))
+    except Exception as ex:
+        return jsonify({"error": f"Failed to index bucket: {ex}"}), 502
+    hits = index.search(q, mode)
+
+    async def _results():
+        started, count = time.perf_counter(), 0
+        while count < limit:
+            # scanning for the next batch is CPU work, so it runs off the event loop
+            want = min(core.SEARCH_STREAM_BATCH, limit - count)
+            batch = await asyncio.to_thread(lambda: list(itertools.islice(hits, want)))
+            for key in batch:
+                yield json.dumps({"key": key}) + "\n"
+            count += len(batch)
+            if len(batch) < want:
+                break
+        ms = round((time.perf_counter() - started) * 1000, 1)
+        yield json.dumps({"done": True, "count": count, "truncated": count >= limit, "ms": ms}) + "\n"
+
+    return Response(_results(), mimetype="application/x-ndjson")
+
+@app.route("/api/v1/buckets", methods=["GET"])
+async def api_buckets():
+    try:
+        names = await asyncio.to_thread(bucket_catalog.names)
+    except Exception as ex:
+        return jsonify({"error": f"Failed to list buckets: {ex}"}), 502
+    return api_json({"buckets": names})
+
+@app.route("/api/v1/b/<bucket>/list", methods=["GET"])
+async def api_list(bucket: str):
+    """One page of a folder listing: ?path=&limit=&cursor= (cursor from next_cursor)."""
+    path = (request.args.get("path") or "").strip("/")
+    limit = request.args.get("limit", PANEL_PAGE_SIZE, type=int)
+    try:
+        folders, files, next_cursor = await list_items(bucket, path, limit, request.args.get("cursor"))
+    except Exception as ex:
+        return jsonify({"error": f"Failed to list: {ex}"}), 502
+    payload = core.listing_payload(bucket, path, folders, files, next_cursor)
+    return api_json(payload, core.listing_etag(payload))
+
+def api_json(payload: Any, etag: Optional[str] = None) -> Response:
+    """JSON response with a strong ETag; answers a matching If-None-Match with 304."""
+    body = core.json_bytes(payload)
+    etag = etag or hashlib.sha256(body).hexdigest()[:32]
+    if core.etag_matches(request.if_none_match, etag):
+        resp = Response("", status=304)
+    else:
+        resp = Response(body, mimetype="application/json")
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.vary.add("Accept-Encoding")
+    return resp
+
+@app.after_request
+async def compress_response(resp: Response) -> Response:
+    """gzip/brotli-compress buffered JSON and HTML responses."""
+    if (resp.status_code == 200 and isinstance(resp.response, DataBody)
+            and resp.mimetype in core.COMPRESSIBLE_TYPES and "Content-Encoding" not in resp.headers):
+        body = core.compress_body(resp, await resp.get_data(), request.accept_encodings)
+        if body is not None:
+            resp.set_data(body)
+    return resp
+
+@app.route("/jobs", methods=["GET"])
+async def list_jobs():
+    return jsonify([j.to_dict() for j in job_runner.list()])
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+async def job_status(job_id: str):
+    job = job_runner.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job."}), 404
+    return jsonify(job.to_dict())
+
+@app.route("/jobs/<job_id>/cancel", methods=["POST"])
+async def cancel_job(job_id: str):
+    job = job_runner.cancel(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job."}), 404
+    return jsonify(job.to_dict())
+
+async def open_object_stream(bucket: str, key: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+    """Start a GET for an object; the caller must aclose() the response."""
+    api = storage().from_(bucket)
+    url = api._base_url.joinpath("object", bucket, *split_path(key))
+    async with _limit.slot():
+        return await _http.send(
+            _http.build_request("GET", str(url), headers={**api._headers, **(headers or {})}), stream=True)
+
+@app.route("/download/<bucket>/<path:path>")
+async def download(bucket: str, path: str):
+    """Stream an object to the client chunk by chunk, honouring Range/conditional headers."""
+    if core.download_cache.enabled:
+        try:
+            # the cache is shared with the sync app: blocking fills, one per object
+            cached = await asyncio.to_thread(core.download_cache.get, bucket, path)
+            if cached is not None:
+                return await send_cached(cached, path)
+        except FileNotFoundError:
+            pass  # evicted between lookup and open; stream it instead
+        except Exception as ex:
+            app.logger.warning("Download cache failed for %s/%s: %s", bucket, path, ex)
+    fwd = {h: request.headers[h] for h in DOWNLOAD_REQUEST_HEADERS if h in request.headers}
+    try:
+        upstream = await open_object_stream(bucket, path, fwd)
+    except Exception as ex:
+        await flash(f"Download failed: {ex}", "error")
+        return redirect(url_for("home"))
+    if upstream.status_code >= 400 and upstream.status_code != 416:
+        try:
+            detail = (await upstream.aread()).decode("utf-8", "replace")[:200]
+        finally:
+            await upstream.aclose()
+        await flash(f"Download failed: {upstream.status_code} {detail}", "error")
+        return redirect(url_for("home"))
+
+    async def _body():
+        try:
+            async for chunk in upstream.aiter_raw(DOWNLOAD_CHUNK_SIZE):
+                yield chunk
+        finally:
+            await upstream.aclose()
+
+    mime, _ = mimetypes.guess_type(path)
+    resp = Response(_body(), status=upstream.status_code, mimetype=mime or "application/octet-stream")
+    for h in DOWNLOAD_RESPONSE_HEADERS:
+        if h in upstream.headers:
+            resp.headers[h] = upstream.headers[h]
+    resp.headers["Content-Disposition"] = core.attachment_header(os.path.basename(path))
+    return resp
+
+async def send_cached(cached: core.CachedObject, path: str) -> Response:
+    resp = await send_file(cached.path, **core.cached_file_options(cached, path))
+    if cached.cache_control:
+        resp.headers["Cache-Control"] = cached.cache_control
+    return resp
+
+def iter_folder_zip(bucket: str, prefix: str) -> AsyncIterator[bytes]:
+    """Stream a ZIP64 archive of everything under prefix (see core.folder_zip_steps)."""
+    return iter_steps(core.folder_zip_steps(bucket, prefix))
+
+@app.route("/download-zip/<bucket>/", defaults={"path": ""})
+@app.route("/download-zip/<bucket>/<path:path>")
+async def download_zip(bucket: str, path: str):
+    """Stream a folder (or the whole bucket) as a ZIP archive."""
+    name = (os.path.basename(path.strip("/")) or bucket) + ".zip"
+    resp = Response(iter_folder_zip(bucket, path), mimetype="application/zip")
+    resp.headers["Content-Disposition"] = core.attachment_header(name)
+    return resp
+
+@app.route("/metrics")
+async def metrics_endpoint():
+    return Response(core.metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/cache-stats")
+async def cache_stats():
+    return jsonify({"listing": listing_cache.stats(), "download": core.download_cache.stats()})
+
+if __name__ == "__main__":
+    app.run(debug=True)
@@ -0,0 +1,584 @@
+"""Local stand-in for the Supabase Storage REST API, for benchmarks.
+
+Implements, in memory, the endpoints storage3 calls for this app: bucket
+list/get/create/update/empty/delete and object list/list-v2/info/exists/
+download/upload/update/copy/move/remove. Each request can be slowed down
+(fixed latency + jitter, per-operation overrides, bandwidth) and rate
+limited (429 with Retry-After), and trees of any size can be generated.
+
+    python bench/fake_storage.py --port 54321 --seed bench::100000:8:4:1024 --latency 0.005
+
+Point the app at it with SUPABASE_URL=http://127.0.0.1:54321 (any
+SUPABASE_KEY). Control endpoints, outside /storage/v1/:
+
+    GET  /__bench/stats    request counts per operation (see `operation`)
+    POST /__bench/reset    zero the counters
+    POST /__bench/seed     {"bucket", "prefix", "count", "depth", "fanout", "size"}
+    POST /__bench/config   {"latency", "jitter", "op_latency", "bandwidth", "rate_limit", "error_rate",
+                            "status_in_body"}
+"""
+import argparse
+import bisect
+import datetime
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+API_PREFIX = "/storage/v1/"
+
+def now_iso() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+# ---------------------- Store ----------------------
+@dataclass
+class Obj:
+    size: int
+    etag: str
+    updated: str
+    mimetype: str = "application/octet-stream"
+    data: Optional[bytes] = None  # None for synthetic objects (zero bytes are served)
+
+    def body(self) -> bytes:
+        return self.data if self.data is not None else bytes(self.size)
+
+class StoreError(Exception):
+    def __init__(self, status: int, error: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.error = error
+        self.message = message
+
+class BucketData:
+    """Objects of one bucket plus their keys in sorted order (for listings)."""
+
+    def __init__(self, name: str, public: bool = False):
+        self.name = name
+        self.public = public
+        self.created = now_iso()
+        self.objects: Dict[str, Obj] = {}
+        self.keys: List[str] = []
+
+    def put(self, key: str, obj: Obj):
+        if key not in self.objects:
+            bisect.insort(self.keys, key)
+        self.objects[key] = obj
+
+    def pop(self, key: str) -> Optional[Obj]:
+        obj = self.objects.pop(key, None)
+        if obj is not None:
+            del self.keys[bisect.bisect_left(self.keys, key)]
+        return obj
+
+    def extend(self, items: List[Tuple[str, Obj]]):
+        """Bulk insert (one sort instead of an insort per key)."""
+        new = [k for k, _ in items if k not in self.objects]
+        self.objects.update(items)
+        self.keys.extend(new)
+        self.keys.sort()
+
+    def level(self, prefix: str) -> List[Tuple[str, Optional[str]]]:
+        """Direct children of prefix ("" or "a/b/") as (name, key or None for folders), by name.
+
+        Skips over each child folder's subtree with one bisect, so the cost is
+        per child rather than per object below the prefix.
+        """
+        out: List[Tuple[str, Optional[str]]] = []
+        i = bisect.bisect_left(self.keys, prefix)
+        while i < len(self.keys):
+            key = self.keys[i]
+            if not key.startswith(prefix):
+                break
+            rest = key[len(prefix):]
+            name, slash, _ = rest.partition("/")
+            if slash:
+                out.append((name, None))
+                # "0" sorts right after "/": the first key past name/...
+                i = bisect.bisect_left(self.keys, prefix + name + "0", i)
+            else:
+                out.append((name, key))
+                i += 1
+        out.sort(key=lambda c: c[0])
+        return out
+
+    def record(self) -> Dict[str, Any]:
+        return {"id": self.name, "name": self.name, "owner": "", "public": self.public,
+                "created_at": self.created, "updated_at": self.created,
+                "file_size_limit": None, "allowed_mime_types": None, "type": "STANDARD"}
+
+def object_entry(name: str, key: str, obj: Obj) -> Dict[str, Any]:
+    return {"name": name, "id": hashlib.md5(key.encode()).hexdigest(),
+            "updated_at": obj.updated, "created_at": obj.updated, "last_accessed_at": obj.updated,
+            "metadata": {"eTag": f'"{obj.etag}"', "size": obj.size, "mimetype": obj.mimetype,
+                         "cacheControl": "max-age=3600", "lastModified": obj.updated,
+                         "contentLength": obj.size, "httpStatusCode": 200}}
+
+def folder_entry(name: str) -> Dict[str, Any]:
+    return {"name": name, "id": None, "updated_at": None, "created_at": None,
+            "last_accessed_at": None, "metadata": None}
+
+def synthetic_keys(prefix: str, count: int, depth: int, fanout: int) -> Iterator[str]:
+    """Keys spread round-robin over the fanout**depth leaf folders below prefix."""
+    leaves = fanout ** depth
+    for i in range(count):
+        leaf, parts = i % leaves, []
+        for _ in range(depth):
+            parts.append(f"dir{leaf % fanout}")
+            leaf //= fanout
+        yield "/".join(p for p in (prefix.strip("/"), *parts, f"obj-{i:07d}.bin") if p)
+
+class Store:
+    def __init__(self):
+        self.buckets: Dict[str, BucketData] = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, name: str) -> BucketData:
+        b = self.buckets.get(name)
+        if b is None:
+            raise StoreError(404, "Bucket not found", "Bucket not found")
+        return b
+
+    def seed(self, bucket: str, prefix: str = "", count: int = 1000, depth: int = 3,
+             fanout: int = 4, size: int = 1024) -> int:
+        stamp = now_iso()
+        items = [(k, Obj(size, hashlib.md5(k.encode()).hexdigest(), stamp))
+                 for k in synthetic_keys(prefix, count, depth, fanout)]
+        with self.lock:
+            self.buckets.setdefault(bucket, BucketData(bucket)).extend(items)
+        return len(items)
+
+    def write(self, bucket: str, key: str, data: bytes, mimetype: str, upsert: bool):
+        obj = Obj(len(data), hashlib.md5(data).hexdigest(), now_iso(), mimetype, data)
+        with self.lock:
+            b = self.bucket(bucket)
+            if key in b.objects and not upsert:
+                raise StoreError(409, "Duplicate", "The resource already exists")
+            b.put(key, obj)
+
+    def get(self, bucket: str, key: str) -> Obj:
+        with self.lock:
+            obj = self.bucket(bucket).objects.get(key)
+        if obj is None:
+            raise StoreError(404, "not_found", "Object not found")
+        return obj
+
+    def transfer(self, bucket: str, src: str, dst_bucket: str, dst: str, move: bool):
+        with self.lock:
+            b, d = self.bucket(bucket), self.bucket(dst_bucket)
+            obj = b.objects.get(src)
+            if obj is None:
+                raise StoreError(404, "not_found", "Object not found")
+            if dst in d.objects:
+                raise StoreError(409, "Duplicate", "The resource already exists")
+            if move:
+                b.pop(src)
+            d.put(dst, Obj(obj.size, obj.etag, now_iso(), obj.mimetype, obj.data))
+
+    def remove(self, bucket: str, keys: List[str]) -> List[Dict[str, Any]]:
+        with self.lock:
+            b = self.bucket(bucket)
+            removed = [(k, b.pop(k)) for k in keys]
+        return [object_entry(k, k, o) for k, o in removed if o is not None]
+
+    def list(self, bucket: str, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        prefix = (body.get("prefix") or "").strip("/")
+        limit, offset = int(body.get("limit") or 100), int(body.get("offset") or 0)
+        search = (body.get("search") or "").lower()
+        with self.lock:
+            b = self.bucket(bucket)
+            children = b.level(prefix + "/" if prefix else "")
+            page = []
+            if search:
+                children = [c for c in children if c[0].lower().startswith(search)]
+            if ((body.get("sortBy") or {}).get("order") or "asc").lower() == "desc":
+                children.reverse()
+            for name, key in children[offset:offset + limit]:
+                page.append(folder_entry(name) if key is None else object_entry(name, key, b.objects[key]))
+        return page
+
+    def list_v2(self, bucket: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Cursor pages; names are full keys (folders end with '/'), the cursor is the last name."""
+        prefix = body.get("prefix") or ""
+        limit = int(body.get("limit") or 1000)
+        cursor = body.get("cursor") or ""
+        folders, objects = [], []
+        with self.lock:
+            b = self.bucket(bucket)
+            if body.get("with_delimiter"):
+                base = prefix[:prefix.rfind("/") + 1]
+                rows = [(base + name + ("/" if key is None else ""), key)
+                        for name, key in b.level(base) if (base + name).startswith(prefix)]
+                rows = [r for r in rows if r[0] > cursor][:limit + 1]
+            else:
+                i = bisect.bisect_right(b.keys, cursor) if cursor else bisect.bisect_left(b.keys, prefix)
+                rows = []
+                while i < len(b.keys) and len(rows) <= limit and b.keys[i].startswith(prefix):
+                    rows.append((b.keys[i], b.keys[i]))
+                    i += 1
+            has_next = len(rows) > limit
+            rows = rows[:limit]
+            for name, key in rows:
+                if key is None:
+                    folders.append({"key": name, "name": name})
+                else:
+                    objects.append({**object_entry(name, key, b.objects[key]), "key": key})
+        return {"hasNext": has_next, "folders": folders, "objects": objects,
+                "nextCursor": rows[-1][0] if has_next else None}
+
+# ---------------------- Load shaping ----------------------
+class Limits:
+    """Latency, bandwidth, rate limit and injected errors; changeable at runtime."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, op_latency: Optional[Dict[str, float]] = None,
+                 bandwidth: float = 0.0, rate_limit: float = 0.0, error_rate: float = 0.0,
+                 status_in_body: bool = False):
+        self.latency = latency
+        self.jitter = jitter
+        self.op_latency = op_latency or {}
+        self.bandwidth = bandwidth  # bytes/s per request, 0 = unlimited
+        self.rate_limit = rate_limit  # requests/s across all clients, 0 = unlimited
+        self.error_rate = error_rate  # fraction of requests failing with 503
+        # like hosted Supabase Storage: 4xx errors answer HTTP 400, the real status only in "statusCode"
+        self.status_in_body = status_in_body
+        self._tokens = rate_limit
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def update(self, **kw):
+        with self._lock:
+            for name, value in kw.items():
+                if hasattr(self, name) and not name.startswith("_"):
+                    setattr(self, name, value)
+            self._tokens = self.rate_limit
+
+    def admit(self) -> float:
+        """0 if the request may proceed, else seconds until a token is available."""
+        if self.rate_limit <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._stamp) * self.rate_limit)
+            self._stamp = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate_limit
+
+    def delay(self, op: str, nbytes: int = 0):
+        """Per-request latency, plus the time to receive nbytes of request body."""
+        seconds = self.op_latency.get(op, self.latency) + random.uniform(0, self.jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+        self.throttle(nbytes)
+
+    def throttle(self, nbytes: int):
+        if self.bandwidth > 0 and nbytes:
+            time.sleep(nbytes / self.bandwidth)
+
+def parse_op_latency(spec: str) -> Dict[str, float]:
+    """"object.list=0.05,object.download=0.02" -> {op: seconds}"""
+    return {op.strip(): float(sec) for op, _, sec in (item.partition("=") for item in spec.split(",")) if sec}
+
+# ---------------------- HTTP ----------------------
+def operation(method: str, parts: List[str]) -> str:
+    """Name of the API operation a request maps to, e.g. 'object.list' (keys of the stats)."""
+    if not parts:
+        return "other"
+    if parts[0] == "bucket":
+        if len(parts) == 1:
+            return "bucket.list" if method == "GET" else "bucket.create"
+        if len(parts) == 3 and parts[2] == "empty":
+            return "bucket.empty"
+        return {"GET": "bucket.get", "PUT": "bucket.update", "DELETE": "bucket.delete"}.get(method, "other")
+    if parts[0] != "object" or len(parts) < 2:
+        return "other"
+    if parts[1] in ("list", "list-v2") and method == "POST":
+        return "object.list" if parts[1] == "list" else "object.list_v2"
+    if parts[1] in ("copy", "move") and len(parts) == 2:
+        return "object." + parts[1]
+    if parts[1] == "info":
+        return "object.info"
+    return {"GET": "object.download", "HEAD": "object.exists", "POST": "object.upload",
+            "PUT": "object.update", "DELETE": "object.remove"}.get(method, "other")
+
+def multipart_file(body: bytes, content_type: str) -> Tuple[bytes, Optional[str]]:
+    """(data, content type) of the "file" part of a multipart/form-data body."""
+    boundary = content_type.partition("boundary=")[2].strip('"').encode()
+    if not boundary:
+        return body, None
+    for part in body.split(b"--" + boundary)[1:-1]:
+        head, _, data = part[2:].partition(b"\r\n\r\n")
+        if b'name="file"' in head:
+            ctype = None
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-type:"):
+                    ctype = line.split(b":", 1)[1].strip().decode()
+            return data[:-2], ctype
+    return b"", None
+
+class Stats:
+    def __init__(self):
+        self.requests: Counter = Counter()
+        self.statuses: Counter = Counter()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._lock = threading.Lock()
+
+    def record(self, op: str, status: int, nbytes_in: int, nbytes_out: int):
+        with self._lock:
+            self.requests[op] += 1
+            self.statuses[str(status)] += 1
+            self.bytes_in += nbytes_in
+            self.bytes_out += nbytes_out
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"requests": dict(self.requests), "total": sum(self.requests.values()),
+                    "statuses": dict(self.statuses), "bytes_in": self.bytes_in, "bytes_out": self.bytes_out}
+
+    def reset(self):
+        with self._lock:
+            self.requests.clear()
+            self.statuses.clear()
+            self.bytes_in = self.bytes_out = 0
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    server: "FakeStorageServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch()
+
+    do_POST = do_PUT = do_DELETE = do_HEAD = do_GET
+
+    def _read_body(self) -> bytes:
+        if "chunked" in (self.headers.get("Transfer-Encoding") or "").lower():
+            parts = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if not size:
+                    while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass  # trailers
+                    return b"".join(parts)
+                parts.append(self.rfile.read(size))
+                self.rfile.readline()
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _dispatch(self):
+        body = self._read_body()
+        path = urlsplit(self.path).path
+        if path.startswith("/__bench/"):
+            self._control(path[len("/__bench/"):], body)
+            return
+        if not path.startswith(API_PREFIX):
+            self._json(404, {"statusCode": "404", "error": "not_found", "message": "Not found"})
+            return
+        parts = [unquote(p) for p in path[len(API_PREFIX):].split("/") if p]
+        op = operation(self.command, parts)
+        limits = self.server.limits
+        wait = limits.admit()
+        if wait:
+            self._json(429, {"statusCode": "429", "error": "too_many_requests", "message": "Rate limit exceeded"},
+                       op, len(body), {"Retry-After": str(max(1, round(wait)))})
+            return
+        limits.delay(op, len(body))
+        if limits.error_rate and random.random() < limits.error_rate:
+            self._json(503, {"statusCode": "503", "error": "unavailable", "message": "Injected failure"}, op, len(body))
+            return
+        try:
+            self._api(op, parts, body)
+        except StoreError as ex:
+            status = 400 if limits.status_in_body and 400 <= ex.status < 500 else ex.status
+            self._json(status, {"statusCode": str(ex.status), "error": ex.error, "message": ex.message}, op, len(body))
+        except (ValueError, KeyError) as ex:
+            self._json(400, {"statusCode": "400", "error": "invalid_request", "message": str(ex)}, op, len(body))
+
+    def _api(self, op: str, parts: List[str], body: bytes):
+        store = self.server.store
+        data = json.loads(body) if body and op not in ("object.upload", "object.update") else {}
+        if op == "bucket.list":
+            with store.lock:
+                result: Any = [b.record() for b in store.buckets.values()]
+        elif op == "bucket.get":
+            with store.lock:
+                result = store.bucket(parts[1]).record()
+        elif op == "bucket.create":
+            name = data.get("id") or data["name"]
+            with store.lock:
+                if name in store.buckets:
+                    raise StoreError(409, "Duplicate", "The resource already exists")
+                store.buckets[name] = BucketData(name, bool(data.get("public")))
+            result = {"name": name}
+        elif op == "bucket.update":
+            with store.lock:
+                store.bucket(parts[1]).public = bool(data.get("public"))
+            result = {"message": "Successfully updated"}
+        elif op == "bucket.empty":
+            with store.lock:
+                b = store.bucket(parts[1])
+                b.objects.clear()
+                b.keys.clear()
+            result = {"message": "Successfully emptied"}
+        elif op == "bucket.delete":
+            with store.lock:
+                if store.bucket(parts[1]).objects:
+                    raise StoreError(409, "InvalidRequest", "The bucket you tried to delete is not empty")
+                del store.buckets[parts[1]]
+            result = {"message": "Successfully deleted"}
+        elif op == "object.list":
+            result = store.list(parts[2], data)
+        elif op == "object.list_v2":
+            result = store.list_v2(parts[2], data)
+        elif op in ("object.copy", "object.move"):
+            store.transfer(data["bucketId"], data["sourceKey"], data.get("destinationBucket") or data["bucketId"],
+                           data["destinationKey"], move=op == "object.move")
+            dst = f"{data.get('destinationBucket') or data['bucketId']}/{data['destinationKey']}"
+            result = {"Key": dst} if op == "object.copy" else {"message": "Successfully moved"}
+        elif op == "object.remove":
+            result = store.remove(parts[1], list(data.get("prefixes") or []))
+        elif op == "object.info":
+            obj = store.get(parts[2], "/".join(parts[3:]))
+            result = {"name": "/".join(parts[3:]), "size": obj.size, "content_type": obj.mimetype,
+                      "etag": f'"{obj.etag}"', "last_modified": obj.updated, "created_at": obj.updated,
+                      "cache_control": "max-age=3600", "metadata": {}}
+        elif op in ("object.upload", "object.update"):
+            key = "/".join(parts[2:])
+            payload, ctype = multipart_file(body, self.headers.get("Content-Type") or "")
+            upsert = op == "object.update" or (self.headers.get("x-upsert") or "").lower() == "true"
+            if op == "object.update":
+                store.get(parts[1], key)
+            store.write(parts[1], key, payload, ctype or "application/octet-stream", upsert)
+            result = {"Key": f"{parts[1]}/{key}", "Id": hashlib.md5(key.encode()).hexdigest()}
+        elif op in ("object.download", "object.exists"):
+            self._object(op, parts[1], "/".join(parts[2:]))
+            return
+        else:
+            raise StoreError(404, "not_found", "Unknown endpoint")
+        self._json(200, result, op, len(body))
+
+    def _object(self, op: str, bucket: str, key: str):
+        obj = self.server.store.get(bucket, key)
+        etag = f'"{obj.etag}"'
+        headers = {"ETag": etag, "Last-Modified": obj.updated, "Accept-Ranges": "bytes",
+                   "Content-Type": obj.mimetype}
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, b"", headers, op)
+            return
+        data, status = obj.body(), 200
+        rng = self.headers.get("Range") or ""
+        if rng.startswith("bytes=") and "," not in rng:
+            first, _, last = rng[6:].partition("-")
+            start = int(first) if first else max(0, obj.size - int(last))
+            end = min(obj.size - 1, int(last)) if first and last else obj.size - 1
+            if start >= obj.size:
+                self._send(416, b"", {"Content-Range": f"bytes */{obj.size}"}, op)
+                return
+            headers["Content-Range"] = f"bytes {start}-{end}/{obj.size}"
+            data, status = data[start:end + 1], 206
+        if op == "object.download":
+            self.server.limits.throttle(len(data))
+        self._send(status, data, headers, op)
+
+    def _control(self, name: str, body: bytes):
+        data = json.loads(body) if body else {}
+        srv = self.server
+        if name == "stats":
+            result = srv.stats.snapshot()
+        elif name == "reset":
+            srv.stats.reset()
+            result = {"ok": True}
+        elif name == "seed":
+            result = {"seeded": srv.store.seed(data["bucket"], data.get("prefix") or "", int(data.get("count", 1000)),
+                                               int(data.get("depth", 3)), int(data.get("fanout", 4)),
+                                               int(data.get("size", 1024)))}
+        elif name == "config":
+            srv.limits.update(**data)
+            result = {"ok": True}
+        else:
+            self._json(404, {"error": "unknown control endpoint"})
+            return
+        self._json(200, result)
+
+    def _json(self, status: int, payload: Any, op: Optional[str] = None, nbytes_in: int = 0,
+              headers: Optional[Dict[str, str]] = None):
+        self._send(status, json.dumps(payload).encode(),
+                   {"Content-Type": "application/json", **(headers or {})}, op, nbytes_in)
+
+    def _send(self, status: int, data: bytes, headers: Dict[str, str], op: Optional[str] = None,
+              nbytes_in: int = 0):
+        head = self.command == "HEAD"
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if not head and status != 304:
+            self.wfile.write(data)
+        if op:
+            self.server.stats.record(op, status, nbytes_in, 0 if head else len(data))
+
+class FakeStorageServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512
+
+    def __init__(self, address: Tuple[str, int], limits: Optional[Limits] = None):
+        super().__init__(address, Handler)
+        self.store = Store()
+        self.limits = limits or Limits()
+        self.stats = Stats()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+def parse_seed(spec: str) -> Dict[str, Any]:
+    """"bucket:prefix:count:depth:fanout:size" (trailing fields optional)."""
+    fields = spec.split(":")
+    names = ("bucket", "prefix", "count", "depth", "fanout", "size")
+    out: Dict[str, Any] = {}
+    for name, value in zip(names, fields):
+        if value:
+            out[name] = value if name in ("bucket", "prefix") else int(value)
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321, help="0 picks a free port")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra seconds, uniformly")
+    parser.add_argument("--op-latency", default="", help='per-operation latency, e.g. "object.list=0.05"')
+    parser.add_argument("--bandwidth", type=float, default=0.0, help="bytes/s per request body (0 = unlimited)")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="requests/s before 429s (0 = unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 503")
+    parser.add_argument("--status-in-body", action="store_true",
+                        help="answer 4xx errors with HTTP 400 and the real status in the JSON body")
+    parser.add_argument("--seed", action="append", default=[], metavar="SPEC",
+                        help="bucket:prefix:count:depth:fanout:size (repeatable)")
+    args = parser.parse_args()
+
+    limits = Limits(args.latency, args.jitter, parse_op_latency(args.op_latency),
+                    args.bandwidth, args.rate_limit, args.error_rate, args.status_in_body)
+    server = FakeStorageServer((args.host, args.port), limits)
+    for spec in args.seed:
+        server.store.seed(**parse_seed(spec))
+    # the harness reads this line to find the port
+    print(f"listening on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Report what importing the app costs, and fail if it pulls in clients it never uses.
+
+Imports appz (or appz_asgi) in a fresh interpreter under `python -X importtime`,
+with no Supabase credentials set, and prints the total import time and the
+slowest top-level packages. Exits non-zero when a module from BANNED was
+imported (the app only talks to Storage, so the supabase meta-package and its
+realtime/auth/postgrest/functions clients have no business loading) or when
+the import takes longer than --max-ms.
+
+    python bench/import_check.py
+    python bench/import_check.py --module appz_asgi --top 15 --max-ms 400
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+BANNED = ("supabase", "realtime", "websockets", "gotrue", "supabase_auth", "postgrest",
+          "supafunc", "supabase_functions")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+def run_probe(module: str) -> Tuple[Dict, str]:
+    """Import `module` in a child interpreter; returns (probe result, -X importtime log)."""
+    env = dict(os.environ)
+    # set but empty, so a .env file can't supply them either (load_dotenv never overrides)
+    env.update({"SUPABASE_URL": "", "SUPABASE_KEY": ""})
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", PROBE.format(module=module)],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(f"importing {module} failed:\n{proc.stderr[-4000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+def top_packages(log: str) -> List[Tuple[str, float]]:
+    """Cumulative import time (ms) of each top-level package, slowest first."""
+    totals: Dict[str, float] = {}
+    for line in log.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        cumulative = cumulative.strip()
+        # nested imports are indented further; their time is already in their parent's
+        if not cumulative.isdigit() or name.startswith("  "):
+            continue
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0.0) + int(cumulative) / 1000
+    return sorted(totals.items(), key=lambda kv: -kv[1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="appz", help="module to import (appz or appz_asgi)")
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level packages to list")
+    parser.add_argument("--max-ms", type=float, default=0.0, help="fail above this import time (0 = no limit)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    result, log = run_probe(args.module)
+    banned = sorted(m for m in result["modules"] if m.split(".")[0] in BANNED)
+    report = {
+        "module": args.module,
+        "import_ms": round(result["seconds"] * 1000, 1),
+        "modules_loaded": len(result["modules"]),
+        "slowest": [{"package": name, "ms": round(ms, 1)} for name, ms in top_packages(log)[:args.top]],
+        "banned": banned,
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import {args.module}: {report['import_ms']} ms, {report['modules_loaded']} modules")
+        for row in report["slowest"]:
+            print(f"  {row['ms']:9.1f} ms  {row['package']}")
+        if banned:
+            print(f"banned modules imported: {', '.join(banned)}")
+    failed = bool(banned) or (args.max_ms > 0 and report["import_ms"] > args.max_ms)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""Benchmark the app's hot paths against a local fake Storage server.
+
+Starts bench/fake_storage.py in a subprocess, seeds it, points appz at it and
+drives each scenario through the Flask test client: first sequentially (for
+latency), then from --concurrency threads at once (for throughput under load).
+Results are written as JSON so runs can be compared across commits:
+
+    python bench/run.py --objects 100000 --depth 8 --out before.json
+    git checkout my-branch
+    python bench/run.py --objects 100000 --depth 8 --baseline before.json --out after.json
+
+Per scenario and phase: ops, errors, wall time, ops/s, latency percentiles (ms),
+Storage requests by operation (as counted by the fake server) and peak RSS.
+"""
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+BUCKET = "bench"
+SCRATCH = "bench-scratch"  # bucket for uploads/copies/deletes, recreated per run
+
+# ---------------------- Fake server ----------------------
+class FakeServer:
+    """bench/fake_storage.py in a subprocess (so its memory and CPU don't count against the app)."""
+
+    def __init__(self, args: argparse.Namespace):
+        cmd = [sys.executable, os.path.join(HERE, "fake_storage.py"), "--port", "0",
+               "--latency", str(args.latency), "--jitter", str(args.jitter),
+               "--rate-limit", str(args.rate_limit), "--error-rate", str(args.error_rate)]
+        if args.op_latency:
+            cmd += ["--op-latency", args.op_latency]
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+        line = self.proc.stdout.readline().strip()
+        if not line.startswith("listening on "):
+            self.proc.kill()
+            raise SystemExit(f"fake storage server failed to start: {line!r}")
+        self.url = line[len("listening on "):]
+        self.http = httpx.Client(base_url=self.url + "/__bench/", timeout=600)
+
+    def control(self, name: str, **payload) -> Dict[str, Any]:
+        return self.http.post(name, json=payload).raise_for_status().json()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.http.get("stats").raise_for_status().json()
+
+    def close(self):
+        self.http.close()
+        self.proc.terminate()
+        self.proc.wait(10)
+
+# ---------------------- Scenarios ----------------------
+@dataclass
+class Scenario:
+    name: str
+    op: Callable[[Any, int], Any]  # (test client, iteration) -> response or result
+    setup: Optional[Callable[[int], None]] = None  # prepares n iterations before timing
+    heavy: bool = False  # bulk operation: fewer iterations
+
+@dataclass
+class Phase:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    error_samples: List[str] = field(default_factory=list)
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def check(resp) -> None:
+    """Raise for failed responses; flashes count as failures for routes that redirect on error."""
+    status = getattr(resp, "status_code", 200)
+    if status >= 400:
+        raise RuntimeError(f"HTTP {status}")
+    if isinstance(resp, tuple) and len(resp) == 2 and isinstance(resp[1], list) and resp[1]:
+        raise RuntimeError(f"{len(resp[1])} errors, first: {resp[1][0]}")
+
+def build_scenarios(appz, server: FakeServer, args: argparse.Namespace) -> List[Scenario]:
+    """The hot paths: listing (function, panel, API), download, upload, folder copy and delete."""
+    wide = "wide"  # one folder with --wide-files files (panel pagination)
+    deep = "/".join(["dir0"] * args.depth)  # a leaf folder of the deep tree
+    payload = os.urandom(args.upload_size)
+
+    def cold():
+        appz.listing_cache.invalidate_tree(BUCKET, "")
+
+    def list_cold(client, i):
+        cold()
+        return appz.list_items(BUCKET, wide if i % 2 else deep)
+
+    def list_warm(client, i):
+        return appz.list_items(BUCKET, wide if i % 2 else deep)
+
+    def panel(client, i):
+        cold()
+        return client.get(f"/b/{BUCKET}", query_string={"partial": "1", "path": wide})
+
+    def api_list(client, i):
+        cold()
+        return client.get(f"/api/v1/b/{BUCKET}/list", query_string={"path": wide, "limit": "1000"})
+
+    def download(client, i):
+        resp = client.get(f"/download/{SCRATCH}/blob-{i % 8}.bin")
+        resp.get_data()
+        return resp
+
+    def setup_download(n):
+        for i in range(8):
+            appz.sb.storage.from_(SCRATCH).upload(f"blob-{i}.bin", os.urandom(args.download_size),
+                                                   {"upsert": "true"})
+
+    def upload(client, i):
+        return client.post(f"/b/{SCRATCH}/upload", data={
+            "current_path": "uploads", "file": (io.BytesIO(payload), f"up-{time.time_ns()}-{i}.bin")},
+            content_type="multipart/form-data")
+
+    def copy_folder(client, i):
+        return appz.copy_folder_recursive(SCRATCH, "src", SCRATCH, f"copies/{time.time_ns()}-{i}")
+
+    def setup_copy(n):
+        server.control("seed", bucket=SCRATCH, prefix="src", count=args.subtree_objects,
+                       depth=2, fanout=4, size=1024)
+
+    def delete_prefix(client, i):
+        return appz.delete_prefix_recursive(SCRATCH, f"del/{i}")
+
+    def setup_delete(n):
+        for i in range(n):
+            server.control("seed", bucket=SCRATCH, prefix=f"del/{i}", count=args.subtree_objects,
+                           depth=2, fanout=4, size=1024)
+
+    return [
+        Scenario("list_items", list_cold),
+        Scenario("list_items_cached", list_warm),
+        Scenario("panel", panel),
+        Scenario("api_list", api_list),
+        Scenario("download", download, setup_download),
+        Scenario("upload", upload),
+        Scenario("copy_folder_recursive", copy_folder, setup_copy, heavy=True),
+        Scenario("delete_prefix_recursive", delete_prefix, setup_delete, heavy=True),
+    ]
+
+def run_phase(appz, scenario: Scenario, iterations: int, workers: int, first: int) -> Phase:
+    phase = Phase()
+    lock = threading.Lock()
+    counter = iter(range(first, first + iterations))
+
+    def _worker():
+        client = appz.app.test_client()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            try:
+                check(scenario.op(client, i))
+                error = None
+            except Exception as ex:
+                error = f"{type(ex).__name__}: {ex}"
+            elapsed = time.perf_counter() - start
+            with lock:
+                phase.latencies.append(elapsed)
+                if error:
+                    phase.errors += 1
+                    if len(phase.error_samples) < 3:
+                        phase.error_samples.append(error)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for f in [pool.submit(_worker) for _ in range(workers)]:
+            f.result()
+    return phase
+
+def summarize(phase: Phase, wall: float, storage: Dict[str, Any], workers: int) -> Dict[str, Any]:
+    ms = [v * 1000 for v in phase.latencies]
+    return {
+        "workers": workers,
+        "ops": len(ms),
+        "errors": phase.errors,
+        "error_samples": phase.error_samples,
+        "wall_s": round(wall, 4),
+        "ops_per_s": round(len(ms) / wall, 2) if wall else 0.0,
+        "latency_ms": {"mean": round(sum(ms) / len(ms), 3) if ms else 0.0,
+                       "p50": round(percentile(ms, 50), 3), "p90": round(percentile(ms, 90), 3),
+                       "p99": round(percentile(ms, 99), 3), "max": round(max(ms, default=0.0), 3)},
+        "storage_requests": storage["requests"],
+        "storage_requests_total": storage["total"],
+        "storage_statuses": storage["statuses"],
+        "storage_bytes": {"in": storage["bytes_in"], "out": storage["bytes_out"]},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def run_scenario(appz, server: FakeServer, scenario: Scenario, args: argparse.Namespace) -> Dict[str, Any]:
+    iterations = args.heavy_iterations if scenario.heavy else args.iterations
+    phases = [("sequential", 1, iterations)]
+    if args.concurrency > 1:
+        phases.append(("concurrent", args.concurrency, iterations * args.concurrency))
+    if scenario.setup:
+        scenario.setup(sum(n for _, _, n in phases))
+    if scenario.name == "list_items_cached":
+        appz.list_items(BUCKET, "wide")
+        appz.list_items(BUCKET, "/".join(["dir0"] * args.depth))
+    out: Dict[str, Any] = {}
+    first = 0
+    for label, workers, n in phases:
+        server.control("reset")
+        start = time.perf_counter()
+        phase = run_phase(appz, scenario, n, workers, first)
+        wall = time.perf_counter() - start
+        out[label] = summarize(phase, wall, server.stats(), workers)
+        first += n
+    return out
+
+# ---------------------- Reporting ----------------------
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]):
+    """Add "vs_baseline" ratios (new / old) to every scenario phase present in both runs."""
+    for name, phases in results["scenarios"].items():
+        for label, cur in phases.items():
+            old = baseline.get("scenarios", {}).get(name, {}).get(label)
+            if not old:
+                continue
+
+            def ratio(a, b):
+                return round(a / b, 3) if b else None
+
+            cur["vs_baseline"] = {
+                "ops_per_s": ratio(cur["ops_per_s"], old["ops_per_s"]),
+                "p50": ratio(cur["latency_ms"]["p50"], old["latency_ms"]["p50"]),
+                "p99": ratio(cur["latency_ms"]["p99"], old["latency_ms"]["p99"]),
+                "storage_requests_total": ratio(cur["storage_requests_total"], old["storage_requests_total"]),
+            }
+
+def print_table(results: Dict[str, Any]):
+    rows = [("scenario", "phase", "ops/s", "p50 ms", "p99 ms", "storage req", "errors", "rss MB")]
+    for name, phases in results["scenarios"].items():
+        for label, r in phases.items():
+            rows.append((name, label, f"{r['ops_per_s']:.1f}", f"{r['latency_ms']['p50']:.2f}",
+                         f"{r['latency_ms']['p99']:.2f}", str(r["storage_requests_total"]),
+                         str(r["errors"]), f"{r['peak_rss_mb']:.0f}"))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    for row in rows:
+        print("  ".join(cell.ljust(w) for cell, w in zip(row, widths)), file=sys.stderr)
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--objects", type=int, default=100000, help="objects in the deep tree")
+    parser.add_argument("--depth", type=int, default=8, help="folder levels of the deep tree")
+    parser.add_argument("--fanout", type=int, default=4, help="subfolders per folder of the deep tree")
+    parser.add_argument("--wide-files", type=int, default=2000, help="files in the single wide folder")
+    parser.add_argument("--subtree-objects", type=int, default=500, help="objects per copied/deleted folder")
+    parser.add_argument("--upload-size", type=int, default=64 * 1024)
+    parser.add_argument("--download-size", type=int, default=1024 * 1024)
+    parser.add_argument("--iterations", type=int, default=50, help="ops per worker for light scenarios")
+    parser.add_argument("--heavy-iterations", type=int, default=3, help="ops per worker for bulk scenarios")
+    parser.add_argument("--concurrency", type=int, default=8, help="workers in the concurrent phase (1 = skip)")
+    parser.add_argument("--scenarios", default="", help="comma-separated subset (default: all)")
+    parser.add_argument("--latency", type=float, default=0.002, help="fake server latency per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.001)
+    parser.add_argument("--op-latency", default="", help='e.g. "object.list=0.02,object.copy=0.01"')
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fake server requests/s (0 = unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--out", help="write JSON results here (default: stdout)")
+    parser.add_argument("--baseline", help="earlier results to compare against")
+    args = parser.parse_args()
+
+    server = FakeServer(args)
+    workdir = tempfile.mkdtemp(prefix="sfm-bench-")
+    try:
+        started = time.time()
+        server.control("seed", bucket=BUCKET, count=args.objects, depth=args.depth, fanout=args.fanout)
+        server.control("seed", bucket=BUCKET, prefix="wide", count=args.wide_files, depth=0)
+        server.control("seed", bucket=SCRATCH, count=0)
+        seed_s = time.time() - started
+
+        # configure and import the app only now that the server is up
+        os.environ.update({
+            "SUPABASE_URL": server.url,
+            "SUPABASE_KEY": "bench",
+            "BUCKET_REFRESH_SECONDS": "0",
+            "OBJECT_INDEX_DIR": os.path.join(workdir, "index"),
+            "UPLOAD_SPOOL_DIR": os.path.join(workdir, "uploads"),
+        })
+        sys.path.insert(0, ROOT)
+        import appz
+
+        scenarios = build_scenarios(appz, server, args)
+        wanted = {s.strip() for s in args.scenarios.split(",") if s.strip()}
+        unknown = wanted - {s.name for s in scenarios}
+        if unknown:
+            raise SystemExit(f"unknown scenarios: {', '.join(sorted(unknown))}")
+        results: Dict[str, Any] = {
+            "meta": {
+                "commit": git_commit(),
+                "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(started)),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "seed_s": round(seed_s, 2),
+                "params": vars(args),
+            },
+            "scenarios": {},
+        }
+        for scenario in scenarios:
+            if wanted and scenario.name not in wanted:
+                continue
+            print(f"running {scenario.name} ...", file=sys.stderr)
+            results["scenarios"][scenario.name] = run_scenario(appz, server, scenario, args)
+        results["meta"]["peak_rss_mb"] = peak_rss_mb()
+        if args.baseline:
+            with open(args.baseline) as fh:
+                compare(results, json.load(fh))
+    finally:
+        server.close()
+
+    print_table(results)
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Shared fixtures: both apps pointed at an in-process bench/fake_storage.py server.
+
+The server is started and the environment set before appz is imported, so
+neither app needs real credentials. Each test gets fresh buckets; `app_client`
+runs the same test against the Flask app and the Quart (ASGI) app.
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "bench")]
+
+import fake_storage  # noqa: E402
+
+server = fake_storage.FakeStorageServer(("127.0.0.1", 0))
+threading.Thread(target=server.serve_forever, name="fake-storage", daemon=True).start()
+WORKDIR = tempfile.mkdtemp(prefix="sfm-tests-")
+os.environ.update({
+    "SUPABASE_URL": server.url,
+    "SUPABASE_KEY": "test",
+    "BUCKET_REFRESH_SECONDS": "0",
+    "RETRY_BASE_DELAY": "0.01",
+    "OBJECT_INDEX_DIR": os.path.join(WORKDIR, "index"),
+    "UPLOAD_SPOOL_DIR": os.path.join(WORKDIR, "uploads"),
+    "TRANSFER_JOURNAL_DIR": os.path.join(WORKDIR, "transfers"),
+    "DOWNLOAD_CACHE_DIR": os.path.join(WORKDIR, "downloads"),
+})
+
+import appz  # noqa: E402
+import appz_asgi  # noqa: E402
+
+# ---------------------- Storage fixtures ----------------------
+@pytest.fixture
+def store() -> fake_storage.Store:
+    return server.store
+
+@pytest.fixture(autouse=True)
+def _fresh_state():
+    server.limits.update(error_rate=0.0, rate_limit=0.0, latency=0.0, status_in_body=False)
+    appz._breakers.clear()
+    yield
+
+@pytest.fixture(params=["http", "body"])
+def error_style(request) -> str:
+    """4xx errors as plain HTTP statuses, or as hosted Storage sends them: HTTP 400
+    with the real status only in the body's "statusCode"."""
+    server.limits.update(status_in_body=request.param == "body")
+    return request.param
+
+@pytest.fixture
+def stats() -> fake_storage.Stats:
+    """Request counts per operation, from zero at the start of the test."""
+    server.stats.reset()
+    return server.stats
+
+def new_bucket() -> str:
+    name = f"t{uuid.uuid4().hex[:10]}"
+    with server.store.lock:
+        server.store.buckets[name] = fake_storage.BucketData(name)
+    return name
+
+@pytest.fixture
+def bucket() -> str:
+    return new_bucket()
+
+@pytest.fixture
+def other_bucket() -> str:
+    return new_bucket()
+
+def put(bucket: str, key: str, data: bytes = b"data"):
+    server.store.write(bucket, key, data, "application/octet-stream", upsert=True)
+
+def keys(bucket: str) -> List[str]:
+    with server.store.lock:
+        return list(server.store.bucket(bucket).keys)
+
+def content(bucket: str, key: str) -> bytes:
+    return server.store.get(bucket, key).body()
+
+# ---------------------- App clients ----------------------
+@dataclass
+class Reply:
+    status: int
+    body: bytes
+    headers: Mapping[str, str]  # case-insensitive (werkzeug Headers)
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+    def lines(self) -> List[Any]:
+        return [json.loads(line) for line in self.body.decode().splitlines() if line]
+
+class WsgiClient:
+    name = "wsgi"
+
+    def __init__(self):
+        self._client = appz.app.test_client()
+
+    def request(self, method: str, path: str, form: Optional[Dict[str, Any]] = None, data: bytes = b"",
+                files: Optional[List[Tuple[str, str, bytes]]] = None,
+                headers: Optional[Dict[str, str]] = None) -> Reply:
+        body: Any = data
+        if form is not None or files:
+            body = dict(form or {})
+            for field, filename, blob in files or []:
+                body.setdefault(field, []).append((io.BytesIO(blob), filename))
+        resp = self._client.open(path, method=method, data=body,
+                                 headers={"Accept": "application/json", **(headers or {})})
+        return Reply(resp.status_code, resp.get_data(), resp.headers)
+
+class Pairs(list):
+    """(key, value) pairs with a dict-like items(); Quart's test client sends only
+    the first value of a repeated MultiDict key, but iterates whatever items() gives."""
+
+    def items(self):
+        return iter(self)
+
+class AsgiClient:
+    """Quart's test client on an event loop in a background thread, so jobs started
+    by one request keep running while the test polls for them."""
+
+    name = "asgi"
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="asgi-tests", daemon=True).start()
+        self._ctx = appz_asgi.app.test_app()
+        self._client = self.run(self._ctx.__aenter__()).test_client()
+
+    def run(self, coro, timeout: float = 30):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def request(self, method: str, path: str, form: Optional[Dict[str, Any]] = None, data: bytes = b"",
+                files: Optional[List[Tuple[str, str, bytes]]] = None,
+                headers: Optional[Dict[str, str]] = None) -> Reply:
+        from quart.datastructures import FileStorage
+
+        async def _go() -> Reply:
+            kwargs: Dict[str, Any] = {}
+            if form is not None or files:
+                kwargs["form"] = Pairs((k, v) for k, vs in (form or {}).items()
+                                       for v in (vs if isinstance(vs, list) else [vs]))
+            if files:
+                kwargs["files"] = Pairs((field, FileStorage(io.BytesIO(blob), filename=filename))
+                                        for field, filename, blob in files)
+            elif data:
+                kwargs["data"] = data
+            resp = await self._client.open(path, method=method,
+                                           headers={"Accept": "application/json", **(headers or {})}, **kwargs)
+            return Reply(resp.status_code, await resp.get_data(), resp.headers)
+
+        return self.run(_go())
+
+    def close(self):
+        self.run(self._ctx.__aexit__(None, None, None))
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+@pytest.fixture(scope="session")
+def asgi_client():
+    client = AsgiClient()
+    yield client
+    client.close()
+
+@pytest.fixture(params=["wsgi", "asgi"])
+def app_client(request):
+    if request.param == "wsgi":
+        return WsgiClient()
+    return request.getfixturevalue("asgi_client")
+
+@pytest.fixture(params=["sync", "async"])
+def drive(request):
+    """drive(steps, job=None): run steps to completion under one of the two drivers."""
+    if request.param == "sync":
+        return appz.run_steps
+    client = request.getfixturevalue("asgi_client")
+    return lambda steps, job=None: client.run(appz_asgi.run_steps(steps, job))
+
+def wait_job(client, job: Dict[str, Any], timeout: float = 30) -> Dict[str, Any]:
+    """Poll a job started by `client` until it finishes; returns its final state."""
+    deadline = time.monotonic() + timeout
+    while True:
+        state = client.request("GET", f"/jobs/{job['id']}").json()
+        if state["status"] not in ("queued", "running"):
+            return state
+        if time.monotonic() > deadline:
+            raise AssertionError(f"job did not finish: {state}")
+        time.sleep(0.02)
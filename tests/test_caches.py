@@ -0,0 +1,59 @@
+import os
+import time
+
+from appz import DownloadCache, ListingCache
+from conftest import put
+
+def rows(n):
+    return [{"name": f"r{i}"} for i in range(n)]
+
+def test_listing_cache_evicts_least_recently_used_folders():
+    cache = ListingCache(ttl=60, max_folders=2, max_rows=100)
+    cache.put("b", "one", (10, 0), rows(1))
+    cache.put("b", "two", (10, 0), rows(1))
+    assert cache.get("b", "one", (10, 0))  # "two" is now the least recently used
+    cache.put("b", "three", (10, 0), rows(1))
+    assert cache.get("b", "two", (10, 0)) is None
+    assert cache.get("b", "one", (10, 0)) and cache.get("b", "three", (10, 0))
+
+def test_listing_cache_bounds_rows_and_ages_out():
+    cache = ListingCache(ttl=0.05, max_folders=10, max_rows=10)
+    cache.put("b", "a", (10, 0), rows(6))
+    cache.put("b", "a", (10, 10), rows(2))
+    cache.put("b", "c", (10, 0), rows(4))  # 12 rows: all of "a" goes
+    assert cache.get("b", "a", (10, 10)) is None
+    assert cache.stats()["rows"] == 4
+    time.sleep(0.06)
+    assert cache.get("b", "c", (10, 0)) is None
+    assert cache.stats()["rows"] == 0
+
+def test_listing_cache_invalidates_trees():
+    cache = ListingCache(ttl=60, max_folders=10, max_rows=100)
+    for prefix in ("d", "d/e", "de", ""):
+        cache.put("b", prefix, (10, 0), rows(1))
+    cache.invalidate_tree("b", "d")
+    assert [p for p in ("d", "d/e", "de", "") if cache.get("b", p, (10, 0))] == ["de", ""]
+
+def test_download_cache_evicts_by_bytes(tmp_path, bucket):
+    for name in ("a", "b", "c"):
+        put(bucket, name, name.encode() * 40)
+    put(bucket, "huge", b"h" * 200)
+    cache = DownloadCache(str(tmp_path), max_bytes=100, max_object=100, revalidate=60)
+    first = cache.get(bucket, "a")
+    cache.get(bucket, "b")
+    assert cache.get(bucket, "a") is first  # "b" is now the least recently used
+    cache.get(bucket, "c")
+    assert cache.stats()["objects"] == 2 and cache.stats()["bytes"] == 80
+    assert cache.get(bucket, "huge") is None  # larger than max_object: not cached
+    assert {k for _, k in cache._data} == {"a", "c"}
+    assert len([f for f in os.listdir(cache._dir()) if not f.endswith(".part")]) == 2
+
+def test_download_cache_drops_invalidated_objects(tmp_path, bucket):
+    put(bucket, "f/x", b"old")
+    cache = DownloadCache(str(tmp_path), max_bytes=100, max_object=100, revalidate=60)
+    path = cache.get(bucket, "f/x").path
+    put(bucket, "f/x", b"new")
+    cache.invalidate(bucket, "f", recursive=True)
+    assert not os.path.exists(path)
+    with open(cache.get(bucket, "f/x").path, "rb") as fh:
+        assert fh.read() == b"new"
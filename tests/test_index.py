@@ -0,0 +1,126 @@
+"""The SQLite object index: folder totals, freshness, and keeping up with changes."""
+import os
+import time
+
+import pytest
+
+import appz
+from appz import ObjectIndex, build_object_index, notify_changed, object_index, written_entry
+from conftest import put
+
+def entry(size):
+    return {"metadata": {"size": size}, "updated_at": "2024-01-01T00:00:00Z"}
+
+def settle():
+    """Wait for the background recrawls queued so far."""
+    appz.index_refresher.submit(lambda: None).result(10)
+
+def test_folder_totals_follow_inserts_and_deletes(tmp_path):
+    index = ObjectIndex(str(tmp_path / "i.sqlite3"))
+    index.replace_all([("a.txt", entry(1)), ("d/b.txt", entry(10)), ("d/e/c.txt", entry(100))])
+    assert index.folder_stats("") == (3, 111)
+    assert index.folder_stats("d") == (2, 110)
+    assert index.folder_stats("d/e") == (1, 100)
+    index.upsert("d/e/c.txt", entry(50))
+    index.upsert("d/e/f.txt", entry(5))
+    assert index.folder_stats("d") == (3, 65)
+    index.upsert("d/e/c.txt", None)
+    index.upsert("d/e/f.txt", None)
+    assert index.folder_stats("d/e") == (0, 0)
+    folders, files, _ = index.list_page("", 10, 0)
+    assert [(f.name, f.size, f.count) for f in folders] == [("d", 10, 1)]
+    assert [f.name for f in files] == ["a.txt"]
+    index.replace_prefix("d", [("d/x.txt", entry(7))])
+    assert index.folder_stats("") == (2, 8) and index.keys("d") == ["d/x.txt"]
+
+@pytest.fixture
+def indexed(bucket):
+    put(bucket, "a.txt", b"a")
+    put(bucket, "d/b.txt", b"bb")
+    build_object_index(bucket)
+    yield bucket
+    settle()
+    object_index.drop(bucket)
+
+def test_written_entries_need_no_lookup(indexed, stats):
+    notify_changed(indexed, "d/new.txt", entry=written_entry(5))
+    notify_changed(indexed, "a.txt", entry=None)
+    assert stats.snapshot()["requests"] == {}
+    assert object_index.get(indexed, "d").folder_stats("d") == (2, 7)
+    assert object_index.get(indexed).keys() == ["d/b.txt", "d/new.txt"]
+
+def test_recursive_changes_are_recrawled_in_the_background(indexed, monkeypatch):
+    walked = []
+    walk = appz.walk_objects
+
+    def slow_walk(bucket, prefix):
+        walked.append(prefix)
+        time.sleep(0.1)
+        return walk(bucket, prefix)
+
+    monkeypatch.setattr(appz, "walk_objects", slow_walk)
+    put(indexed, "d/sub/c.txt", b"ccc")
+    started = time.monotonic()
+    notify_changed(indexed, "d", recursive=True)
+    assert time.monotonic() - started < 0.1  # not walked in the caller
+    assert object_index.get(indexed, "d/sub") is None  # being recrawled: list live
+    assert object_index.get(indexed, "") is None  # the root's totals include it
+    assert object_index.get(indexed, "other") is not None
+    settle()
+    assert walked == ["d"]
+    assert object_index.get(indexed, "d").folder_stats("d") == (2, 5)
+
+def test_changes_during_a_recrawl_are_kept(indexed, monkeypatch):
+    walk = appz.walk_objects
+
+    def walk_then_upload(bucket, prefix):
+        found = walk(bucket, prefix)
+        put(bucket, "d/late.txt", b"late")  # lands after the crawl listed d
+        notify_changed(bucket, "d/late.txt", entry=written_entry(4))
+        return found
+
+    monkeypatch.setattr(appz, "walk_objects", walk_then_upload)
+    notify_changed(indexed, "d", recursive=True)
+    settle()
+    assert "d/late.txt" in object_index.get(indexed, "d").keys("d")
+
+def test_old_index_is_not_trusted(indexed, monkeypatch):
+    monkeypatch.setattr(object_index, "max_age", 60)
+    index = object_index.built(indexed)
+    with index._lock:
+        index._db.execute("UPDATE meta SET v=? WHERE k='built_at'", (str(time.time() - 61),))
+    put(indexed, "outside.txt")  # made without going through the app
+    assert object_index.get(indexed) is None
+    settle()  # the refresh that get() started
+    fresh = object_index.get(indexed)
+    assert fresh is not None and "outside.txt" in fresh.keys()
+
+def test_many_uploads_update_the_index_without_listing(app_client, indexed, stats):
+    names = [f"many/{i}.txt" for i in range(20)]
+    resp = app_client.request("POST", f"/b/{indexed}/upload-many", form={"current_path": "up", "paths": names},
+                              files=[("files", name, b"xyz") for name in names])
+    assert resp.json()["uploaded"] == 20
+    settle()
+    requests = stats.snapshot()["requests"]
+    assert "object.list" not in requests and "object.list_v2" not in requests
+    assert object_index.get(indexed, "up").folder_stats("up/many") == (20, 60)
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_worker_opens_its_own_index_and_pools(indexed):
+    parent_index = object_index.get(indexed)
+    pid = os.fork()
+    if pid == 0:
+        try:
+            index = object_index.get(indexed)
+            ok = (index is not None and index is not parent_index and index.folder_stats("")[0] > 0
+                  and appz.index_refresher.submit(lambda: 1).result(10) == 1
+                  and appz.job_runner.list() == [])
+            job = appz.job_runner.submit("test", "Fork test", lambda j: "ran")
+            deadline = time.monotonic() + 10
+            while not job.finished_at and time.monotonic() < deadline:
+                time.sleep(0.01)
+            os._exit(0 if ok and job.status == "done" else 1)
+        except BaseException:
+            os._exit(2)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
@@ -0,0 +1,127 @@
+import time
+from email.utils import formatdate
+
+import pytest
+
+import appz
+from appz import AdaptiveLimit, CircuitBreaker, Job, JobCancelled, retry_after_seconds
+
+def cancelled_job() -> Job:
+    job = Job(id="j", kind="test", description="")
+    job._cancel.set()
+    return job
+
+def test_retry_after_seconds():
+    assert retry_after_seconds(None) is None
+    assert retry_after_seconds("") is None
+    assert retry_after_seconds("2.5") == 2.5
+    assert retry_after_seconds("-3") == 0.0
+    assert 25 < retry_after_seconds(formatdate(time.time() + 30, usegmt=True)) <= 30
+    assert retry_after_seconds(formatdate(time.time() - 30, usegmt=True)) == 0.0
+    assert retry_after_seconds("soon") is None
+
+def test_adaptive_limit_halves_once_per_burst_and_grows_back():
+    limit = AdaptiveLimit(initial=8, minimum=1, maximum=8)
+    calls = [limit.acquire() for _ in range(4)]
+    for started in calls:
+        limit.release(started, "throttle")
+    assert limit.limit == 4 and limit.throttled == 4 and limit.in_flight == 0
+    for _ in range(8):
+        limit.release(limit.acquire(), None)
+    assert 5 < limit.limit <= 6
+    limit.release(limit.acquire(), "failure")
+    limit.release(limit.acquire(), "skipped")
+    assert 5 < limit.limit <= 6
+
+def test_adaptive_limit_wait_is_cancellable():
+    limit = AdaptiveLimit(initial=1, minimum=1, maximum=1)
+    limit.acquire()
+    job = cancelled_job()
+    with pytest.raises(JobCancelled):
+        limit.acquire(job)
+    assert limit.in_flight == 1
+
+def test_circuit_opens_probes_and_closes():
+    breaker = CircuitBreaker("b", threshold=2, cooldown=0.05)
+    breaker.record("failure")
+    assert breaker.state == "closed" and breaker.wait_time() == 0
+    breaker.record("failure")
+    assert breaker.state == "open" and breaker.wait_time() > 0
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    assert breaker.wait_time() == 0  # the probe
+    assert breaker.wait_time() > 0  # everyone else waits for it
+    breaker.record(None)
+    assert breaker.state == "closed" and breaker.open_until == 0.0
+    # a fresh run of failures opens for the base cooldown again, not twice it
+    breaker.record("failure")
+    breaker.record("failure")
+    assert breaker.cooldown == 0.05
+
+def test_failed_probe_doubles_cooldown():
+    breaker = CircuitBreaker("b", threshold=1, cooldown=0.05)
+    breaker.record("failure")
+    time.sleep(0.06)
+    assert breaker.wait_time() == 0
+    breaker.record("failure")
+    assert breaker.cooldown == 0.1 and breaker.state == "open"
+
+def test_cancelled_wait_for_a_slot_does_not_strand_the_probe(monkeypatch):
+    limit = AdaptiveLimit(initial=1, minimum=1, maximum=1)
+    monkeypatch.setattr(appz, "bulk_limit", limit)
+    breaker = appz.breaker_for("")
+    breaker.failures = breaker.threshold  # half-open: the next call is the probe
+    limit.acquire()  # and no slot is free
+    job = cancelled_job()
+    with pytest.raises(JobCancelled):
+        appz.storage_call(lambda: "unreachable", job=job)
+    limit.release(0.0, None)
+    assert appz.storage_call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+
+def test_storage_call_retries_transient_errors(monkeypatch):
+    import httpx
+
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise httpx.ConnectError("down")
+        return "ok"
+
+    monkeypatch.setattr(appz, "retry_delay", lambda attempt, retry_after=None: 0)
+    assert appz.storage_call(flaky) == "ok"
+    assert len(attempts) == 3
+
+def test_not_found_neither_closes_the_circuit_nor_grows_the_limit(monkeypatch):
+    from storage3.exceptions import StorageApiError
+
+    limit = AdaptiveLimit(initial=4, minimum=1, maximum=8)
+    monkeypatch.setattr(appz, "bulk_limit", limit)
+    breaker = appz.breaker_for("")
+    breaker.failures = breaker.threshold  # half-open: this call is the probe
+
+    def missing():
+        raise StorageApiError("Object not found", "not_found", "404")
+
+    with pytest.raises(StorageApiError):
+        appz.storage_call(missing)
+    assert limit.limit == 4 and limit.in_flight == 0
+    assert breaker.failures == breaker.threshold and breaker.state == "half-open"
+    assert breaker.wait_time() == 0  # the next call may probe again
+
+def test_error_status_prefers_the_body_status():
+    import httpx
+    from storage3.exceptions import StorageApiError
+
+    def http_error(status, body):
+        req = httpx.Request("POST", "http://storage/object/copy")
+        resp = httpx.Response(status, json=body, request=req)
+        return httpx.HTTPStatusError("error", request=req, response=resp)
+
+    assert appz.error_status(StorageApiError("The resource already exists", "Duplicate", "409")) == 409
+    assert appz.error_status(http_error(400, {"statusCode": "404", "error": "not_found"})) == 404
+    assert appz.error_status(http_error(400, {"message": "bad"})) == 400
+    assert appz.error_status(http_error(503, None)) == 503
+    assert appz.error_status(ValueError("no status")) is None
@@ -0,0 +1,154 @@
+"""End-to-end behaviour of the routes, identical for the Flask and the ASGI app."""
+import io
+import zipfile
+
+import pytest
+
+import appz
+from conftest import content, keys, put, wait_job
+
+def test_listing_pages_with_cursor(app_client, bucket):
+    for i in range(5):
+        put(bucket, f"docs/f{i}.txt")
+    put(bucket, "docs/sub/deep.txt")
+    first = app_client.request("GET", f"/api/v1/b/{bucket}/list?path=docs&limit=4").json()
+    assert [f[0] for f in first["files"]] == ["f0.txt", "f1.txt", "f2.txt", "f3.txt"]
+    rest = app_client.request(
+        "GET", f"/api/v1/b/{bucket}/list?path=docs&limit=4&cursor={first['next_cursor']}").json()
+    assert [f[0] for f in rest["files"]] == ["f4.txt"]
+    assert [f[0] for f in rest["folders"]] == ["sub"]
+    assert rest["next_cursor"] is None
+
+def test_listing_revalidates_with_etag(app_client, bucket):
+    put(bucket, "a.txt")
+    first = app_client.request("GET", f"/api/v1/b/{bucket}/list")
+    again = app_client.request("GET", f"/api/v1/b/{bucket}/list", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status == 304
+
+def test_bucket_names_come_from_the_shared_catalog(app_client, bucket, stats):
+    appz.bucket_catalog.refresh()
+    stats.reset()
+    for _ in range(3):
+        assert bucket in app_client.request("GET", "/api/v1/buckets").json()["buckets"]
+    assert "bucket.list" not in stats.snapshot()["requests"]
+
+def transfer(client, **form):
+    resp = client.request("POST", "/transfer", form=form)
+    assert resp.status == 202, resp.body
+    return wait_job(client, resp.json())
+
+def test_copy_and_move_file(app_client, bucket, other_bucket):
+    put(bucket, "a.txt", b"hello")
+    job = transfer(app_client, op="copy", is_folder="0", src_bucket=bucket, src_path="a.txt",
+                   dst_bucket=bucket, dst_path="b.txt")
+    assert job["status"] == "done"
+    job = transfer(app_client, op="move", is_folder="0", src_bucket=bucket, src_path="b.txt",
+                   dst_bucket=other_bucket, dst_path="c.txt")
+    assert job["status"] == "done", job
+    assert keys(bucket) == ["a.txt"]
+    assert content(other_bucket, "c.txt") == b"hello"
+
+def test_folder_copy_and_move_across_buckets(app_client, bucket, other_bucket):
+    for key in ("src/a.txt", "src/x/b.txt", "src/x/y/c.txt", "keep.txt"):
+        put(bucket, key, key.encode())
+    job = transfer(app_client, op="copy", is_folder="1", src_bucket=bucket, src_path="src",
+                   dst_bucket=other_bucket, dst_path="backup")
+    assert job["status"] == "done", job
+    assert keys(other_bucket) == ["backup/src/a.txt", "backup/src/x/b.txt", "backup/src/x/y/c.txt"]
+    job = transfer(app_client, op="move", is_folder="1", src_bucket=bucket, src_path="src",
+                   dst_bucket=bucket, dst_path="moved")
+    assert job["status"] == "done", job
+    assert keys(bucket) == ["keep.txt", "moved/src/a.txt", "moved/src/x/b.txt", "moved/src/x/y/c.txt"]
+    assert content(bucket, "moved/src/x/y/c.txt") == b"src/x/y/c.txt"
+
+@pytest.mark.usefixtures("error_style")
+def test_sync_copies_only_changes(app_client, bucket, other_bucket):
+    put(bucket, "s/same.txt", b"same")
+    put(bucket, "s/changed.txt", b"new contents")
+    put(bucket, "s/added.txt", b"added")
+    put(other_bucket, "s/same.txt", b"same")
+    put(other_bucket, "s/changed.txt", b"old")
+    put(other_bucket, "s/extra.txt", b"extra")
+    job = transfer(app_client, op="sync", is_folder="1", src_bucket=bucket, src_path="s",
+                   dst_bucket=other_bucket, delete_extra="1")
+    assert job["status"] == "done", job
+    assert "2 copied, 1 unchanged, 1 deleted" in job["message"]
+    assert keys(other_bucket) == ["s/added.txt", "s/changed.txt", "s/same.txt"]
+    assert content(other_bucket, "s/changed.txt") == b"new contents"
+
+def test_delete_prefix(app_client, bucket):
+    for i in range(30):
+        put(bucket, f"tmp/{i % 3}/f{i}.txt")
+    put(bucket, "tmpfile.txt")
+    resp = app_client.request("POST", f"/b/{bucket}/delete-prefix", form={"current_path": "tmp"})
+    assert wait_job(app_client, resp.json())["status"] == "done"
+    assert keys(bucket) == ["tmpfile.txt"]
+
+def test_delete_bucket_empties_it_first(app_client, store, bucket):
+    for i in range(50):
+        put(bucket, f"d{i % 4}/f{i}.txt")
+    resp = app_client.request("POST", f"/delete-bucket/{bucket}")
+    job = wait_job(app_client, resp.json())
+    assert job["status"] == "done", job
+    assert bucket not in store.buckets
+
+def test_upload_many_keeps_relative_paths(app_client, bucket):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("z/one.txt", "1")
+    resp = app_client.request(
+        "POST", f"/b/{bucket}/upload-many",
+        form={"current_path": "up", "paths": ["a.txt", "nested/b.txt", "pack.zip"], "expand_zip": "1"},
+        files=[("files", "a.txt", b"a"), ("files", "b.txt", b"b"), ("files", "pack.zip", archive.getvalue())])
+    assert resp.json()["uploaded"] == 3, resp.body
+    assert keys(bucket) == ["up/a.txt", "up/nested/b.txt", "up/z/one.txt"]
+
+def test_upload_guesses_the_content_type(app_client, store, bucket):
+    resp = app_client.request("POST", f"/b/{bucket}/upload", form={"current_path": "img"},
+                              files=[("file", "cat.png", b"png")])
+    assert resp.status == 200, resp.body
+    assert store.get(bucket, "img/cat.png").mimetype == "image/png"
+
+def test_chunked_upload(app_client, store, bucket):
+    blob = bytes(range(256)) * 10
+    init = app_client.request("POST", f"/b/{bucket}/uploads",
+                              form={"current_path": "big", "filename": "blob.pdf", "size": str(len(blob)),
+                                    "fingerprint": "fp"}).json()
+    upload_id = init["upload_id"]
+    for offset in range(0, len(blob), 1000):
+        resp = app_client.request("PUT", f"/b/{bucket}/uploads/{upload_id}?offset={offset}",
+                                  data=blob[offset:offset + 1000])
+        assert resp.json()["offset"] == min(offset + 1000, len(blob))
+    done = app_client.request("POST", f"/b/{bucket}/uploads/{upload_id}/complete")
+    assert done.status == 200, done.body
+    assert content(bucket, "big/blob.pdf") == blob
+    assert store.get(bucket, "big/blob.pdf").mimetype == "application/pdf"
+
+def test_search_modes(app_client, bucket):
+    for key in ("logs/2024/a.log", "logs/2024/b.txt", "img/cat.png", "img/log.png"):
+        put(bucket, key)
+    lines = app_client.request("GET", f"/b/{bucket}/search?q=log&mode=substring").lines()
+    assert [l["key"] for l in lines[:-1]] == ["img/log.png", "logs/2024/a.log", "logs/2024/b.txt"]
+    lines = app_client.request("GET", f"/b/{bucket}/search?q=*.png").lines()
+    assert [l["key"] for l in lines[:-1]] == ["img/cat.png", "img/log.png"]
+    assert lines[-1]["done"] and lines[-1]["count"] == 2
+
+def test_download_range_and_zip(app_client, bucket):
+    put(bucket, "f/a.txt", b"0123456789")
+    put(bucket, "f/sub/b.txt", b"bbb")
+    part = app_client.request("GET", f"/download/{bucket}/f/a.txt", headers={"Range": "bytes=2-4"})
+    assert part.status == 206 and part.body == b"234"
+    archive = app_client.request("GET", f"/download-zip/{bucket}/f")
+    with zipfile.ZipFile(io.BytesIO(archive.body)) as zf:
+        assert sorted(zf.namelist()) == ["f/a.txt", "f/sub/b.txt"]
+        assert zf.read("f/sub/b.txt") == b"bbb"
+
+def test_search_streams_in_batches_up_to_the_limit(app_client, bucket, monkeypatch):
+    monkeypatch.setattr(appz, "SEARCH_STREAM_BATCH", 2)
+    for i in range(7):
+        put(bucket, f"k/{i}.txt")
+    lines = app_client.request("GET", f"/b/{bucket}/search?q=k/&mode=prefix&limit=5").lines()
+    assert [l["key"] for l in lines[:-1]] == [f"k/{i}.txt" for i in range(5)]
+    assert lines[-1]["count"] == 5 and lines[-1]["truncated"]
+    lines = app_client.request("GET", f"/b/{bucket}/search?q=k/&mode=prefix").lines()
+    assert lines[-1]["count"] == 7 and not lines[-1]["truncated"]
@@ -0,0 +1,52 @@
+import re
+
+import pytest
+
+from appz import KeySearchIndex, glob_literal, glob_to_regex
+
+KEYS = ["a/axb.log", "a/ayb.txt", "a/azb.txt", "b/1.txt", "b/x.txt", "b/[draft].txt", "c/notes.md"]
+
+@pytest.mark.parametrize("pattern,key,matches", [
+    ("*.txt", "a/b.txt", True),
+    ("*.txt", "a/b.txt.bak", False),
+    ("a/?.txt", "a/b.txt", True),
+    ("a/?.txt", "a/bb.txt", False),
+    ("*a[xy]b*", "a/ayb.txt", True),
+    ("*a[xy]b*", "a/azb.txt", False),
+    ("*[!0-9].txt", "b/x.txt", True),
+    ("*[!0-9].txt", "b/1.txt", False),
+    ("*[]]*", "b/[draft].txt", True),
+    ("b/[draft*", "b/[draft].txt", True),  # unclosed "[" is literal
+    ("a.b", "axb", False),
+])
+def test_glob_to_regex(pattern, key, matches):
+    assert bool(re.match(glob_to_regex(pattern), key)) is matches
+
+@pytest.mark.parametrize("pattern,literal", [
+    ("*.txt", ".txt"),
+    ("*a[xy]b*", "a"),
+    ("*[!0-9].txt", ".txt"),
+    ("[ab][cd]", ""),
+    ("b/[draft*", "b/[draft"),
+])
+def test_glob_literal_skips_bracket_classes(pattern, literal):
+    assert glob_literal(pattern) == literal
+
+@pytest.mark.parametrize("query,expected", [
+    ("*a[xy]b*", ["a/axb.log", "a/ayb.txt"]),
+    ("*[!0-9].txt", ["a/ayb.txt", "a/azb.txt", "b/[draft].txt", "b/x.txt"]),
+    ("[abc]/*.md", ["c/notes.md"]),
+    ("*", sorted(KEYS)),
+])
+def test_glob_search(query, expected):
+    assert list(KeySearchIndex(KEYS).search(query, "glob")) == expected
+
+def test_search_follows_adds_and_removes():
+    index = KeySearchIndex(KEYS)
+    index.add("b/2.txt")
+    index.discard("b/x.txt")
+    assert list(index.search("b/", "prefix")) == ["b/1.txt", "b/2.txt", "b/[draft].txt"]
+    assert list(index.search(".txt", "substring")) == [
+        "a/ayb.txt", "a/azb.txt", "b/1.txt", "b/2.txt", "b/[draft].txt"]
+    index.replace_prefix("a", ["a/new.txt"])
+    assert list(index.search("a/*", "glob")) == ["a/new.txt"]
@@ -0,0 +1,204 @@
+"""The shared step generators behave the same under the blocking and the asyncio driver."""
+import io
+import zipfile
+
+import pytest
+
+import appz
+import fake_storage
+import appz_asgi
+from appz import END, BlockingCall, Job, JobCancelled, Join, Spawn, StorageOp
+from conftest import content, keys, put
+
+@pytest.fixture(params=["sync", "async"])
+def outputs(request):
+    """outputs(steps): everything the steps yield as output, under one of the two drivers."""
+    if request.param == "sync":
+        return lambda steps: list(appz.iter_steps(steps))
+
+    async def _collect(steps):
+        return [out async for out in appz_asgi.iter_steps(steps)]
+
+    client = request.getfixturevalue("asgi_client")
+    return lambda steps: client.run(_collect(steps))
+
+def download_steps(bucket, key):
+    return (yield StorageOp(bucket, "download", (key,)))
+
+def test_calls_spawns_and_blocking_work(drive, bucket):
+    put(bucket, "a.txt", b"A")
+    put(bucket, "b.txt", b"B")
+
+    def steps():
+        first = yield Spawn(download_steps(bucket, "a.txt"))
+        second = yield from download_steps(bucket, "b.txt")
+        doubled = yield BlockingCall(lambda data: data * 2, (second,))
+        return (yield Join(first)) + doubled
+
+    assert drive(steps()) == b"ABB"
+
+def test_index_lookups_run_as_blocking_work(bucket):
+    # opening a bucket's SQLite index must not happen on the event loop
+    assert next(appz.keys_under_steps(bucket, "x")) == BlockingCall(appz.object_index.get, (bucket, "x"))
+
+@pytest.mark.usefixtures("error_style")
+def test_errors_are_thrown_into_the_steps(drive, bucket):
+    def steps():
+        try:
+            yield StorageOp(bucket, "download", ("missing.txt",))
+        except Exception as ex:
+            return f"caught {appz.error_status(ex)}"
+        return "no error"
+
+    assert drive(steps()) == "caught 404"
+
+def test_cancellation_is_not_thrown_into_the_steps(drive):
+    job = Job(id="j", kind="test", description="")
+    job._cancel.set()
+    closed = []
+
+    def child():
+        appz.check_cancelled(job)
+        yield BlockingCall(len, ("",))
+
+    def steps():
+        try:
+            yield Join((yield Spawn(child())))
+        except Exception:
+            return "swallowed"
+        finally:
+            closed.append(True)
+
+    with pytest.raises(JobCancelled):
+        drive(steps(), job)
+    assert closed == [True]
+
+def test_walk_falls_back_to_folders_without_list_v2(drive, bucket, monkeypatch):
+    for key in ("a.txt", "d/b.txt", "d/e/c.txt", "d/e/f/g.txt"):
+        put(bucket, key)
+
+    def unsupported(result, search):
+        raise ValueError("unexpected list-v2 reply")
+
+    monkeypatch.setattr(appz, "flat_page", unsupported)
+    found = drive(appz.walk_steps(bucket, "d"))
+    assert sorted(key for key, _ in found) == ["d/b.txt", "d/e/c.txt", "d/e/f/g.txt"]
+
+def test_next_output_passes_steps_through(drive, bucket):
+    put(bucket, "a.txt", b"A")
+
+    def producer():
+        yield "first"
+        yield (yield StorageOp(bucket, "download", ("a.txt",)))
+
+    def steps():
+        source, seen = producer(), []
+        while True:
+            out = yield from appz.next_output(source)
+            if out is END:
+                return seen
+            seen.append(out)
+
+    assert drive(steps()) == ["first", b"A"]
+
+def test_remove_as_listed_in_batches(drive, bucket, monkeypatch):
+    monkeypatch.setattr(appz, "REMOVE_BATCH_SIZE", 7)
+    for i in range(40):
+        put(bucket, f"f/{i % 3}/{i}.txt")
+    put(bucket, "keep.txt")
+    job = Job(id="j", kind="test", description="")
+    listed, removed, errors = drive(appz.remove_as_listed_steps(bucket, "f", job), job)
+    assert (listed, removed, errors) == (40, 40, [])
+    assert job.objects_done == 40
+    assert keys(bucket) == ["keep.txt"]
+
+def test_zip_streams_large_members(outputs, bucket, monkeypatch):
+    monkeypatch.setattr(appz, "ZIP_PREFETCH_MAX_BYTES", 10)
+    monkeypatch.setattr(appz, "ZIP_PREFETCH", 2)
+    big = bytes(range(256)) * 40
+    put(bucket, "z/big.bin", big)
+    put(bucket, "z/small.txt", b"small")
+    put(bucket, "z/empty/.keep", b"")
+    archive = b"".join(outputs(appz.folder_zip_steps(bucket, "z")))
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        assert sorted(zf.namelist()) == ["z/big.bin", "z/empty/", "z/small.txt"]
+        assert zf.read("z/big.bin") == big
+
+@pytest.mark.usefixtures("error_style")
+@pytest.mark.parametrize("move", [False, True])
+def test_cross_bucket_transfer_is_server_side(drive, bucket, other_bucket, stats, move):
+    put(bucket, "a.txt", b"hello")
+    drive(appz.transfer_object_steps(bucket, "a.txt", other_bucket, "b.txt", move=move))
+    assert content(other_bucket, "b.txt") == b"hello"
+    assert keys(bucket) == ([] if move else ["a.txt"])
+    ops = stats.snapshot()["requests"]
+    assert ops.get("object.download", 0) == ops.get("object.upload", 0) == 0
+
+@pytest.mark.usefixtures("error_style")
+def test_cross_bucket_conflict_is_not_streamed(drive, bucket, other_bucket, stats):
+    put(bucket, "a.txt", b"new")
+    put(other_bucket, "a.txt", b"old")
+    with pytest.raises(Exception) as err:
+        drive(appz.transfer_object_steps(bucket, "a.txt", other_bucket, "a.txt"))
+    assert appz.error_status(err.value) == 409
+    assert "object.download" not in stats.snapshot()["requests"]
+    assert content(other_bucket, "a.txt") == b"old"
+
+@pytest.mark.usefixtures("error_style")
+def test_cross_bucket_transfer_streams_when_refused(drive, bucket, other_bucket, monkeypatch):
+    transfer = fake_storage.Store.transfer
+
+    def same_bucket_only(self, src_bucket, src, dst_bucket, dst, move):
+        if src_bucket != dst_bucket:
+            raise fake_storage.StoreError(400, "invalid_request", "destinationBucket is not supported")
+        return transfer(self, src_bucket, src, dst_bucket, dst, move)
+
+    monkeypatch.setattr(fake_storage.Store, "transfer", same_bucket_only)
+    monkeypatch.setattr(appz, "DOWNLOAD_CHUNK_SIZE", 100)
+    blob = bytes(range(256)) * 10
+    put(bucket, "a.bin", blob)
+    drive(appz.transfer_object_steps(bucket, "a.bin", other_bucket, "b.bin", move=True))
+    assert content(other_bucket, "b.bin") == blob
+    assert keys(bucket) == []
+
+@pytest.mark.parametrize("src_is_other", [False, True])
+@pytest.mark.usefixtures("error_style")
+def test_overwrite_replaces_via_a_temporary_key(drive, bucket, other_bucket, src_is_other):
+    src_bucket = other_bucket if src_is_other else bucket
+    put(src_bucket, "new.txt", b"new")
+    put(bucket, "dst.txt", b"old")
+    drive(appz.transfer_object_steps(src_bucket, "new.txt", bucket, "dst.txt", overwrite=True))
+    assert content(bucket, "dst.txt") == b"new"
+    assert sorted(keys(bucket)) == (["dst.txt"] if src_is_other else ["dst.txt", "new.txt"])
+
+@pytest.mark.usefixtures("error_style")
+def test_failed_overwrite_keeps_the_destination(drive, bucket, monkeypatch):
+    transfer = fake_storage.Store.transfer
+
+    def no_room_for_a_second_copy(self, src_bucket, src, dst_bucket, dst, move):
+        if dst.endswith(appz.TRANSFER_TEMP_SUFFIX):
+            raise fake_storage.StoreError(507, "insufficient_storage", "Bucket is full")
+        return transfer(self, src_bucket, src, dst_bucket, dst, move)
+
+    put(bucket, "new.txt", b"new")
+    put(bucket, "dst.txt", b"old")
+    monkeypatch.setattr(fake_storage.Store, "transfer", no_room_for_a_second_copy)
+    with pytest.raises(Exception):
+        drive(appz.transfer_object_steps(bucket, "new.txt", bucket, "dst.txt", overwrite=True))
+    assert content(bucket, "dst.txt") == b"old"
+
+@pytest.mark.parametrize("move", [False, True])
+def test_transfer_folder(drive, bucket, other_bucket, move):
+    for key in ("src/a.txt", "src/x/b.txt", "keep.txt"):
+        put(bucket, key, key.encode())
+    job = Job(id="j", kind="test", description="")
+    done, errors = drive(appz.transfer_folder_steps(bucket, "src", other_bucket, "dst", move, job), job)
+    assert (done, errors, job.objects_done) == (2, [], 2)
+    assert keys(other_bucket) == ["dst/a.txt", "dst/x/b.txt"]
+    assert keys(bucket) == (["keep.txt"] if move else ["keep.txt", "src/a.txt", "src/x/b.txt"])
+    assert content(other_bucket, "dst/x/b.txt") == b"src/x/b.txt"
+
+def test_transfer_empty_folder_only_creates_the_target(drive, bucket, stats):
+    assert drive(appz.transfer_folder_steps(bucket, "none", bucket, "dst", True)) == (0, [])
+    assert keys(bucket) == ["dst/.keep"]
+    assert "object.remove" not in stats.snapshot()["requests"]
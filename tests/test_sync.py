@@ -0,0 +1,31 @@
+import pytest
+
+from appz import objects_differ, plan_sync
+
+def entry(size, etag=None, updated="2024-01-01T00:00:00Z"):
+    meta = {"size": size, **({"eTag": f'"{etag}"'} if etag else {})}
+    return {"metadata": meta, "updated_at": updated}
+
+@pytest.mark.parametrize("src,dst,differ", [
+    (entry(3, "abc"), entry(3, "abc"), False),
+    (entry(3, "abc"), entry(3, "abd"), True),
+    (entry(3, "abc"), entry(4, "abc"), True),
+    (entry(3, updated="2024-02-01T00:00:00Z"), entry(3), True),  # no eTags: newer source
+    (entry(3), entry(3, updated="2024-02-01T00:00:00Z"), False),
+    (entry(3, "abc"), entry(3), False),  # one eTag missing: compared by date
+])
+def test_objects_differ(src, dst, differ):
+    assert objects_differ(src, dst) is differ
+
+def test_plan_sync_by_relative_path():
+    src = [("s/same.txt", entry(1, "a")), ("s/changed.txt", entry(2, "b")), ("s/sub/new.txt", entry(3, "c"))]
+    dst = [("d/same.txt", entry(1, "a")), ("d/changed.txt", entry(2, "x")), ("d/extra.txt", entry(1, "e"))]
+    plan = plan_sync(src, "s", dst, "d")
+    assert [(s, d, replace) for s, d, _, replace in plan.copy] == [
+        ("s/changed.txt", "d/changed.txt", True), ("s/sub/new.txt", "d/sub/new.txt", False)]
+    assert plan.skipped == 1 and plan.delete == []
+    assert plan_sync(src, "s", dst, "d", delete_extra=True).delete == ["d/extra.txt"]
+
+def test_plan_sync_at_the_bucket_root():
+    plan = plan_sync([("a.txt", entry(1, "a"))], "", [("x/a.txt", entry(1, "a"))], "x")
+    assert plan.skipped == 1 and plan.copy == []
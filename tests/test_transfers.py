@@ -0,0 +1,86 @@
+"""Journaled folder transfers resume where an earlier run stopped."""
+import pytest
+
+import appz
+import fake_storage
+from appz import Job, transfer_journal
+from conftest import content, keys, put, wait_job
+
+def new_job() -> Job:
+    return Job(id="j", kind="test", description="")
+
+@pytest.fixture
+def failing(monkeypatch):
+    """failing(*src keys): copies/moves of those keys fail until the test ends."""
+    transfer = fake_storage.Store.transfer
+    broken = set()
+
+    def flaky(self, src_bucket, src, dst_bucket, dst, move):
+        if src in broken:
+            raise fake_storage.StoreError(507, "insufficient_storage", "Bucket is full")
+        return transfer(self, src_bucket, src, dst_bucket, dst, move)
+
+    monkeypatch.setattr(fake_storage.Store, "transfer", flaky)
+    return lambda *srcs: (broken.clear(), broken.update(srcs))
+
+def run(drive, transfer_id):
+    assert transfer_journal.claim(transfer_id) is not None
+    job = new_job()
+    done, errors = drive(appz.run_transfer_steps(transfer_id, job), job)
+    transfer_journal.release(transfer_id, "failed" if errors else "done")
+    return done, errors
+
+@pytest.mark.usefixtures("error_style")
+def test_resume_skips_finished_objects(drive, bucket, other_bucket, failing, stats):
+    for name in ("a", "b", "c"):
+        put(bucket, f"src/{name}.txt", name.encode())
+    transfer_id = transfer_journal.create("copy", bucket, "src", other_bucket, "dst")
+    failing("src/b.txt")
+    done, errors = run(drive, transfer_id)
+    assert done == 2 and len(errors) == 1 and "src/b.txt" in errors[0]
+    assert transfer_journal.get(transfer_id)["status"] == "failed"
+
+    failing()
+    stats.reset()
+    assert run(drive, transfer_id) == (3, [])
+    assert stats.snapshot()["requests"]["object.copy"] == 1
+    assert keys(other_bucket) == ["dst/a.txt", "dst/b.txt", "dst/c.txt"]
+    assert transfer_journal.get(transfer_id)["status"] == "done"
+
+@pytest.mark.usefixtures("error_style")
+def test_resumed_move_accepts_objects_already_moved(drive, store, bucket, failing):
+    for name in ("a", "b"):
+        put(bucket, f"src/{name}.txt", name.encode())
+    transfer_id = transfer_journal.create("move", bucket, "src", bucket, "dst")
+    failing("src/a.txt", "src/b.txt")
+    assert run(drive, transfer_id)[0] == 0
+    # the earlier run moved a.txt but stopped before recording it
+    failing()
+    store.transfer(bucket, "src/a.txt", bucket, "dst/a.txt", True)
+    assert run(drive, transfer_id) == (2, [])
+    assert keys(bucket) == ["dst/a.txt", "dst/b.txt"]
+    assert content(bucket, "dst/a.txt") == b"a"
+
+def test_transfer_route_runs_the_journal(app_client, bucket, other_bucket):
+    put(bucket, "src/x/a.txt", b"a")
+    resp = app_client.request("POST", "/transfer", form={
+        "op": "move", "is_folder": "1", "src_bucket": bucket, "src_path": "src",
+        "dst_bucket": other_bucket, "dst_path": "to"})
+    job = wait_job(app_client, resp.json())
+    assert job["status"] == "done", job
+    assert transfer_journal.get(job["transfer_id"])["status"] == "done"
+    assert keys(bucket) == [] and keys(other_bucket) == ["to/src/x/a.txt"]
+
+@pytest.mark.usefixtures("error_style")
+def test_only_not_found_counts_as_missing(drive, bucket, monkeypatch):
+    put(bucket, "a.txt")
+    assert drive(appz.object_exists_steps(bucket, "a.txt")) is True
+    assert drive(appz.object_exists_steps(bucket, "b.txt")) is False
+
+    def bad_request(self, *args):
+        raise fake_storage.StoreError(400, "invalid_key", "Invalid key")
+
+    monkeypatch.setattr(fake_storage.Store, "get", bad_request)
+    with pytest.raises(Exception) as err:
+        drive(appz.object_exists_steps(bucket, "a.txt"))
+    assert appz.error_status(err.value) == 400
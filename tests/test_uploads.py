@@ -0,0 +1,107 @@
+import io
+import os
+import threading
+import time
+
+import pytest
+
+import appz
+from appz import UploadChunkError, append_upload_chunk, init_chunked_upload, load_chunked_upload
+
+def new_upload(size: int, fingerprint: str) -> str:
+    upload_id, received = init_chunked_upload("b", f"dir/{fingerprint}.bin", size, fingerprint)
+    assert received == 0
+    return upload_id
+
+def spool(upload_id: str) -> bytes:
+    with open(appz._spool_paths(upload_id)[0], "rb") as fh:
+        return fh.read()
+
+def test_chunks_resume_from_received_size():
+    upload_id = new_upload(10, "resume")
+    assert append_upload_chunk(upload_id, 0, io.BytesIO(b"01234"), 10) == 5
+    assert init_chunked_upload("b", "dir/resume.bin", 10, "resume") == (upload_id, 5)
+    with pytest.raises(UploadChunkError) as err:
+        append_upload_chunk(upload_id, 0, io.BytesIO(b"01234"), 10)
+    assert (err.value.status, err.value.offset) == (409, 5)
+    assert append_upload_chunk(upload_id, 5, io.BytesIO(b"56789"), 10) == 10
+    assert spool(upload_id) == b"0123456789"
+
+def test_chunk_past_the_declared_size_is_refused_whole():
+    upload_id = new_upload(6, "oversize")
+    append_upload_chunk(upload_id, 0, io.BytesIO(b"0123"), 6)
+    with pytest.raises(UploadChunkError) as err:
+        append_upload_chunk(upload_id, 4, io.BytesIO(b"456"), 6)
+    assert (err.value.status, err.value.offset) == (413, 4)
+    assert spool(upload_id) == b"0123"
+
+def test_spool_larger_than_the_file_restarts():
+    upload_id = new_upload(4, "corrupt")
+    with open(appz._spool_paths(upload_id)[0], "wb") as fh:
+        fh.write(b"too many bytes")
+    assert load_chunked_upload(upload_id)["received"] == 0
+    assert init_chunked_upload("b", "dir/corrupt.bin", 4, "corrupt") == (upload_id, 0)
+    assert append_upload_chunk(upload_id, 0, io.BytesIO(b"abcd"), 4) == 4
+
+class Broken(io.BytesIO):
+    def read(self, n=-1):
+        data = super().read(2)
+        if not data:
+            raise ConnectionError("client went away")
+        return data
+
+def test_failed_chunk_is_dropped():
+    upload_id = new_upload(8, "broken")
+    append_upload_chunk(upload_id, 0, io.BytesIO(b"ab"), 8)
+    with pytest.raises(ConnectionError):
+        append_upload_chunk(upload_id, 2, Broken(b"cdef"), 8)
+    assert spool(upload_id) == b"ab"
+
+class Slow(io.BytesIO):
+    """Holds the spool lock until released, to line up a second writer behind it."""
+
+    def __init__(self, data: bytes, started: threading.Event, release: threading.Event):
+        super().__init__(data)
+        self.started, self.release = started, release
+
+    def read(self, n=-1):
+        self.started.set()
+        self.release.wait(5)
+        return super().read(n)
+
+def test_racing_writers_at_one_offset():
+    upload_id = new_upload(8, "race")
+    started, release = threading.Event(), threading.Event()
+    results = {}
+
+    def write(name, stream):
+        try:
+            results[name] = append_upload_chunk(upload_id, 0, stream, 8)
+        except UploadChunkError as ex:
+            results[name] = ex.status
+
+    first = threading.Thread(target=write, args=("first", Slow(b"AAAA", started, release)))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=write, args=("second", io.BytesIO(b"BBBB")))
+    second.start()
+    second.join(0.2)
+    assert second.is_alive()  # waiting for the lock, not appending alongside
+    release.set()
+    first.join()
+    second.join()
+    assert results == {"first": 4, "second": 409}
+    assert spool(upload_id) == b"AAAA"
+
+def test_sweep_expires_an_upload_by_its_newest_file():
+    upload_id = new_upload(8, "sweep")
+    append_upload_chunk(upload_id, 0, io.BytesIO(b"ab"), 8)
+    part, sidecar = appz._spool_paths(upload_id)
+    old = time.time() - appz.UPLOAD_SPOOL_TTL - 60
+    os.utime(sidecar, (old, old))  # written at init, never touched by chunks
+    appz.sweep_upload_spools()
+    assert os.path.exists(part) and os.path.exists(sidecar)
+    assert append_upload_chunk(upload_id, 2, io.BytesIO(b"cd"), 8) == 4
+    os.utime(part, (old, old))
+    appz.sweep_upload_spools()
+    assert not os.path.exists(part) and not os.path.exists(sidecar)